@@ -97,6 +97,11 @@ DATABASES = {
         ssl_require=not DEBUG
     )
 }
+# Neon ka "-pooler" endpoint PgBouncer transaction pooling hai: server-side cursor (QuerySet.iterator())
+# agle transaction me doosre backend par "cursor does not exist" deta hai, isliye client-side cursors
+DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = config(
+    'DISABLE_SERVER_SIDE_CURSORS', default="-pooler" in DATABASES["default"].get("HOST", ""), cast=bool
+)
 
 # ------------------------------
 # Password Validators
@@ -123,6 +128,8 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# name.<12 hex>.ext = content-hashed, far-future cache (catalog snapshot shards bhi isi naming me hain)
+WHITENOISE_IMMUTABLE_FILE_TEST = r'^.+\.[0-9a-f]{12}\..+$'
 
 # ------------------------------
 # Media Files
@@ -165,6 +172,186 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL').strip()
 # Increase timeout to prevent Render worker timeouts during send
 EMAIL_TIMEOUT = 60
 
+# ------------------------------
+# Caches
+# ------------------------------
+# Page cache ka backend: db (production default; sab workers aur services share karte hain, build me
+# `python manage.py createcachetable` chalta hai), file (sirf same machine ke workers) ya locmem
+# (DEBUG default; sirf single-process dev: dusre worker ka invalidation yahan ROWS_TTL ke baad hi pahunchta hai).
+PAGE_CACHE_BACKEND = config('PAGE_CACHE_BACKEND', default='locmem' if DEBUG else 'db')
+PAGE_CACHE_BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages', 'OPTIONS': {'MAX_ENTRIES': 5000}},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(BASE_DIR, 'var', 'page_cache')},
+    'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'page_cache'},
+}
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'pages': PAGE_CACHE_BACKENDS[PAGE_CACHE_BACKEND],
+}
+
+# ------------------------------
+# Page Cache (movies/page_cache.py)
+# ------------------------------
+# Anonymous users ke liye home/category/playlist/movie pages; Movie/Playlist/Category save par invalidate.
+# Same generations se ETag/Last-Modified bante hain: unchanged page par 304 (sitemap aur feeds bhi).
+PAGE_CACHE = {
+    'ENABLED': config('PAGE_CACHE', default=True, cast=bool),
+    'ALIAS': 'pages',
+    'TIMEOUT': config('PAGE_CACHE_TIMEOUT', default=600, cast=int),
+    'LOCK_TIMEOUT': 30,
+    'LOCK_WAIT_MS': 2000,
+    'VERSION': config('RENDER_GIT_COMMIT', default=''),  # Render har deploy par set karta hai; ETag isse badalta hai
+    'ROWS_TTL': 5,  # dusre worker ka edit itne seconds me is worker ke pages/ETag tak pahunchta hai
+}
+
+# ------------------------------
+# Card Fragment Cache (movies/cards.py)
+# ------------------------------
+# Har movie/playlist card ka rendered HTML; key me updated_at hai isliye invalidation ki zaroorat nahi.
+CARD_CACHE = {
+    'ENABLED': config('CARD_CACHE', default=True, cast=bool),
+    'ALIAS': 'pages',
+    'TIMEOUT': 24 * 3600,
+    'VERSION': config('RENDER_GIT_COMMIT', default=''),  # deploy ke baad purane templates/static URLs wale cards nahi
+}
+
+# ------------------------------
+# Download Log Write-Behind Buffer (movies/download_buffer.py)
+# ------------------------------
+# ENABLED=True par downloads ek in-process queue me jaate hain aur batches me insert hote hain.
+DOWNLOAD_LOG_BUFFER = {
+    'ENABLED': config('DOWNLOAD_LOG_BUFFER', default=False, cast=bool),
+    'BATCH_SIZE': config('DOWNLOAD_LOG_BATCH_SIZE', default=200, cast=int),
+    'FLUSH_INTERVAL_MS': config('DOWNLOAD_LOG_FLUSH_MS', default=1000, cast=int),
+    'MAX_PENDING': config('DOWNLOAD_LOG_MAX_PENDING', default=10000, cast=int),
+    'OVERFLOW': config('DOWNLOAD_LOG_OVERFLOW', default='spill'),  # block / drop / spill
+    'SPILL_PATH': os.path.join(BASE_DIR, 'var', 'download_log_spill.jsonl'),
+    'MAX_REPLAY_ATTEMPTS': 5,  # itni baar fail hone par file .failed-* me side kar di jaati hai
+}
+
+# ------------------------------
+# Download Redirect Cache (movies/resolver.py)
+# ------------------------------
+DOWNLOAD_RESOLVER = {
+    'ENABLED': config('DOWNLOAD_RESOLVER', default=True, cast=bool),
+    'MAX_SIZE': config('DOWNLOAD_RESOLVER_MAX_SIZE', default=10000, cast=int),
+    'TTL': config('DOWNLOAD_RESOLVER_TTL', default=300, cast=int),  # doosre workers ki saves itni der me dikhti hain
+    'WARM': True,
+}
+
+# ------------------------------
+# Download Log Retention (movies/retention.py)
+# ------------------------------
+# Itne din se purane poore mahine archive_download_logs gzip JSONL me export karke hata deta hai.
+# ARCHIVE_DIR sirf scratch hai (Render ki disk deploy par mit jaati hai): file pehle STORAGE me copy hoti hai,
+# STORAGE khali ho to kuch drop nahi hota. LocalArchiveStorage sirf persistent disk ke liye.
+DOWNLOAD_LOG_RETENTION = {
+    'MAX_AGE_DAYS': config('DOWNLOAD_LOG_MAX_AGE_DAYS', default=180, cast=int),
+    'ARCHIVE_DIR': config('DOWNLOAD_LOG_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'var', 'archive', 'downloads')),
+    'CHUNK_SIZE': 5000,
+    'MONTHS_AHEAD': 3,  # PostgreSQL: itne aane wale mahino ke partitions pehle se bane rahte hain
+    'STORAGE': config('DOWNLOAD_LOG_ARCHIVE_STORAGE', default='movies.retention.CloudinaryArchiveStorage'),
+}
+
+# ------------------------------
+# Active Install Counter (movies/installs.py)
+# ------------------------------
+# Shards badhane se concurrent installs ek hi counter row par nahi atakte.
+INSTALL_COUNTER_SHARDS = config('INSTALL_COUNTER_SHARDS', default=8, cast=int)
+
+# ------------------------------
+# Cloudinary Deletion Queue (movies/asset_deletions.py)
+# ------------------------------
+# Movie/Playlist delete par image queue me jaati hai; `manage.py drain_asset_deletions` 100 ids per call bhejta hai.
+ASSET_DELETION = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF_SECONDS': 30,  # har retry par double, MAX_BACKOFF_SECONDS tak
+    'MAX_BACKOFF_SECONDS': 6 * 3600,
+    'LEASE_SECONDS': 300,
+}
+
+# ------------------------------
+# Link Health Checker (movies/link_health.py)
+# ------------------------------
+# `manage.py check_links`: har host par PER_HOST probes saath me, RATE probes/second (token bucket).
+LINK_CHECK = {
+    'CONCURRENCY': config('LINK_CHECK_CONCURRENCY', default=16, cast=int),
+    'PER_HOST': 4,
+    'RATE': 2.0,
+    'BURST': 4,
+    'TIMEOUT': 10,
+    'METHOD': 'range',  # GET Range: bytes=0-0 (pixeldrain ise access maanta hai); 'head' bhi chalega
+    'BATCH_SIZE': 200,
+}
+
+# ------------------------------
+# Udrop Link Rotation (movies/link_rotation.py)
+# ------------------------------
+# `manage.py rotate_udrop_links`: PROVIDER ek LinkProvider class; har chunk ek transaction + checkpoint.
+LINK_ROTATION = {
+    'PROVIDER': config('LINK_ROTATION_PROVIDER', default='movies.link_rotation.SampleLinkProvider'),
+    'CHUNK_SIZE': 2000,
+}
+
+# ------------------------------
+# Admin Metrics Snapshot (movies/metrics.py)
+# ------------------------------
+# Dono dashboards aur /admin/metrics/ ek cached snapshot share karte hain; TTL ke baad background me refresh.
+METRICS = {
+    'ALIAS': 'default',
+    'TTL': 60,
+    'MAX_AGE': 600,
+    'EXACT_BELOW': 100000,  # PostgreSQL: DownloadLog ka estimate isse bada ho to "approximate" dikhta hai
+}
+
+# ------------------------------
+# Sitemaps (movies/sitemaps.py)
+# ------------------------------
+# `manage.py build_sitemaps` files likhta hai, /sitemap.xml unhe disk se serve karta hai (koi query nahi).
+# Movie/Playlist/Category save par REBUILD_DELAY seconds baad dobara likhe jaate hain.
+SITEMAPS = {
+    'ROOT': os.path.join(BASE_DIR, 'var', 'sitemaps'),
+    'BASE_URL': config('SITE_URL', default='https://basharat-movies-hub.onrender.com'),
+    'PAGE_SIZE': 50000,
+    'REBUILD_DELAY': 30,
+}
+
+# ------------------------------
+# Background Jobs (movies/jobs.py)
+# ------------------------------
+# `manage.py run_workers --concurrency N`; SCHEDULE ke jobs har `every` seconds par dobara queue hote hain.
+# build_catalog_snapshot yahan nahi: worker ki disk web service ki STATIC_ROOT nahi hai.
+JOBS = {
+    'CONCURRENCY': config('JOB_WORKERS', default=2, cast=int),
+    'BATCH_SIZE': 10,
+    'POLL_INTERVAL': 1.0,
+    'LEASE_SECONDS': 300,  # heartbeat lambe jobs ki lease badhata rehta hai
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 10,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'KEEP_DAYS': 7,
+    'SCHEDULE': {
+        'drain_asset_deletions': {'task': 'manage', 'kwargs': {'command': 'drain_asset_deletions'}, 'every': 60},
+        'rollup_downloads': {'task': 'manage', 'kwargs': {'command': 'rollup_downloads'}, 'every': 300},
+        'check_links': {'task': 'manage', 'kwargs': {'command': 'check_links'}, 'every': 24 * 3600},
+        'ensure_download_log_partitions': {'task': 'manage', 'kwargs': {'command': 'ensure_download_log_partitions'}, 'every': 24 * 3600},
+        'archive_download_logs': {'task': 'manage', 'kwargs': {'command': 'archive_download_logs'}, 'every': 24 * 3600},
+        'purge_jobs': {'task': 'purge_jobs', 'every': 24 * 3600},
+    },
+}
+
+# ------------------------------
+# Catalog Import (movies/catalog_import.py)
+# ------------------------------
+# `manage.py import_catalog movies.csv`: batches me upsert, posters UPLOAD_WORKERS threads par upload.
+CATALOG_IMPORT = {
+    'UPLOADER': 'movies.catalog_import.CloudinaryPosterUploader',
+    'BATCH_SIZE': 500,
+    'UPLOAD_WORKERS': 8,
+    'POSTER_FOLDER': 'posters',
+}
+
 # ------------------------------
 # CSRF Trusted Origins
 # ------------------------------
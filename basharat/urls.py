@@ -1,36 +1,19 @@
 # basharat/urls.py
-from django.urls import path, include
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
 # Custom Admin
 from movies.admin import admin_site
 
-# Sitemap
-from django.contrib.sitemaps.views import sitemap
-from django.contrib.sitemaps import Sitemap
-from movies.models import Movie
-
-
-class MovieSitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.8
-
-    def items(self):
-        return Movie.objects.all()
-
-    def location(self, obj):
-        return f"/movie/{obj.id}/"
-
-
-sitemaps = {
-    "movies": MovieSitemap,
-}
+# Sitemap (pre-built files, movies/sitemaps.py)
+from movies.views import sitemap_file
 
 urlpatterns = [
     path("admin/", admin_site.urls),          # ✅ use custom admin
     path("", include("movies.urls")),         # ✅ app urls
-    path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="sitemap"),
+    path("sitemap.xml", sitemap_file, {"name": "sitemap.xml"}, name="sitemap"),  # ✅ disk se, koi query nahi
+    re_path(r"^(?P<name>sitemap-[a-z]+-[1-9][0-9]*\.xml)$", sitemap_file, name="sitemap_section"),
 ]
 
 if settings.DEBUG:
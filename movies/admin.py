@@ -1,39 +1,20 @@
 from django.contrib import admin
-from django.contrib.auth import get_user_model
-from django.db.models import Count
-from .models import Playlist, Movie, DownloadLog, InstallTracker, Category
-
-User = get_user_model()
+from django.utils import timezone
+from .models import Playlist, Movie, DownloadLog, InstallTracker, Category, Job, LinkCheck, PendingAssetDeletion
+from .installs import forget_devices
+from .large_tables import LargeTableAdminMixin
+from .metrics import dashboard_context
 
 
 class MyAdminSite(admin.AdminSite):
     site_header = "Basharat Movies Hub Admin"
     site_title = "Basharat Admin"
     index_title = "Dashboard"
+    # Catch-all view admin/dashboard/, admin/metrics/ (movies/urls.py) ko pakad leta tha
+    final_catch_all_view = False
 
     def index(self, request, extra_context=None):
-        total_installs = InstallTracker.objects.count()
-        total_movies = Movie.objects.count()
-        total_users = User.objects.count()
-        total_downloads = DownloadLog.objects.count()
-
-        recent_installs = InstallTracker.objects.order_by("-updated_at")[:5]
-        top_movies = (
-            DownloadLog.objects.values("movie_title")
-            .annotate(download_count=Count("id"))
-            .order_by("-download_count")[:5]
-        )
-        recent_downloads = DownloadLog.objects.order_by("-download_time")[:5]
-
-        ctx = {
-            "total_installs": total_installs,
-            "total_movies": total_movies,
-            "total_users": total_users,
-            "total_downloads": total_downloads,
-            "recent_installs": recent_installs,
-            "top_movies": top_movies,
-            "recent_downloads": recent_downloads,
-        }
+        ctx = dashboard_context()  # cached snapshot (movies/metrics.py), custom_admin_dashboard bhi yahi use karta hai
         if extra_context:
             ctx.update(extra_context)
         return super().index(request, extra_context=ctx)
@@ -64,22 +45,99 @@ class PlaylistAdmin(admin.ModelAdmin):
 
 
 @admin.register(DownloadLog, site=admin_site)
-class DownloadLogAdmin(admin.ModelAdmin):
-    list_display = ("movie_title", "username", "ip_address", "download_time")
-    list_filter = ("download_time",)
-    ordering = ("-download_time",)
-    search_fields = ("movie_title", "username", "ip_address")
+class DownloadLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("movie_title", "username", "ip_address", "download_time", "user_agent_short")
+    list_select_related = ("agent",)
+    raw_id_fields = ("movie", "agent")
+    # Crores rows: cursor pages, estimated count, indexed search (movies/large_tables.py)
+    keyset_field = "download_time"
+    date_hierarchy = "download_time"
+    ip_search_field = "ip_address"
+    exact_search_fields = ("username",)
+    related_search_fields = {"movie": "title"}
+    search_help_text = "IP (1.2.3.4, prefix 1.2.3. or 1.2.0.0/16), exact username, or movie title"
+
+    def user_agent_short(self, obj):
+        text = obj.user_agent_text
+        return text if len(text) <= 60 else text[:57] + "..."
+    user_agent_short.short_description = "User agent"
+
+
+class LastActionFilter(admin.SimpleListFilter):
+    # Fixed choices (movies/installs.py): AllValuesFieldListFilter poori table ka DISTINCT karta tha
+    title = "last action"
+    parameter_name = "last_action"
+
+    def lookups(self, request, model_admin):
+        return [(action, action) for action in ("install", "reinstall", "install (re-open)", "uninstall", "pending")]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(last_action=self.value())
+        return queryset
 
 
 @admin.register(InstallTracker, site=admin_site)
-class InstallTrackerAdmin(admin.ModelAdmin):
+class InstallTrackerAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("device_id", "device_name", "install_count", "last_action", "updated_at", "created_at")
-    search_fields = ("device_id", "device_name")
-    list_filter = ("last_action", "updated_at", "created_at")
-    ordering = ("-updated_at",)
+    list_filter = (LastActionFilter, "updated_at")
+    keyset_field = "updated_at"
+    date_hierarchy = "updated_at"
+    exact_search_fields = ("device_id",)
+    search_help_text = "Exact device id"
+
+    # Delete se active install counter bhi theek rehta hai
+    def delete_model(self, request, obj):
+        forget_devices(InstallTracker.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        forget_devices(queryset)
 
 
 @admin.register(Category, site=admin_site)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name']
     search_fields = ['name']
+
+
+@admin.register(PendingAssetDeletion, site=admin_site)
+class PendingAssetDeletionAdmin(admin.ModelAdmin):
+    list_display = ("public_id", "resource_type", "attempts", "next_attempt_at", "last_error", "created_at")
+    list_filter = ("resource_type", "attempts")
+    search_fields = ("public_id",)
+    ordering = ("next_attempt_at",)
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected deletions on the next drain")
+    def retry_now(self, request, queryset):
+        updated = queryset.update(attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} deletions queued again.")
+
+
+@admin.register(LinkCheck, site=admin_site)
+class LinkCheckAdmin(admin.ModelAdmin):
+    list_display = ("movie", "field", "ok", "status_code", "latency_ms", "error", "last_checked")
+    list_filter = ("ok", "field", "status_code")
+    list_select_related = ("movie",)
+    raw_id_fields = ("movie",)
+    search_fields = ("url", "movie__title")
+    ordering = ("ok", "-last_checked")
+
+
+@admin.register(Job, site=admin_site)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("task", "status", "schedule", "run_at", "attempts", "max_attempts", "locked_by", "finished_at")
+    list_filter = ("status", "task", "schedule")
+    search_fields = ("task", "schedule", "last_error")
+    ordering = ("-run_at",)
+    readonly_fields = ("locked_by", "locked_until", "created_at", "finished_at")
+    actions = ["retry_now"]
+
+    @admin.action(description="Run selected jobs again now")
+    def retry_now(self, request, queryset):
+        # Recurring job ki pending copy pehle se ho to purani row dobara queue nahi ho sakti (unique index)
+        pending = Job.objects.filter(status__in=[Job.QUEUED, Job.RUNNING]).exclude(schedule="").values("schedule")
+        updated = queryset.exclude(status=Job.RUNNING).exclude(schedule__in=pending).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_until=None, finished_at=None,
+        )
+        self.message_user(request, f"{updated} jobs queued again.")
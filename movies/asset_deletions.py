@@ -0,0 +1,138 @@
+"""
+Deferred, batched deletion of Cloudinary assets.
+
+Deleting a Movie or Playlist used to call ``cloudinary.uploader.destroy``
+from ``post_delete``: one HTTP call per row, inside the request. The
+receivers now only ``queue_deletion()``, which inserts a
+``PendingAssetDeletion`` row in the same transaction. A rolled-back
+delete therefore never loses the image, and an admin bulk delete makes
+no network calls at all.
+
+``drain()`` (``manage.py drain_asset_deletions``) works through the due rows
+in batches of up to 100, the limit of the Admin API's
+``delete_resources``. Batches are grouped by resource and delivery type.
+A batch is first *claimed*: its rows get ``attempts + 1`` and a
+``next_attempt_at`` one lease ahead, committed before the HTTP call. Two
+drainers therefore never send the same ids, and a drainer that dies
+leaves them to be retried once the lease ends. Ids the API reports as
+``deleted`` or ``not_found`` are removed from the table. Everything else
+(an error, or an id missing from the answer) is retried with exponential
+backoff and jitter. After ``MAX_ATTEMPTS`` a row is left in the table
+with its ``last_error``, for the admin to look at.
+"""
+import random
+from datetime import timedelta
+
+import cloudinary.api
+import cloudinary.exceptions
+from cloudinary.models import CloudinaryField
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PendingAssetDeletion
+
+DEFAULTS = {
+    "BATCH_SIZE": 100,  # delete_resources ki limit
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF_SECONDS": 30,
+    "MAX_BACKOFF_SECONDS": 6 * 3600,
+    "LEASE_SECONDS": 300,
+}
+
+DONE = ("deleted", "not_found")
+
+_field = CloudinaryField()
+
+
+def deletion_settings():
+    return {**DEFAULTS, **getattr(settings, "ASSET_DELETION", {})}
+
+
+def queue_deletion(value):
+    """Records the image of a Cloudinary field value for deletion; a no-op for empty fields."""
+    if not value or not isinstance(value, str) and not hasattr(value, "public_id"):
+        return  # khaali field, ya upload hone se pehle ki file
+    resource = _field.to_python(value)
+    PendingAssetDeletion.objects.bulk_create([PendingAssetDeletion(
+        public_id=resource.public_id,
+        resource_type=resource.resource_type or "image",
+        delivery_type=resource.type or "upload",
+    )], ignore_conflicts=True)
+
+
+def backoff(attempts, conf):
+    delay = min(conf["BACKOFF_SECONDS"] * 2 ** max(attempts - 1, 0), conf["MAX_BACKOFF_SECONDS"])
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim(conf, now):
+    """Claims the next batch of due rows of one resource/delivery type. Returns a list (empty when done)."""
+    with transaction.atomic():
+        due = PendingAssetDeletion.objects.filter(next_attempt_at__lte=now, attempts__lt=conf["MAX_ATTEMPTS"])
+        first = due.order_by("next_attempt_at", "id").values("resource_type", "delivery_type").first()
+        if first is None:
+            return []
+        rows = due.filter(**first).order_by("next_attempt_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            rows = rows.select_for_update(skip_locked=True)
+        rows = list(rows[:conf["BATCH_SIZE"]])
+        lease_until = now + timedelta(seconds=conf["LEASE_SECONDS"])
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = lease_until
+        PendingAssetDeletion.objects.bulk_update(rows, ["attempts", "next_attempt_at"])
+    return rows
+
+
+def reschedule(rows, error, conf, now):
+    for row in rows:
+        row.next_attempt_at = now + backoff(row.attempts, conf)
+        row.last_error = error[:1000]
+    PendingAssetDeletion.objects.bulk_update(rows, ["next_attempt_at", "last_error"])
+
+
+def drain(api=cloudinary.api, max_batches=None, log=None):
+    """
+    Sends the due deletions to ``api.delete_resources``. Returns
+    ``{"calls", "deleted", "retrying", "failed"}``. ``failed`` counts rows
+    that have now used up their attempts.
+    """
+    conf = deletion_settings()
+    result = {"calls": 0, "deleted": 0, "retrying": 0, "failed": 0}
+    while max_batches is None or result["calls"] < max_batches:
+        now = timezone.now()
+        rows = claim(conf, now)
+        if not rows:
+            break
+
+        result["calls"] += 1
+        try:
+            response = api.delete_resources(
+                [row.public_id for row in rows], resource_type=rows[0].resource_type, type=rows[0].delivery_type,
+            )
+        except (cloudinary.exceptions.Error, OSError) as exc:
+            done, retry, error = [], rows, f"{type(exc).__name__}: {exc}"
+        else:
+            statuses = response.get("deleted", {})
+            done = [row for row in rows if statuses.get(row.public_id) in DONE]
+            retry = [row for row in rows if statuses.get(row.public_id) not in DONE]
+            error = "; ".join(sorted({f"{row.public_id}: {statuses.get(row.public_id, 'missing')}" for row in retry}))
+
+        with transaction.atomic():
+            PendingAssetDeletion.objects.filter(pk__in=[row.pk for row in done]).delete()
+            if retry:
+                reschedule(retry, error, conf, timezone.now())
+        result["deleted"] += len(done)
+        result["retrying"] += sum(1 for row in retry if row.attempts < conf["MAX_ATTEMPTS"])
+        result["failed"] += sum(1 for row in retry if row.attempts >= conf["MAX_ATTEMPTS"])
+        if log:
+            log(f"  batch of {len(rows)}: {len(done)} deleted, {len(retry)} to retry")
+    return result
+
+
+def retry_failed():
+    """Gives rows that used up their attempts a fresh start. Returns how many."""
+    return PendingAssetDeletion.objects.filter(attempts__gte=deletion_settings()["MAX_ATTEMPTS"]).update(
+        attempts=0, next_attempt_at=timezone.now(),
+    )
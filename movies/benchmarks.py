@@ -0,0 +1,527 @@
+"""
+Micro-benchmarks for the hot paths, run with ``manage.py benchmark <name>``.
+
+Each benchmark is a function registered with ``@benchmark(name)`` that takes
+the command's ``stdout`` and ``options`` and prints its own report.
+Benchmarks that need rows seed them inside ``rolled_back()``, so running
+one never leaves data behind.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Runs the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def timings(func, repeat):
+    """Runs ``func`` ``repeat`` times, returns per-call durations in milliseconds."""
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        results.append((time.perf_counter() - start) * 1000)
+    return results
+
+
+def summary(samples):
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"mean {statistics.mean(ordered):.3f} ms, median {statistics.median(ordered):.3f} ms, p99 {p99:.3f} ms"
+
+
+def synthetic_titles(count, seed=42):
+    """Deterministic, vaguely title-like strings (some of them series episodes)."""
+    rng = random.Random(seed)
+    syllables = ["ka", "ra", "mo", "vi", "en", "ger", "lo", "stran", "thi", "ngs", "dar", "ke", "ro", "man", "tor", "ia"]
+    words = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(8000)})
+    titles = ["Avengers Endgame", "Avengers Infinity War", "Stranger Things Season 1 Episode 1"]
+    while len(titles) < count:
+        title = " ".join(rng.choice(words).capitalize() for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.3:
+            title += f" S{rng.randint(1, 9):02d}E{rng.randint(1, 24):02d}"
+        titles.append(title)
+    return titles
+
+
+# ----------------------------------------------------------------------
+# Typeahead
+# ----------------------------------------------------------------------
+@benchmark("suggest")
+def bench_suggest(stdout, options):
+    from .suggest import KIND_MOVIE, SuggestIndex
+
+    size = options.get("size") or 100_000
+    titles = synthetic_titles(size)
+
+    start = time.perf_counter()
+    index = SuggestIndex()
+    for pk, title in enumerate(titles, start=1):
+        index.add(KIND_MOVIE, pk, title)
+    stdout.write(f"built index of {len(index)} titles in {time.perf_counter() - start:.2f} s")
+
+    queries = ["avengrs", "stranger thing s1", "a", "ka", "kara", "moviro s2", "darke", "tor", "manvi e3", "zzz"]
+    for query in queries:
+        stdout.write(f"  {query!r:24} {summary(timings(lambda: index.suggest(query), 200))}")
+    overall = [t for query in queries for t in timings(lambda: index.suggest(query), 100)]
+    stdout.write(f"all queries: {summary(overall)}")
+
+
+# ----------------------------------------------------------------------
+# Download redirect
+# ----------------------------------------------------------------------
+@benchmark("redirect")
+def bench_redirect(stdout, options):
+    """Redirect throughput of download_movie with the resolver cache on and off."""
+    from unittest import mock
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.shortcuts import get_object_or_404
+    from django.test import RequestFactory
+
+    from .download_buffer import DownloadLogBuffer
+    from .models import Movie
+    from .resolver import DownloadResolver
+    from .views import download_movie
+
+    size = options.get("size") or 2000
+    factory = RequestFactory()
+    rng = random.Random(7)
+
+    def full_row(movie_id):  # pehle wala path: poori row (description samet)
+        movie = get_object_or_404(Movie, id=movie_id)
+        return movie.download_link, movie.title
+
+    def values_only(movie_id):
+        return Movie.objects.filter(pk=movie_id).values_list("download_link", "title").first()
+
+    with rolled_back():
+        Movie.objects.bulk_create(
+            Movie(title=f"Movie {i}", description="x" * 2000, poster="posters/bench", download_link=f"https://example.com/{i}")
+            for i in range(size)
+        )
+        ids = list(Movie.objects.values_list("id", flat=True))
+        picks = [rng.choice(ids) for _ in range(5000)]
+
+        # Logging ko benchmark se bahar rakho: buffer kabhi flush nahi hota
+        buffer = DownloadLogBuffer(start=False, batch_size=10 ** 9, max_pending=10 ** 9)
+        cached = DownloadResolver(max_size=size)
+        variants = [
+            ("full row (old)", full_row),
+            ("cache off", values_only),
+            ("cache on", cached.resolve),
+        ]
+        with mock.patch("movies.download_buffer.get_download_buffer", return_value=buffer):
+            for label, resolver in variants:
+                with mock.patch("movies.views.resolve_download", resolver):
+                    resolver(ids[0])  # warm-up
+                    start = time.perf_counter()
+                    for movie_id in picks:
+                        request = factory.get(f"/download/{movie_id}/")
+                        request.user = AnonymousUser()
+                        download_movie(request, movie_id)
+                    elapsed = time.perf_counter() - start
+                stdout.write(f"  {label:15} {len(picks) / elapsed:8.0f} redirects/s  ({elapsed / len(picks) * 1e6:.0f} µs each)")
+
+
+# ----------------------------------------------------------------------
+# DownloadLog row size
+# ----------------------------------------------------------------------
+SAMPLE_USER_AGENTS = [
+    "Mozilla/5.0 (Linux; Android 13; SM-A536E) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.113 Mobile Safari/537.36",
+    "Mozilla/5.0 (Linux; Android 12; Redmi Note 11) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.6312.99 Mobile Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.82 Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15",
+]
+
+
+def table_bytes(model):
+    """On-disk bytes of a table plus its indexes (and partitions on PostgreSQL)."""
+    from django.db import connection
+
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(%s)", [table])
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT sum(pgsize) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                [table],
+            )
+        else:
+            return None
+        return int(cursor.fetchone()[0] or 0)
+
+
+@benchmark("download_log_size")
+def bench_download_log_size(stdout, options):
+    """Bytes per DownloadLog row: full user_agent text vs. interned agent id + movie FK."""
+    from django.utils import timezone
+
+    from .models import DownloadLog, Movie, UserAgent
+    from .user_agents import intern_many
+
+    size = options.get("size") or 20000
+    rng = random.Random(3)
+    titles = synthetic_titles(500)
+    now = timezone.now()
+
+    def rows(new_layout, movie_ids, agent_ids):
+        for i in range(size):
+            title_index = rng.randrange(len(titles))
+            agent = rng.choice(SAMPLE_USER_AGENTS)
+            fields = {
+                "movie_title": titles[title_index],
+                "ip_address": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                "download_time": now,
+            }
+            if new_layout:
+                fields.update(movie_id=movie_ids[title_index], agent_id=agent_ids[agent])
+            else:
+                fields["user_agent"] = agent
+            yield DownloadLog(**fields)
+
+    for label, new_layout in (("user_agent text (old)", False), ("movie FK + agent id", True)):
+        with rolled_back():
+            movies = Movie.objects.bulk_create(
+                Movie(title=title, poster="posters/bench", download_link="https://example.com/f") for title in titles
+            )
+            movie_ids = [movie.pk for movie in movies]
+            agent_ids = intern_many(SAMPLE_USER_AGENTS)
+            before, lookup_before = table_bytes(DownloadLog), table_bytes(UserAgent)
+            DownloadLog.objects.bulk_create(rows(new_layout, movie_ids, agent_ids), batch_size=2000)
+            after = table_bytes(DownloadLog)
+            if after is None:
+                stdout.write("table sizes are only measured on PostgreSQL and SQLite")
+                return
+            per_row = (after - before) / size
+            stdout.write(f"  {label:22} {per_row:7.1f} bytes/row  ({size} rows, UserAgent table {lookup_before} bytes)")
+
+
+# ----------------------------------------------------------------------
+# Card fragment cache
+# ----------------------------------------------------------------------
+@benchmark("cards")
+def bench_cards(stdout, options):
+    """Template time of a 24-card home page with the card fragment cache off, cold and warm."""
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.cache import caches
+    from django.test import RequestFactory, override_settings
+
+    from .cards import MOVIE_CARD, PLAYLIST_CARD, card_key, card_settings, render_cards
+    from .models import Movie, Playlist
+    from .views import home
+
+    repeat = options.get("size") or 200
+    view = home.__wrapped__  # page cache ke bina
+    request = RequestFactory().get("/")
+    request.user = AnonymousUser()
+
+    with rolled_back():
+        Playlist.objects.bulk_create(Playlist(name=f"Playlist {i}", banner="banners/bench") for i in range(6))
+        Movie.objects.bulk_create(
+            Movie(title=f"Movie {i}", description="", poster="posters/bench", download_link="https://example.com/f")
+            for i in range(40)
+        )
+        items = list(Playlist.objects.all()[:6]) + list(Movie.objects.filter(playlist__isnull=True)[:18])
+        cards = [(PLAYLIST_CARD if isinstance(item, Playlist) else MOVIE_CARD, item) for item in items]
+        cache = caches[card_settings()["ALIAS"]]
+
+        with override_settings(CARD_CACHE={**card_settings(), "ENABLED": False}):
+            stdout.write(f"  cards only, no cache  {summary(timings(lambda: render_cards(cards), repeat))}")
+            stdout.write(f"  home page, no cache   {summary(timings(lambda: view(request), repeat))}")
+
+        keys = [card_key(template, obj, card_settings()["VERSION"]) for template, obj in cards]
+
+        def cold():
+            cache.delete_many(keys)
+            render_cards(cards)
+
+        stdout.write(f"  cards only, cold      {summary(timings(cold, repeat))}")
+        render_cards(cards)
+        stdout.write(f"  cards only, warm      {summary(timings(lambda: render_cards(cards), repeat))}")
+        stdout.write(f"  home page, warm       {summary(timings(lambda: view(request), repeat))}")
+
+
+@benchmark("posters")
+def bench_posters(stdout, options):
+    """Poster URL building for a 24-card page: {% cloudinary %} tag vs three widths built vs stored variants."""
+    from django.template import Context, Template
+
+    from . import posters
+    from .models import Movie
+
+    repeat = options.get("size") or 200
+    with rolled_back():
+        Movie.objects.bulk_create(
+            Movie(title=f"Movie {i}", description="", poster=f"posters/bench-{i}", download_link="https://example.com/f")
+            for i in range(24)
+        )
+        movies = list(Movie.objects.order_by("-id")[:24])  # poster_variants bulk_create ke pre_save me bhar gaye
+
+        tag = Template("{% load cloudinary %}{% for m in movies %}{% cloudinary m.poster class='card-img-top' %}{% endfor %}")
+        stored = Template("{% load poster_tags %}{% for m in movies %}{% poster_img m 'poster' css_class='card-img-top' %}{% endfor %}")
+        context = Context({"movies": movies})
+
+        def uncached():
+            posters.build_urls.cache_clear()
+            for movie in movies:
+                posters.build_variants(movie.poster)
+
+        stdout.write(f"  cloudinary tag, 1 size     {summary(timings(lambda: tag.render(context), repeat))}")
+        stdout.write(f"  build 3 widths, no memo    {summary(timings(uncached, repeat))}")
+        stdout.write(f"  stored variants (urls)     {summary(timings(lambda: [posters.variants(m, 'poster') for m in movies], repeat))}")
+        stdout.write(f"  poster_img tag, stored     {summary(timings(lambda: stored.render(context), repeat))}")
+
+
+@benchmark("link_rotation")
+def bench_link_rotation(stdout, options):
+    """Rotating udrop links on ``--size`` movies (default 100k): query count and rows/second."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from .link_rotation import DummyLinkProvider, rotate_links, rotation_settings
+    from .models import Movie
+
+    count = options.get("size") or 100_000
+    with rolled_back():
+        for start in range(0, count, 5000):
+            Movie.objects.bulk_create(
+                Movie(title=f"Movie {i}", description="", poster="posters/bench", download_link="https://example.com/f")
+                for i in range(start, min(start + 5000, count))
+            )
+        chunk_size = rotation_settings()["CHUNK_SIZE"]
+        with CaptureQueriesContext(connection) as queries:
+            result = rotate_links(DummyLinkProvider(), chunk_size=chunk_size)
+        stdout.write(
+            f"  {result['scanned']} movies, chunk {chunk_size}: {len(queries)} queries, "
+            f"{result['chunks']} chunks, {result['rows_per_second']:.0f} rows/s"
+        )
+
+
+# ----------------------------------------------------------------------
+# Background jobs
+# ----------------------------------------------------------------------
+@benchmark("jobs")
+def bench_jobs(stdout, options):
+    """``noop`` jobs through an in-process burst worker (default 10k): jobs/second and queries per job, per batch size."""
+    from django.db import connection
+
+    from .jobs import Worker
+    from .models import Job
+
+    def counting(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    count = options.get("size") or 10_000
+    for batch_size in (1, 10, 50):
+        with rolled_back():
+            Job.objects.bulk_create((Job(task="noop", kwargs={"n": i}) for i in range(count)), batch_size=2000)
+            worker = Worker(batch_size=batch_size, poll_interval=0, burst=True, schedule=False)
+            queries = [0]
+            with connection.execute_wrapper(counting):
+                start = time.perf_counter()
+                worker.run()
+                seconds = time.perf_counter() - start
+            stdout.write(
+                f"  batch {batch_size}: {worker.processed} jobs in {seconds:.2f} s, "
+                f"{worker.processed / seconds:.0f} jobs/s, {queries[0] / worker.processed:.1f} queries/job"
+            )
+
+
+# ----------------------------------------------------------------------
+# Sitemaps
+# ----------------------------------------------------------------------
+@benchmark("sitemaps")
+def bench_sitemaps(stdout, options):
+    """Building the sitemap files for ``--size`` movies (default 100k): time, queries, and a rebuild with nothing changed."""
+    import shutil
+    import tempfile
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from .models import Movie
+    from .sitemaps import build_sitemaps
+
+    count = options.get("size") or 100_000
+    root = tempfile.mkdtemp()
+    try:
+        with rolled_back():
+            for start in range(0, count, 5000):
+                Movie.objects.bulk_create(
+                    Movie(title=f"Movie {i}", description="x" * 500, poster="posters/bench", download_link="https://example.com/f")
+                    for i in range(start, min(start + 5000, count))
+                )
+            for label in ("first build", "unchanged"):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    result = build_sitemaps(root=root, base_url="https://example.com")
+                    seconds = time.perf_counter() - start
+                stdout.write(
+                    f"  {label}: {result['urls']} urls in {result['files']} files, {result['written']} written, "
+                    f"{len(queries)} queries, {seconds * 1000:.0f} ms"
+                )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+# Admin metrics
+# ----------------------------------------------------------------------
+@benchmark("metrics")
+def bench_metrics(stdout, options):
+    """Admin dashboard numbers over ``--size`` download rows (default 200k): computing the snapshot vs reading it from cache."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from . import metrics
+    from .models import DownloadLog, Movie
+
+    count = options.get("size") or 200_000
+    with rolled_back():
+        movie = Movie.objects.create(title="Bench", description="", poster="posters/bench", download_link="https://example.com/f")
+        for start in range(0, count, 5000):
+            DownloadLog.objects.bulk_create(
+                DownloadLog(movie=movie, movie_title="Bench", ip_address="10.0.0.1")
+                for _ in range(start, min(start + 5000, count))
+            )
+        with CaptureQueriesContext(connection) as queries:
+            metrics.compute_snapshot()
+        stdout.write(f"  compute_snapshot: {len(queries)} queries, {summary(timings(metrics.compute_snapshot, 10))}")
+        metrics.refresh()
+        stdout.write(f"  get_snapshot (cached): {summary(timings(metrics.get_snapshot, 1000))}")
+        metrics.metrics_cache().delete(metrics.CACHE_KEY)
+
+
+@benchmark("admin_changelist")
+def bench_admin_changelist(stdout, options):
+    """DownloadLog changelist over ``--size`` rows (default 1M): Django's default admin vs the large-table mode."""
+    from datetime import timedelta
+    from urllib.parse import urlencode
+
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.utils import timezone
+
+    from . import retention
+    from .admin import DownloadLogAdmin, admin_site
+    from .large_tables import encode_cursor
+    from .models import DownloadLog
+
+    count = options.get("size") or 1_000_000
+    factory = RequestFactory()
+    with rolled_back():
+        user = User.objects.create_superuser("bench-admin", "bench@example.com", "bench")
+        now = timezone.now()
+        if retention.is_partitioned():
+            # Production jaisa: har mahine ka apna partition (scheduled ensure_download_log_partitions)
+            month = retention.month_start(now - timedelta(seconds=count))
+            while month <= now:
+                retention.ensure_partition(month)
+                month = retention.add_months(month, 1)
+        for start in range(0, count, 10_000):
+            DownloadLog.objects.bulk_create(
+                DownloadLog(movie_title="Bench", download_time=now - timedelta(seconds=i), ip_address=f"10.{i % 256}.{i // 256 % 256}.{i % 251}")
+                for i in range(start, min(start + 10_000, count))
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # Autovacuum ka kaam: planner stats aur reltuples (estimated count) ke bina numbers production jaise nahi
+                cursor.execute(f"ANALYZE {DownloadLog._meta.db_table}")
+
+        class DefaultDownloadLogAdmin(admin.ModelAdmin):
+            # Pehle wala config: OFFSET pages, do COUNT(*), icontains search
+            list_display = DownloadLogAdmin.list_display
+            list_select_related = DownloadLogAdmin.list_select_related
+            user_agent_short = DownloadLogAdmin.user_agent_short
+            list_filter = ("download_time",)
+            ordering = ("-download_time",)
+            search_fields = ("movie_title", "username", "ip_address")
+
+        def changelist(model_admin, query=""):
+            def run():
+                request = factory.get("/admin/movies/downloadlog/" + query)
+                request.user = user
+                model_admin.changelist_view(request).render()
+            return run
+
+        large = DownloadLogAdmin(DownloadLog, admin_site)
+        default = DefaultDownloadLogAdmin(DownloadLog, admin_site)
+        middle = DownloadLog.objects.order_by("-download_time", "-pk").values_list("download_time", "pk")[count // 2]
+        cases = [
+            ("default, first page", changelist(default)),
+            (f"default, page {count // 100 // 2}", changelist(default, f"?p={count // 100 // 2}")),
+            ("default, IP search", changelist(default, "?q=10.1.2.3")),
+            ("large, first page", changelist(large)),
+            ("large, middle page", changelist(large, "?" + urlencode({"before": encode_cursor(*middle)}))),
+            ("large, IP exact", changelist(large, "?q=10.1.2.3")),
+            ("large, IP prefix", changelist(large, "?q=10.1.")),
+            ("large, one day", changelist(large, f"?download_time__year={now.year}&download_time__month={now.month}&download_time__day={now.day}")),
+        ]
+        for label, run in cases:
+            stdout.write(f"  {label}: {summary(timings(run, 5))}")
+
+
+@benchmark("catalog_import")
+def bench_catalog_import(stdout, options):
+    """``import_catalog`` of ``--size`` CSV rows (default 10k, a poster on every 10th with 20 ms simulated upload latency)."""
+    import csv
+    import os
+    import shutil
+    import tempfile
+
+    from . import catalog_import
+
+    class SlowUploader(catalog_import.PosterUploader):
+        def upload(self, source, public_id):
+            time.sleep(0.02)
+            return public_id
+
+    count = options.get("size") or 10_000
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "catalog.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["title", "description", "download_link", "category", "playlist", "poster"])
+            for i in range(count):
+                writer.writerow([f"Show {i // 20} S01E{i % 20 + 1:02d}", "Bench", f"https://example.com/{i}",
+                                 f"Category {i % 12}", f"Show {i // 20}", f"art/{i}.jpg" if i % 10 == 0 else ""])
+        for workers in (1, 8):
+            with rolled_back():
+                first = catalog_import.import_catalog(path, uploader=SlowUploader(), workers=workers)
+                again = catalog_import.import_catalog(path, uploader=SlowUploader(), workers=workers)
+            stdout.write(f"  {workers} upload workers: {first['seconds']:.1f}s ({first['rows_per_second']:.0f} rows/s, "
+                         f"{first['uploaded']} posters); re-run {again['seconds']:.1f}s, {again['unchanged']} unchanged")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,58 @@
+"""
+Rendered-card fragment cache shared by the home, category and playlist pages.
+
+A card is the HTML of one movie or playlist tile (``templates/cards/``).
+It is cached under ``card:<version>:<template>:<id>:<updated_at>``. A save
+bumps ``updated_at``, so an edited object simply gets a new key and never
+needs explicit invalidation. ``VERSION`` is the deploy id (like
+``PAGE_CACHE["VERSION"]``): cards rendered by an older build, with its
+templates and hashed static URLs, are not served after a deploy. ``render_cards()`` fetches a whole page of cards
+with one ``get_many``, renders only the misses, and stores them with one ``set_many``.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+DEFAULTS = {
+    "ENABLED": True,
+    "ALIAS": "default",
+    "TIMEOUT": 24 * 3600,
+    "VERSION": "",  # deploy id: naye templates ke saath purane cards match na hon
+}
+
+MOVIE_CARD = "movie_card"
+PLAYLIST_CARD = "playlist_card"
+EPISODE_CARD = "episode_card"  # playlist_detail ka chhota card
+
+
+def card_settings():
+    return {**DEFAULTS, **getattr(settings, "CARD_CACHE", {})}
+
+
+def card_key(template, obj, version=""):
+    updated = int(obj.updated_at.timestamp() * 1_000_000) if obj.updated_at else 0
+    return f"card:{version}:{template}:{obj.pk}:{updated}"
+
+
+def render_card(template, obj):
+    return render_to_string(f"cards/{template}.html", {"obj": obj})
+
+
+def render_cards(cards):
+    """``cards`` is a list of ``(template, obj)``. Returns the HTML of each, in order."""
+    conf = card_settings()
+    if not conf["ENABLED"]:
+        return [mark_safe(render_card(template, obj)) for template, obj in cards]
+
+    cache = caches[conf["ALIAS"]]
+    keys = [card_key(template, obj, conf["VERSION"]) for template, obj in cards]
+    found = cache.get_many(keys)
+    rendered = {}
+    for key, (template, obj) in zip(keys, cards):
+        if key not in found and key not in rendered:
+            rendered[key] = render_card(template, obj)
+    if rendered:
+        cache.set_many(rendered, timeout=conf["TIMEOUT"])
+    found.update(rendered)
+    return [mark_safe(found[key]) for key in keys]
@@ -0,0 +1,413 @@
+"""
+Bulk catalog import (``manage.py import_catalog``).
+
+Until now a movie could only be added through the admin form, one at a
+time, with the poster uploaded inside the request. ``import_catalog()``
+reads a CSV or JSONL file with these columns:
+
+    title, download_link          required
+    description, udrop_link       optional
+    category, playlist            names, created if missing
+    poster                        file path (relative to the input file) or URL
+    key                           optional stable id; default sha1(playlist, title)
+
+The rows are processed in batches of ``BATCH_SIZE``:
+
+1. Posters are uploaded on a thread pool of ``UPLOAD_WORKERS``, before
+   any transaction is opened. Slow uploads would otherwise hold its
+   locks. A poster's public id comes from the key and the source. Movies
+   that already have that poster (matched by ``Movie.import_key``) are
+   skipped, so re-importing the same poster uploads nothing. If the batch
+   then fails, the re-run uploads to the same public id.
+2. One transaction does the writes and the checkpoint
+   (``RollupWatermark`` ``import:<sha1 of the path>``, the number of rows
+   done):
+   * Missing categories and playlists are created with one
+     ``bulk_create`` each.
+   * One query reads the existing movies. Rows identical to the stored
+     movie are skipped.
+   * Movies are upserted with ``bulk_create(update_conflicts=True,
+     unique_fields=["import_key"])`` and the batch's rows are indexed for
+     search.
+
+``bulk_create`` sends no save signals. The command therefore does their
+work once per batch: sort keys, search and suggest indexes, playlist
+order mode, page cache scopes and the download redirect cache. The
+sitemaps are rebuilt once at the end. ``--resume`` skips the rows of the
+committed batches. A re-run of the same file changes nothing.
+
+Uploaders subclass ``PosterUploader``. ``settings.CATALOG_IMPORT["UPLOADER"]``
+or ``--uploader`` names the class. ``LocalPosterUploader`` copies files to
+disk, for tests and offline runs.
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+import requests
+from cloudinary.models import CloudinaryField
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import page_cache, suggest
+from .models import Category, Movie, Playlist, RollupWatermark
+from .resolver import invalidate_download
+from .search import get_search_backend
+
+DEFAULTS = {
+    "UPLOADER": "movies.catalog_import.CloudinaryPosterUploader",
+    "BATCH_SIZE": 500,
+    "UPLOAD_WORKERS": 8,
+    "POSTER_FOLDER": "posters",
+}
+
+FORMATS = ("csv", "jsonl")
+COMPARED_FIELDS = ("title", "description", "download_link", "udrop_link", "playlist_id", "category_id")
+UPDATE_FIELDS = ["title", "description", "download_link", "udrop_link", "playlist", "category", "poster",
+                 "poster_variants", "season_num", "episode_num", "order_num", "updated_at"]
+
+_validate_url = URLValidator()
+_field = CloudinaryField()
+
+
+def import_settings():
+    return {**DEFAULTS, **getattr(settings, "CATALOG_IMPORT", {})}
+
+
+class RowError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Posters
+# ----------------------------------------------------------------------
+class PosterUploader:
+    """Uploads one poster; called from the worker threads."""
+
+    def upload(self, source, public_id):
+        """Returns the ``Movie.poster`` value: a ``CloudinaryResource`` (with upload metadata) or a public id."""
+        raise NotImplementedError
+
+
+class CloudinaryPosterUploader(PosterUploader):
+    def upload(self, source, public_id):
+        # overwrite=False: same public id ka dobara upload purani image hi lauta deta hai
+        return cloudinary.uploader.upload_resource(source, public_id=public_id, overwrite=False,
+                                                   type="upload", resource_type="image")
+
+
+class LocalPosterUploader(PosterUploader):
+    """Copies (or downloads) posters to ``root/<public id>``."""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(settings.BASE_DIR, "var", "imported-posters")
+
+    def upload(self, source, public_id):
+        path = os.path.join(self.root, public_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if source.startswith(("http://", "https://")):
+            response = requests.get(source, timeout=30)
+            response.raise_for_status()
+            with open(path, "wb") as f:
+                f.write(response.content)
+        else:
+            shutil.copyfile(source, path)
+        return public_id
+
+
+def get_uploader(path=None, **kwargs):
+    return import_string(path or import_settings()["UPLOADER"])(**kwargs)
+
+
+def poster_public_id(key, source, folder):
+    digest = hashlib.sha1(f"{key}\x1f{source}".encode()).hexdigest()
+    return f"{folder}/import-{digest[:20]}"
+
+
+def public_id_of(value):
+    if not value:
+        return None
+    return value.public_id if hasattr(value, "public_id") else _field.parse_cloudinary_resource(value).public_id
+
+
+# ----------------------------------------------------------------------
+# Rows
+# ----------------------------------------------------------------------
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return "jsonl" if extension in (".jsonl", ".ndjson") else "csv"
+
+
+def read_rows(path, file_format=None):
+    """Yields ``(line_number, dict)`` for each data row of a CSV or JSONL file."""
+    file_format = file_format or detect_format(path)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError:
+                        yield number, None
+
+
+def clean_row(raw, poster_root):
+    """Validated row dict; raises ``RowError``."""
+    if not isinstance(raw, dict):
+        raise RowError("not a JSON object")
+
+    def text(name, limit=None):
+        value = raw.get(name)
+        value = "" if value is None else str(value).strip()
+        if limit and len(value) > limit:
+            raise RowError(f"{name} longer than {limit} characters")
+        return value
+
+    row = {
+        "title": text("title", 200),
+        "description": text("description"),
+        "download_link": text("download_link"),
+        "udrop_link": text("udrop_link") or None,  # None: purana link rehne do
+        "category": text("category", 100) or None,
+        "playlist": text("playlist", 100) or None,
+        "poster": text("poster") or None,
+        "key": text("key", 64),
+    }
+    if not row["title"]:
+        raise RowError("title is required")
+    for name in ("download_link", "udrop_link"):
+        if row[name] or name == "download_link":
+            try:
+                _validate_url(row[name])
+            except ValidationError:
+                raise RowError(f"invalid {name}: {row[name]!r}")
+    if not row["key"]:
+        row["key"] = hashlib.sha1(f"{(row['playlist'] or '').lower()}\x1f{row['title'].lower()}".encode()).hexdigest()
+    # Public id file me likhe poster se banta hai, resolved path se nahi: doosri directory se re-run bhi same
+    row["poster_path"] = row["poster"]
+    if row["poster"] and not row["poster"].startswith(("http://", "https://")):
+        row["poster_path"] = os.path.join(poster_root, row["poster"])
+    return row
+
+
+# ----------------------------------------------------------------------
+# Import
+# ----------------------------------------------------------------------
+def checkpoint_name(path):
+    return "import:" + hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+
+
+def checkpoint(name):
+    return RollupWatermark.objects.filter(name=name).values_list("last_id", flat=True).first() or 0
+
+
+def save_checkpoint(name, done):
+    if not RollupWatermark.objects.filter(name=name).update(last_id=done):
+        RollupWatermark.objects.create(name=name, last_id=done)
+
+
+class CatalogImporter:
+    def __init__(self, uploader=None, batch_size=None, workers=None, log=None):
+        conf = import_settings()
+        self.uploader = uploader or get_uploader()
+        self.batch_size = batch_size or conf["BATCH_SIZE"]
+        self.workers = workers or conf["UPLOAD_WORKERS"]
+        self.folder = conf["POSTER_FOLDER"]
+        self.log = log
+        self.categories = {}
+        self.playlists = {}
+        self.stats = dict.fromkeys(("rows", "created", "updated", "unchanged", "skipped", "uploaded",
+                                    "poster_errors", "categories_created", "playlists_created", "batches"), 0)
+
+    # Categories / playlists ---------------------------------------------
+    def category_ids(self, names):
+        missing = {name for name in names if name not in self.categories}
+        if missing:
+            found = dict(Category.objects.filter(name__in=missing).values_list("name", "id"))
+            new = [Category(name=name) for name in sorted(missing - found.keys())]
+            if new:
+                Category.objects.bulk_create(new, ignore_conflicts=True)
+                found.update(Category.objects.filter(name__in=[c.name for c in new]).values_list("name", "id"))
+                self.stats["categories_created"] += len(new)
+                for category in new:
+                    suggest.index_update(suggest.KIND_CATEGORY, found[category.name], category.name)
+            self.categories.update(found)
+        return self.categories
+
+    def playlist_ids(self, wanted):
+        """``wanted`` is ``{name: category_id}``; a new playlist gets the category of its first row."""
+        missing = {name for name in wanted if name not in self.playlists}
+        if missing:
+            found = {}
+            for pk, name in Playlist.objects.filter(name__in=missing).order_by("-pk").values_list("id", "name"):
+                found[name] = pk  # same naam ki kai playlists: sabse purani
+            new = [Playlist(name=name, category_id=wanted[name]) for name in sorted(missing - found.keys())]
+            if new:
+                Playlist.objects.bulk_create(new)
+                created = list(Playlist.objects.filter(name__in=[p.name for p in new]).exclude(pk__in=found.values())
+                               .values_list("id", "name"))
+                found.update((name, pk) for pk, name in created)
+                self.stats["playlists_created"] += len(new)
+                get_search_backend().update_many(Playlist, [pk for pk, _ in created])
+                for pk, name in created:
+                    suggest.index_update(suggest.KIND_PLAYLIST, pk, name)
+            self.playlists.update(found)
+        return self.playlists
+
+    # Posters ------------------------------------------------------------
+    def upload_posters(self, pool, jobs):
+        """``jobs`` is ``{key: (source, public_id)}``. Returns ``{key: value}`` of the successful uploads."""
+        futures = {key: pool.submit(self.uploader.upload, source, public_id) for key, (source, public_id) in jobs.items()}
+        values = {}
+        for key, future in futures.items():
+            try:
+                values[key] = future.result()
+                self.stats["uploaded"] += 1
+            except Exception as exc:
+                self.stats["poster_errors"] += 1
+                if self.log:
+                    self.log(f"  ❌ poster of {key}: {type(exc).__name__}: {exc}")
+        return values
+
+    # Batch --------------------------------------------------------------
+    def upload_batch(self, pool, rows):
+        """Uploads the batch's new or changed posters; runs outside any transaction. Returns ``{key: value}``."""
+        stored = dict(Movie.objects.filter(import_key__in=[row["key"] for row in rows]).values_list("import_key", "poster"))
+        jobs = {}
+        for row in rows:
+            if row["poster"]:
+                public_id = poster_public_id(row["key"], row["poster"], self.folder)
+                if row["key"] not in stored or public_id_of(stored[row["key"]]) != public_id:
+                    jobs[row["key"]] = (row["poster_path"], public_id)
+        return self.upload_posters(pool, jobs)
+
+    def import_batch(self, rows, posters):
+        """Writes the batch with the ``posters`` from ``upload_batch``; runs inside the batch transaction."""
+        categories = self.category_ids({row["category"] for row in rows if row["category"]})
+        wanted = {}
+        for row in rows:
+            if row["playlist"]:
+                wanted.setdefault(row["playlist"], categories.get(row["category"]))
+        playlists = self.playlist_ids(wanted)
+
+        existing = {
+            values["import_key"]: values for values in Movie.objects.filter(import_key__in=[row["key"] for row in rows])
+            .values("import_key", "id", "poster", "poster_variants", *COMPARED_FIELDS)
+        }
+        movies = {}
+        for row in rows:
+            old = existing.get(row["key"])
+            movie = Movie(
+                import_key=row["key"], title=row["title"], description=row["description"],
+                download_link=row["download_link"],
+                udrop_link=row["udrop_link"] if row["udrop_link"] or old is None else old["udrop_link"],
+                playlist_id=playlists.get(row["playlist"]), category_id=categories.get(row["category"]),
+                poster=old["poster"] if old else "", poster_variants=old["poster_variants"] if old else {},
+            )
+            if row["key"] in posters:
+                movie.poster = posters[row["key"]]  # VariantsField.pre_save isse srcset banata hai
+            elif old and all(getattr(movie, field) == old[field] for field in COMPARED_FIELDS):
+                self.stats["unchanged"] += 1
+                continue
+            movies[row["key"]] = movie
+
+        if not movies:
+            return []
+        for movie in movies.values():
+            movie.compute_sort_keys()
+        Movie.objects.bulk_create(movies.values(), update_conflicts=True, unique_fields=["import_key"],
+                                  update_fields=UPDATE_FIELDS, batch_size=self.batch_size)
+        ids = dict(Movie.objects.filter(import_key__in=movies).values_list("import_key", "id"))
+        get_search_backend().update_many(Movie, ids.values())
+        self.after_write(movies, ids, existing)
+        return list(ids.values())
+
+    def after_write(self, movies, ids, existing):
+        # bulk_create signals nahi bhejta: signals.py wala kaam yahan, batch me ek baar
+        scopes = {page_cache.SCOPE_CATALOG, page_cache.SCOPE_HOME}
+        touched_playlists = set()
+        for key, movie in movies.items():
+            pk = ids[key]
+            old = existing.get(key)
+            self.stats["updated" if old else "created"] += 1
+            suggest.index_update(suggest.KIND_MOVIE, pk, movie.title)
+            scopes.add(page_cache.scope("movie", pk))
+            for values in ((movie.category_id, movie.playlist_id), (old["category_id"], old["playlist_id"]) if old else ()):
+                for kind, value in zip(("category", "playlist"), values):
+                    if value:
+                        scopes.add(page_cache.scope(kind, value))
+                if values and values[1]:
+                    touched_playlists.add(values[1])
+            if old:
+                transaction.on_commit(lambda pk=pk: invalidate_download(pk))
+        for playlist in Playlist.objects.filter(pk__in=touched_playlists).only("id", "order_mode"):
+            mode = playlist.detect_order_mode()
+            if mode != playlist.order_mode:
+                Playlist.objects.filter(pk=playlist.pk).update(order_mode=mode)
+        page_cache.invalidate(scopes)
+
+    def run(self, path, file_format=None, poster_root=None, resume=False):
+        name = checkpoint_name(path)
+        done = checkpoint(name) if resume else 0
+        poster_root = poster_root or os.path.dirname(os.path.abspath(path))
+        start = time.perf_counter()
+        position = 0
+        batch = []
+
+        def flush():
+            posters = self.upload_batch(pool, batch)
+            with transaction.atomic():
+                self.import_batch(batch, posters)
+                save_checkpoint(name, position)
+            self.stats["batches"] += 1
+            batch.clear()
+            if self.log:
+                elapsed = time.perf_counter() - start
+                self.log(f"  {position} rows: {self.stats['created']} created, {self.stats['updated']} updated, "
+                         f"{self.stats['unchanged']} unchanged, {self.stats['skipped']} skipped "
+                         f"({self.stats['rows'] / elapsed if elapsed else 0:.0f} rows/s)")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="poster-upload") as pool:
+            for line, raw in read_rows(path, file_format):
+                position += 1
+                if position <= done:
+                    continue
+                self.stats["rows"] += 1
+                try:
+                    batch.append(clean_row(raw, poster_root))
+                except RowError as exc:
+                    self.stats["skipped"] += 1
+                    if self.log:
+                        self.log(f"  ⚠️ line {line}: {exc}")
+                    continue
+                if len(batch) >= self.batch_size:
+                    flush()
+            if batch:
+                flush()
+
+        save_checkpoint(name, 0)  # poori file ho gayi: agla run shuru se
+        seconds = time.perf_counter() - start
+        return {**self.stats, "seconds": seconds, "rows_per_second": self.stats["rows"] / seconds if seconds else 0.0}
+
+
+def import_catalog(path, file_format=None, uploader=None, batch_size=None, workers=None, poster_root=None,
+                   resume=False, log=None):
+    """
+    Imports ``path``. Returns ``{"rows", "created", "updated", "unchanged",
+    "skipped", "uploaded", "poster_errors", "categories_created",
+    "playlists_created", "batches", "seconds", "rows_per_second"}``.
+    """
+    importer = CatalogImporter(uploader=uploader, batch_size=batch_size, workers=workers, log=log)
+    return importer.run(path, file_format=file_format, poster_root=poster_root, resume=resume)
@@ -0,0 +1,376 @@
+"""
+Write-behind buffering for ``DownloadLog`` rows.
+
+With ``settings.DOWNLOAD_LOG_BUFFER["ENABLED"]`` on, ``download_movie`` only
+appends the event to an in-process queue and redirects. A flusher thread
+writes the queue with ``bulk_create`` when ``BATCH_SIZE`` events are
+pending or ``FLUSH_INTERVAL_MS`` has passed. The queue is flushed once more
+when the worker exits (``atexit``, which gunicorn runs on graceful
+shutdown).
+
+When ``MAX_PENDING`` events are already queued, ``OVERFLOW`` decides what
+happens:
+
+* ``"block"``: wait for the flusher to make room.
+* ``"drop"``: discard the event; it is counted in ``stats()["dropped"]``.
+* ``"spill"``: append it to the JSONL file at ``SPILL_PATH``. The file is
+  replayed into the database by the next flush.
+
+Every gunicorn worker shares ``SPILL_PATH``. Appends take an exclusive
+``flock`` on ``SPILL_PATH + ".lock"``. A replay first takes a non-blocking
+``flock`` on ``SPILL_PATH + ".replay.lock"``, so only one process replays
+at a time and no event is inserted twice. A replay file that fails
+``MAX_REPLAY_ATTEMPTS`` times in a row is moved aside to
+``SPILL_PATH + ".failed-<timestamp>"`` and logged, so the spills after it
+still reach the database. The attempt count is kept next to it in a
+``.attempts`` file.
+
+A batch whose INSERT fails is also spilled, so the events survive a
+database outage. Events of a movie deleted since the download (a stale
+resolver entry, or a delete before the flush) are written with
+``movie_id`` NULL, like ``on_delete=SET_NULL`` would have left them. A
+batch the database rejects (``IntegrityError``) is retried row by row, and
+only the rejected rows are dropped (``stats()["rejected"]``).
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev: sirf threading lock
+    fcntl = None
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import DownloadLog, Movie
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP = "drop"
+OVERFLOW_SPILL = "spill"
+
+DEFAULTS = {
+    "ENABLED": False,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL_MS": 1000,
+    "MAX_PENDING": 10000,
+    "OVERFLOW": OVERFLOW_SPILL,
+    "SPILL_PATH": os.path.join(settings.BASE_DIR, "var", "download_log_spill.jsonl"),
+    "MAX_REPLAY_ATTEMPTS": 5,
+}
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """Exclusive ``flock`` on ``path`` across processes. Yields False if ``blocking`` is off and it is taken."""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def clear_missing_movies(events):
+    """Sets ``movie_id`` to None in events whose movie no longer exists."""
+    ids = {fields.get("movie_id") for fields in events} - {None}
+    if not ids:
+        return
+    existing = set(Movie.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    for fields in events:
+        if fields.get("movie_id") not in existing:
+            fields["movie_id"] = None
+
+
+class DownloadLogBuffer:
+    def __init__(self, batch_size=200, flush_interval_ms=1000, max_pending=10000,
+                 overflow=OVERFLOW_SPILL, spill_path=None, max_replay_attempts=5, start=True):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SPILL):
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.max_replay_attempts = max_replay_attempts
+
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()  # ek time par ek hi flush
+        self.spill_lock = threading.Lock()
+        self.closed = False
+        self.metrics = {
+            "enqueued": 0, "flushed": 0, "dropped": 0, "spilled": 0, "replayed": 0, "rejected": 0, "quarantined": 0,
+            "flushes": 0, "failed_flushes": 0, "last_flush_ms": 0.0, "max_flush_ms": 0.0,
+        }
+
+        self.thread = None
+        if start:
+            self.thread = threading.Thread(target=self._run, name="download-log-flusher", daemon=True)
+            self.thread.start()
+
+    # ------------------------------------------------------------------
+    # Producer side (request thread)
+    # ------------------------------------------------------------------
+    def add(self, fields):
+        """Queues one event (a dict of DownloadLog fields). Returns False if it was dropped."""
+        flush_now = spill = False
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("DownloadLogBuffer is closed")
+            while len(self.pending) >= self.max_pending:
+                if self.overflow == OVERFLOW_DROP:
+                    self.metrics["dropped"] += 1
+                    return False
+                if self.overflow == OVERFLOW_SPILL:
+                    spill = True
+                    break
+                if self.thread is None:
+                    break  # flusher thread nahi hai, isi thread me jagah banao
+                self.cond.notify_all()
+                self.cond.wait(self.flush_interval)
+            if not spill:
+                self.pending.append(fields)
+                self.metrics["enqueued"] += 1
+                if len(self.pending) >= self.batch_size:
+                    if self.thread is None:
+                        flush_now = True
+                    else:
+                        self.cond.notify_all()
+        if spill:
+            self._spill([fields])  # disk I/O cond ke bahar: baaki producers ruke nahi
+            return True
+        if flush_now:
+            self.flush()
+        return True
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+    def _take(self):
+        with self.cond:
+            batch = list(self.pending)
+            self.pending.clear()
+            self.cond.notify_all()  # "block" policy wale producers ko jagao
+        return batch
+
+    def flush(self):
+        """Writes everything pending (and any spilled events) to the database. Returns rows written."""
+        with self.flush_lock:
+            written = self._write(self._take())
+            written += self._replay_spill()
+        return written
+
+    def _insert(self, events):
+        """
+        Writes ``events``; rows the database rejects are logged and skipped.
+        Returns ``(written, unwritten)``. ``unwritten`` is the tail left over
+        when the row-by-row retry hits a non-integrity error; any other
+        error of the batch insert is raised.
+        """
+        clear_missing_movies(events)
+        try:
+            with transaction.atomic():
+                DownloadLog.objects.bulk_create([DownloadLog(**fields) for fields in events], batch_size=self.batch_size)
+            return len(events), []
+        except IntegrityError:
+            logger.warning("DownloadLog batch of %d events rejected, retrying row by row", len(events))
+        written = 0
+        for index, fields in enumerate(events):
+            try:
+                with transaction.atomic():
+                    DownloadLog.objects.create(**fields)
+            except IntegrityError:
+                logger.exception("Dropped download event the database rejected: %r", fields)
+                self.metrics["rejected"] += 1
+            except Exception:
+                logger.exception("DownloadLog row insert failed")
+                return written, events[index:]
+            else:
+                written += 1
+        return written, []
+
+    def _write(self, events):
+        if not events:
+            return 0
+        start = time.perf_counter()
+        try:
+            written, unwritten = self._insert(events)
+        except Exception:
+            logger.exception("DownloadLog flush of %d events failed, spilling to disk", len(events))
+            self.metrics["failed_flushes"] += 1
+            self._spill(events)
+            return 0
+        if unwritten:
+            self.metrics["failed_flushes"] += 1
+            self._spill(unwritten)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.metrics["flushes"] += 1
+        self.metrics["flushed"] += written
+        self.metrics["last_flush_ms"] = elapsed
+        self.metrics["max_flush_ms"] = max(self.metrics["max_flush_ms"], elapsed)
+        return written
+
+    def _spill(self, events):
+        if not self.spill_path:
+            self.metrics["dropped"] += len(events)
+            logger.error("No SPILL_PATH configured, dropped %d download events", len(events))
+            return
+        lines = "".join(json.dumps(fields, default=str) + "\n" for fields in events)
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        with self.spill_lock, file_lock(self.spill_path + ".lock"):
+            with open(self.spill_path, "a", encoding="utf-8") as spill:
+                spill.write(lines)
+        self.metrics["spilled"] += len(events)
+
+    def _replay_spill(self):
+        if not self.spill_path or not os.path.exists(os.path.dirname(self.spill_path)):
+            return 0
+        # Ek waqt par ek hi process replay kare: warna same events do baar insert hote
+        with file_lock(self.spill_path + ".replay.lock", blocking=False) as acquired:
+            if not acquired:
+                return 0
+            return self._replay_locked()
+
+    def _replay_locked(self):
+        replaying = self.spill_path + ".replaying"
+        attempts_path = replaying + ".attempts"
+        with self.spill_lock, file_lock(self.spill_path + ".lock"):
+            # Pichla replay fail hua tha to woh file pehle
+            if not os.path.exists(replaying):
+                if not os.path.exists(self.spill_path):
+                    return 0
+                os.replace(self.spill_path, replaying)
+
+        with open(replaying, encoding="utf-8") as spill:
+            events = [json.loads(line) for line in spill if line.strip()]
+        for fields in events:
+            fields["download_time"] = parse_datetime(fields["download_time"])
+        try:
+            written, unwritten = self._insert(events)
+        except Exception:
+            logger.exception("Replaying %d spilled download events failed, will retry", len(events))
+            written, unwritten = 0, events
+        if unwritten:
+            # Bache hue events hi agli baar: likhe ja chuke rows dobara nahi
+            with open(replaying + ".tmp", "w", encoding="utf-8") as spill:
+                for fields in unwritten:
+                    spill.write(json.dumps(fields, default=str) + "\n")
+            os.replace(replaying + ".tmp", replaying)
+            self._count_failed_replay(replaying, attempts_path)
+        else:
+            os.remove(replaying)
+            if os.path.exists(attempts_path):
+                os.remove(attempts_path)
+        self.metrics["replayed"] += written
+        return written
+
+    def _count_failed_replay(self, replaying, attempts_path):
+        try:
+            with open(attempts_path, encoding="utf-8") as f:
+                attempts = int(f.read() or 0) + 1
+        except (OSError, ValueError):
+            attempts = 1
+        if attempts < self.max_replay_attempts:
+            with open(attempts_path, "w", encoding="utf-8") as f:
+                f.write(str(attempts))
+            return
+        # Poison file: side me rakho taaki baad ke spills atke nahi
+        failed = f"{self.spill_path}.failed-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        os.replace(replaying, failed)
+        if os.path.exists(attempts_path):
+            os.remove(attempts_path)
+        self.metrics["quarantined"] += 1
+        logger.error("Spilled download events failed %d replays, moved to %s", attempts, failed)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.closed and len(self.pending) < self.batch_size:
+                    self.cond.wait(self.flush_interval)
+                closed = self.closed
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception("DownloadLog flusher error")
+            if closed:
+                connection.close()
+                return
+
+    def close(self):
+        """Stops the flusher and writes whatever is left. Safe to call twice."""
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+
+    def stats(self):
+        with self.cond:
+            depth = len(self.pending)
+        return {"depth": depth, "max_pending": self.max_pending, "overflow": self.overflow, **self.metrics}
+
+
+# ----------------------------------------------------------------------
+# Process-wide buffer
+# ----------------------------------------------------------------------
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def buffer_settings():
+    return {**DEFAULTS, **getattr(settings, "DOWNLOAD_LOG_BUFFER", {})}
+
+
+def get_download_buffer():
+    """The process-wide buffer, or None when write-behind mode is off."""
+    global _buffer
+    conf = buffer_settings()
+    if not conf["ENABLED"]:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = DownloadLogBuffer(
+                    batch_size=conf["BATCH_SIZE"],
+                    flush_interval_ms=conf["FLUSH_INTERVAL_MS"],
+                    max_pending=conf["MAX_PENDING"],
+                    overflow=conf["OVERFLOW"],
+                    spill_path=str(conf["SPILL_PATH"]) if conf["SPILL_PATH"] else None,
+                    max_replay_attempts=conf["MAX_REPLAY_ATTEMPTS"],
+                )
+                atexit.register(_buffer.close)
+    return _buffer
+
+
+def record_download(**fields):
+    """Stores one download event, through the buffer if it is enabled."""
+    buffer = get_download_buffer()
+    if buffer is None:
+        try:
+            DownloadLog.objects.create(**fields)
+        except IntegrityError:
+            # Resolver ki purani entry: movie delete ho chuki hai (autocommit me FK yahin check hota hai)
+            DownloadLog.objects.create(**{**fields, "movie_id": None})
+    else:
+        buffer.add(fields)
@@ -0,0 +1,137 @@
+"""
+Keyset-paginated JSON feed of catalog cards, used for infinite scroll.
+
+Both tables are ordered the same way as the HTML grid: newest
+``created_at`` first (rows without one last), then playlists before movies,
+then highest id first. A cursor is the ``(created_at, kind, id)`` of the
+last card sent, and the next page is read with a keyset predicate on each
+table plus ``LIMIT``, so page 500 costs the same two queries as page 1.
+"""
+import base64
+import binascii
+import heapq
+import json
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import F, Q
+
+from .pagination import KIND_MOVIE, KIND_PLAYLIST
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, kind, pk):
+    payload = json.dumps([created_at.isoformat() if created_at else None, kind, pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, kind, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(created_at) if created_at is not None else None
+        if kind not in (KIND_PLAYLIST, KIND_MOVIE) or not isinstance(pk, int):
+            raise ValueError
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+    return created_at, kind, pk
+
+
+def parse_limit(value):
+    """Page size from the ``limit`` query parameter, clamped to ``1..MAX_LIMIT``."""
+    try:
+        return min(max(int(value), 1), MAX_LIMIT)
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def after_cursor(kind, cursor):
+    """Q() matching the rows of table ``kind`` that sort after ``cursor``."""
+    created_at, cursor_kind, pk = cursor
+    if kind > cursor_kind:
+        same_time = Q()
+    elif kind == cursor_kind:
+        same_time = Q(id__lt=pk)
+    else:
+        same_time = None
+
+    if created_at is None:
+        # Cursor already NULL-wali tail me hai
+        if same_time is None:
+            return Q(pk__in=[])
+        return Q(created_at__isnull=True) & same_time
+
+    older = Q(created_at__lt=created_at) | Q(created_at__isnull=True)
+    if same_time is None:
+        return older
+    return older | (Q(created_at=created_at) & same_time)
+
+
+def sort_key(card):
+    # created_at DESC NULLS LAST, kind ASC, id DESC
+    created_at = card["_created_at"]
+    micros = (created_at - EPOCH) // timedelta(microseconds=1) if created_at else 0
+    return (created_at is None, -micros, card["_kind"], -card["id"])
+
+
+def playlist_card(playlist):
+    return {
+        "id": playlist.id,
+        "type": "playlist",
+        "title": playlist.name,
+        "poster": playlist.banner.url if playlist.banner else None,
+        "created_at": playlist.created_at.isoformat() if playlist.created_at else None,
+        "_kind": KIND_PLAYLIST,
+        "_created_at": playlist.created_at,
+    }
+
+
+def movie_card(movie):
+    return {
+        "id": movie.id,
+        "type": "movie",
+        "title": movie.title,
+        "poster": movie.poster.url if movie.poster else None,
+        "created_at": movie.created_at.isoformat() if movie.created_at else None,
+        "_kind": KIND_MOVIE,
+        "_created_at": movie.created_at,
+    }
+
+
+def build_feed(playlists, movies, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Returns ``(cards, next_cursor)`` for one page of the merged feed.
+
+    Each table is read with its own keyset predicate and ``LIMIT limit + 1``
+    and the two short lists are merged in Python.
+    """
+    ordering = (F("created_at").desc(nulls_last=True), "-id")
+    playlists = playlists.only("id", "name", "banner", "created_at").order_by(*ordering)
+    movies = movies.only("id", "title", "poster", "created_at").order_by(*ordering)
+    if cursor is not None:
+        playlists = playlists.filter(after_cursor(KIND_PLAYLIST, cursor))
+        movies = movies.filter(after_cursor(KIND_MOVIE, cursor))
+
+    merged = heapq.merge(
+        [playlist_card(p) for p in playlists[:limit + 1]],
+        [movie_card(m) for m in movies[:limit + 1]],
+        key=sort_key,
+    )
+    cards = [card for _, card in zip(range(limit + 1), merged)]
+
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        last = cards[-1]
+        next_cursor = encode_cursor(last["_created_at"], last["_kind"], last["id"])
+
+    for card in cards:
+        del card["_kind"], card["_created_at"]
+    return cards, next_cursor
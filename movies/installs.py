@@ -0,0 +1,262 @@
+"""
+Install tracking with a maintained active-install counter.
+
+The number of devices with ``install_count=1`` is kept in ``InstallCounter``
+rows. Instead of one hot row there are ``settings.INSTALL_COUNTER_SHARDS``
+shards, and each device always updates the same shard (a crc32 of its
+id). The total is the sum of the shards. Reading it costs the same no
+matter how many devices are tracked.
+
+The counter moves only on real transitions. ``install_count`` is flipped
+with a conditional UPDATE (``install_count=0`` -> 1, or 1 -> 0), and the
+counter gets its ``F()`` increment only if that UPDATE matched a row. Both
+happen in one transaction. Repeated opens and duplicate uninstalls
+therefore never move it. The batch endpoint (``apply_events``) locks the
+touched rows instead and applies each device's net transition. ``reconcile()`` (``manage.py
+reconcile_install_counter``) recounts the table and repairs any drift,
+e.g. after rows were edited by hand.
+"""
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import InstallCounter, InstallTracker
+
+INSTALLED = 1
+UNINSTALLED = 0
+
+
+def shard_count():
+    return max(1, getattr(settings, "INSTALL_COUNTER_SHARDS", 8))
+
+
+def shard_for(device_id):
+    return zlib.crc32(device_id.encode("utf-8")) % shard_count()
+
+
+def adjust_active_installs(device_id, delta):
+    """Adds ``delta`` to the device's shard. Call inside the transition's transaction."""
+    adjust_shard(shard_for(device_id), delta)
+
+
+def adjust_shard(shard, delta):
+    if not InstallCounter.objects.filter(shard=shard).update(active=F("active") + delta):
+        InstallCounter.objects.get_or_create(shard=shard)
+        InstallCounter.objects.filter(shard=shard).update(active=F("active") + delta)
+
+
+def active_installs():
+    return InstallCounter.objects.aggregate(total=Sum("active"))["total"] or 0
+
+
+def record_install(device_id, device_name):
+    """Returns ``"install"``, ``"reinstall"`` or ``"install (re-open)"``."""
+    now = timezone.now()
+    with transaction.atomic():
+        tracker, created = InstallTracker.objects.get_or_create(
+            device_id=device_id,
+            defaults={"device_name": device_name, "install_count": INSTALLED, "last_action": "install"},
+        )
+        if created:
+            adjust_active_installs(device_id, 1)
+            return "install"
+
+        reinstalled = InstallTracker.objects.filter(pk=tracker.pk, install_count=UNINSTALLED).update(
+            install_count=INSTALLED, device_name=device_name, last_action="reinstall", updated_at=now,
+        )
+        if reinstalled:
+            adjust_active_installs(device_id, 1)
+            return "reinstall"
+
+        InstallTracker.objects.filter(pk=tracker.pk).update(
+            device_name=device_name, last_action="install (re-open)", updated_at=now,
+        )
+        return "install (re-open)"
+
+
+def record_uninstall(device_id):
+    """Returns False if the device was never tracked."""
+    with transaction.atomic():
+        uninstalled = InstallTracker.objects.filter(device_id=device_id, install_count=INSTALLED).update(
+            install_count=UNINSTALLED, last_action="uninstall", updated_at=timezone.now(),
+        )
+        if uninstalled:
+            adjust_active_installs(device_id, -1)
+            return True
+        return InstallTracker.objects.filter(device_id=device_id).exists()
+
+
+def forget_devices(queryset):
+    """Deletes trackers and takes their active installs off the counter."""
+    with transaction.atomic():
+        for device_id in queryset.filter(install_count=INSTALLED).values_list("device_id", flat=True).iterator():
+            adjust_active_installs(device_id, -1)
+        return queryset.delete()[0]
+
+
+def reset_counter():
+    InstallCounter.objects.update(active=0)
+
+
+def reconcile():
+    """Recounts active installs into the shards. Returns ``(before, after)``."""
+    with transaction.atomic():
+        # Pehle counter rows lock karo, phir gino: beech ke transitions lock ke baad apna delta lagate hain
+        shards = {row.shard: row for row in InstallCounter.objects.select_for_update().order_by("shard")}
+        before = sum(row.active for row in shards.values())
+
+        actual = dict.fromkeys(range(shard_count()), 0)
+        active = InstallTracker.objects.filter(install_count=INSTALLED).values_list("device_id", flat=True)
+        for device_id in active.iterator(chunk_size=5000):
+            actual[shard_for(device_id)] += 1
+
+        for shard, count in actual.items():
+            row = shards.pop(shard, None)
+            if row is None:
+                InstallCounter.objects.create(shard=shard, active=count)
+            elif row.active != count:
+                InstallCounter.objects.filter(pk=row.pk).update(active=count)
+        # INSTALL_COUNTER_SHARDS kam kiya gaya ho to bache hue shards
+        InstallCounter.objects.filter(pk__in=[row.pk for row in shards.values()]).delete()
+    return before, sum(actual.values())
+
+
+# ----------------------------------------------------------------------
+# Batched events (/api/installs/batch/)
+# ----------------------------------------------------------------------
+EVENT_INSTALL = "install"
+EVENT_UNINSTALL = "uninstall"
+EVENT_OPEN = "open"  # PWA launch: app installed hai
+EVENT_TYPES = (EVENT_INSTALL, EVENT_UNINSTALL, EVENT_OPEN)
+MAX_EVENTS = 200
+MAX_CLOCK_SKEW = timedelta(days=1)
+
+
+class InvalidEvents(ValueError):
+    pass
+
+
+class Event:
+    __slots__ = ("id", "device_id", "type", "at", "device_name")
+
+    def __init__(self, event_id, device_id, event_type, at, device_name):
+        self.id = event_id
+        self.device_id = device_id
+        self.type = event_type
+        self.at = at
+        self.device_name = device_name
+
+    @property
+    def key(self):
+        return (self.at, self.id)
+
+
+def parse_events(payload, default_device_name=""):
+    """
+    Validates ``{"events": [...]}`` (or a bare list). Each event has ``id``,
+    ``device_id``, ``type`` and ``ts`` (client time, ms since epoch), and may
+    have ``device_name``. Returns ``(events, rejected)``.
+    """
+    items = payload.get("events") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise InvalidEvents("Expected a list of events")
+    if len(items) > MAX_EVENTS:
+        raise InvalidEvents(f"At most {MAX_EVENTS} events per batch")
+
+    latest = timezone.now() + MAX_CLOCK_SKEW
+    events, rejected = [], 0
+    for item in items:
+        try:
+            event_id, device_id, event_type = str(item["id"])[:64], str(item["device_id"])[:255], item["type"]
+            at = datetime.fromtimestamp(float(item["ts"]) / 1000, tz=dt_timezone.utc)
+        except (KeyError, TypeError, ValueError, OverflowError, OSError):
+            rejected += 1
+            continue
+        if not event_id or not device_id or event_type not in EVENT_TYPES or at > latest:
+            rejected += 1
+            continue
+        device_name = str(item.get("device_name") or default_device_name)[:100]
+        events.append(Event(event_id, device_id, event_type, at, device_name))
+    return events, rejected
+
+
+def apply_events(events):
+    """
+    Applies a batch in a fixed number of statements, whatever its size.
+
+    Per device, events are sorted by ``(ts, id)``. Those at or below the
+    device's watermark were applied before (a retried batch) and are
+    skipped. The last install/open/uninstall decides ``install_count``.
+    New devices are inserted as uninstalled placeholders (insert-or-ignore),
+    every touched row is locked, and the final state is written with one
+    ``INSERT ... ON CONFLICT (device_id) DO UPDATE``. Counter shards change
+    only by the net 0->1 / 1->0 transitions. Returns ``(applied, duplicates)``.
+    """
+    by_device = defaultdict(dict)
+    for event in events:
+        by_device[event.device_id][event.id] = event  # same id dobara aaye to ek hi
+    duplicates = len(events) - sum(len(device_events) for device_events in by_device.values())
+    if not by_device:
+        return 0, duplicates
+
+    now = timezone.now()
+    applied = 0
+    deltas = defaultdict(int)
+    with transaction.atomic():
+        InstallTracker.objects.bulk_create(
+            [InstallTracker(device_id=device_id, install_count=UNINSTALLED, last_action="pending")
+             for device_id in by_device],
+            ignore_conflicts=True,
+        )
+        trackers = InstallTracker.objects.select_for_update().filter(device_id__in=by_device).order_by("device_id")
+
+        rows = []
+        for tracker in trackers:
+            watermark = (tracker.last_event_at, tracker.last_event_id) if tracker.last_event_at else None
+            pending = sorted(by_device[tracker.device_id].values(), key=lambda event: event.key)
+            fresh = [event for event in pending if watermark is None or event.key > watermark]
+            duplicates += len(pending) - len(fresh)
+            if not fresh:
+                continue
+
+            was_installed = tracker.install_count == INSTALLED
+            installed, is_new = was_installed, tracker.last_action == "pending"
+            for event in fresh:
+                if event.type == EVENT_UNINSTALL:
+                    installed, action = False, "uninstall"
+                elif event.type == EVENT_OPEN or installed:
+                    installed, action = True, "install (re-open)"
+                else:
+                    installed, action = True, "install" if is_new else "reinstall"
+                is_new = False
+            if installed != was_installed:
+                deltas[shard_for(tracker.device_id)] += 1 if installed else -1
+
+            last = fresh[-1]
+            # pk ke bina naya object: upsert sirf device_id par conflict karta hai
+            rows.append(InstallTracker(
+                device_id=tracker.device_id,
+                device_name=last.device_name or tracker.device_name,
+                install_count=INSTALLED if installed else UNINSTALLED,
+                last_action=action,
+                last_event_at=last.at,
+                last_event_id=last.id,
+                updated_at=now,
+            ))
+            applied += len(fresh)
+
+        InstallTracker.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["device_id"],
+            update_fields=["install_count", "last_action", "device_name", "last_event_at", "last_event_id", "updated_at"],
+        )
+        for shard, delta in deltas.items():
+            if delta:
+                adjust_shard(shard, delta)
+    return applied, duplicates
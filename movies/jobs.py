@@ -0,0 +1,379 @@
+"""
+Database-backed background jobs (``manage.py run_workers``).
+
+Slow side effects used to run inline in a request or from hand-run
+scripts. They are now ``Job`` rows. ``enqueue("send_mail", subject=...)``
+inserts one in the caller's transaction, so a job from a rolled-back
+request never runs, and the request returns without waiting on any
+outbound call.
+
+Tasks are plain functions registered with ``@task(name)``. They are
+called with the job's ``kwargs``. This module registers ``noop``,
+``send_mail``, ``manage`` (any management command, e.g.
+``drain_asset_deletions``) and ``purge_jobs``.
+
+Workers claim due jobs in batches of ``BATCH_SIZE``. On PostgreSQL the
+claim is ``SELECT ... FOR UPDATE SKIP LOCKED``, so workers never wait on
+each other's rows. SQLite has neither row locks nor SKIP LOCKED. There the
+claim is a conditional ``UPDATE ... WHERE status = 'queued'`` (SQLite
+runs one writer at a time), and the worker keeps the rows that carry its
+own claim token. Either way a claim gives the jobs a lease
+(``locked_until``). A heartbeat thread extends the lease while the worker
+holds the jobs. Jobs of a worker that died are claimed again once their
+lease has run out.
+
+A failing job is retried with exponential backoff and jitter until it
+has used ``max_attempts``. After that it stays ``failed``, with its
+traceback in ``last_error``. A job with ``run_at`` in the future is a
+scheduled job. ``settings.JOBS["SCHEDULE"]`` lists the recurring jobs.
+Each has at most one pending row (a partial unique index on
+``schedule``), and finishing it queues the next run ``every`` seconds
+later.
+"""
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+DEFAULTS = {
+    "CONCURRENCY": 2,
+    "BATCH_SIZE": 10,
+    "POLL_INTERVAL": 1.0,
+    "LEASE_SECONDS": 300,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_SECONDS": 10,
+    "MAX_BACKOFF_SECONDS": 3600,
+    "KEEP_DAYS": 7,
+    "SCHEDULE": {},  # naam -> {"task", "kwargs", "every"}
+}
+
+PENDING = (Job.QUEUED, Job.RUNNING)
+
+TASKS = {}
+
+
+def job_settings():
+    return {**DEFAULTS, **getattr(settings, "JOBS", {})}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, /, *, run_at=None, delay=None, max_attempts=None, **kwargs):
+    """Queues task ``name`` with ``kwargs`` (JSON-serialisable), now, at ``run_at`` or ``delay`` seconds from now."""
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    return Job.objects.create(
+        task=name, kwargs=kwargs, run_at=run_at, max_attempts=max_attempts or job_settings()["MAX_ATTEMPTS"],
+    )
+
+
+def backoff(attempts, conf):
+    delay = min(conf["BACKOFF_SECONDS"] * 2 ** max(attempts - 1, 0), conf["MAX_BACKOFF_SECONDS"])
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+# ----------------------------------------------------------------------
+# Recurring jobs
+# ----------------------------------------------------------------------
+def scheduled_job(key, entry, run_at, conf):
+    return Job(task=entry["task"], kwargs=entry.get("kwargs", {}), schedule=key, run_at=run_at,
+               max_attempts=entry.get("max_attempts", conf["MAX_ATTEMPTS"]))
+
+
+def ensure_schedule(now=None):
+    """Queues every recurring job that has no pending row. Returns how many were queued."""
+    conf = job_settings()
+    now = now or timezone.now()
+    pending = set(Job.objects.filter(schedule__in=list(conf["SCHEDULE"]), status__in=PENDING)
+                  .values_list("schedule", flat=True))
+    missing = [scheduled_job(key, entry, now, conf) for key, entry in conf["SCHEDULE"].items() if key not in pending]
+    # Doosra worker saath me daal de to partial unique index rok leta hai
+    Job.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(missing)
+
+
+def schedule_next(job, now, conf):
+    entry = conf["SCHEDULE"].get(job.schedule)
+    if entry is None:
+        return  # settings se hata diya gaya
+    run_at = now + timedelta(seconds=entry["every"])
+    Job.objects.bulk_create([scheduled_job(job.schedule, entry, run_at, conf)], ignore_conflicts=True)
+
+
+# ----------------------------------------------------------------------
+# Claim / finish
+# ----------------------------------------------------------------------
+def queued(now):
+    return Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+
+
+def expired(now):
+    # Running, but the lease ran out: its worker died
+    return Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+
+
+def claim(worker_id, limit, lease_seconds, now=None):
+    """Claims up to ``limit`` due jobs for ``worker_id``. Returns them in run order (empty when none are due)."""
+    now = now or timezone.now()
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    with transaction.atomic():
+        ids = []
+        # Do alag queries: OR ke saath (status, run_at) index kaam nahi aata
+        for candidates in (queued(now), expired(now)):
+            if len(ids) >= limit:
+                break
+            candidates = candidates.order_by("run_at", "id")
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            ids += candidates.values_list("id", flat=True)[:limit - len(ids)]
+        if not ids:
+            return []
+        # SQLite: condition dobara check hoti hai, isliye saath me claim karne wale worker ki rows yahan chhoot jaati hain
+        (queued(now) | expired(now)).filter(pk__in=ids).update(
+            status=Job.RUNNING, locked_by=token, locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+        )
+        return list(Job.objects.filter(pk__in=ids, locked_by=token).order_by("run_at", "id"))
+
+
+def finish(job, error, conf):
+    """Records the outcome of a claimed job. A job whose lease was taken over by another worker is left alone."""
+    now = timezone.now()
+    if error is None:
+        job.status, changes = Job.DONE, {"finished_at": now, "last_error": ""}
+    elif job.attempts < job.max_attempts:
+        job.status, changes = Job.QUEUED, {"run_at": now + backoff(job.attempts, conf), "last_error": error[-5000:]}
+    else:
+        job.status, changes = Job.FAILED, {"finished_at": now, "last_error": error[-5000:]}
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING)
+    if not job.schedule or job.status == Job.QUEUED:
+        mine.update(status=job.status, locked_until=None, **changes)  # ek UPDATE, transaction ki zaroorat nahi
+        return job.status
+    with transaction.atomic():
+        if mine.update(status=job.status, locked_until=None, **changes):
+            schedule_next(job, now, conf)
+    return job.status
+
+
+def release(jobs):
+    """Gives claimed jobs that were never started back to the queue (worker shutting down)."""
+    for job in jobs:
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING).update(
+            status=Job.QUEUED, locked_until=None, attempts=F("attempts") - 1,
+        )
+
+
+def execute(job, conf):
+    """Runs one claimed job and records the result. Returns its new status."""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task: {job.task}")
+        if job.attempts > job.max_attempts:
+            raise RuntimeError("Lease expired on the last attempt")  # worker mar gaya tha
+        func(**job.kwargs)
+    except Exception:
+        if job.attempts > job.max_attempts:
+            job.attempts = job.max_attempts
+        return finish(job, traceback.format_exc(), conf)
+    return finish(job, None, conf)
+
+
+# ----------------------------------------------------------------------
+# Workers
+# ----------------------------------------------------------------------
+class Heartbeat:
+    """Thread that pushes ``locked_until`` forward on the jobs a worker holds, every third of the lease."""
+
+    def __init__(self, worker_id, lease_seconds):
+        self.lease_seconds = lease_seconds
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.beat, name=f"job-heartbeat-{worker_id}", daemon=True)
+
+    def hold(self, jobs):
+        with self.lock:
+            self.held.update(job.pk for job in jobs)
+
+    def drop(self, job):
+        with self.lock:
+            self.held.discard(job.pk)
+
+    def beat(self):
+        used_db = False
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                with self.lock:
+                    ids = list(self.held)
+                if ids:
+                    used_db = True
+                    Job.objects.filter(pk__in=ids, status=Job.RUNNING).update(
+                        locked_until=timezone.now() + timedelta(seconds=self.lease_seconds),
+                    )
+        finally:
+            if used_db:
+                connection.close()  # is thread ka apna connection
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+class Worker:
+    """
+    Claims and runs jobs until stopped. ``burst=True`` returns as soon as
+    nothing is due, and ``max_jobs`` stops after that many jobs.
+    """
+
+    def __init__(self, batch_size=None, poll_interval=None, lease_seconds=None, burst=False, max_jobs=None,
+                 schedule=True, name=None):
+        conf = self.conf = job_settings()
+        self.batch_size = batch_size or conf["BATCH_SIZE"]
+        self.poll_interval = conf["POLL_INTERVAL"] if poll_interval is None else poll_interval
+        self.lease_seconds = lease_seconds or conf["LEASE_SECONDS"]
+        self.burst = burst
+        self.max_jobs = max_jobs
+        self.schedule = schedule
+        self.id = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self.counts = {Job.DONE: 0, Job.QUEUED: 0, Job.FAILED: 0}
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    @property
+    def processed(self):
+        return sum(self.counts.values())
+
+    def run_once(self, heartbeat):
+        """Claims one batch and runs it. Returns the number of jobs run, or None if the database was busy."""
+        limit = self.batch_size
+        if self.max_jobs is not None:
+            limit = min(limit, self.max_jobs - self.processed)
+        try:
+            jobs = claim(self.id, limit, self.lease_seconds)
+        except OperationalError:
+            return None  # SQLite "database is locked": thodi der baad phir
+        heartbeat.hold(jobs)
+        for index, job in enumerate(jobs):
+            if self.stopping.is_set():
+                release(jobs[index:])
+                return index
+            self.counts[execute(job, self.conf)] += 1
+            heartbeat.drop(job)
+        return len(jobs)
+
+    def run(self):
+        if self.schedule:
+            ensure_schedule()
+        with Heartbeat(self.id, self.lease_seconds) as heartbeat:
+            while not self.stopping.is_set():
+                if not connection.in_atomic_block:  # benchmark/tests ke rolled-back transaction me nahi
+                    close_old_connections()
+                ran = self.run_once(heartbeat)
+                if self.max_jobs is not None and self.processed >= self.max_jobs:
+                    break
+                if ran == 0 and self.burst:
+                    break
+                if not ran:
+                    self.stopping.wait(self.poll_interval)
+        return self.counts
+
+
+def _worker_process(options):
+    worker = Worker(**options)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    try:
+        worker.run()
+    finally:
+        connections.close_all()
+
+
+def run_workers(concurrency=None, **options):
+    """
+    Runs ``concurrency`` worker processes (forked) until they stop; SIGTERM
+    / SIGINT let each finish its current job first. With one worker it runs
+    in this process and returns its counts.
+    """
+    concurrency = concurrency or job_settings()["CONCURRENCY"]
+    if concurrency <= 1:
+        worker = Worker(**options)
+        previous = signal.signal(signal.SIGTERM, worker.stop), signal.signal(signal.SIGINT, worker.stop)
+        try:
+            return worker.run()
+        finally:
+            signal.signal(signal.SIGTERM, previous[0])
+            signal.signal(signal.SIGINT, previous[1])
+
+    if options.get("schedule", True):
+        ensure_schedule()
+    options["schedule"] = False
+    connections.close_all()  # fork se pehle: children apne connections kholenge
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_worker_process, args=(options,), name=f"job-worker-{i}")
+                 for i in range(concurrency)]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+    return None
+
+
+# ----------------------------------------------------------------------
+# Tasks
+# ----------------------------------------------------------------------
+@task("noop")
+def noop(**kwargs):
+    pass
+
+
+@task("send_mail")
+def send_mail(subject, message, recipient_list, from_email=None, html_message=None):
+    mail.send_mail(subject, message, from_email, recipient_list, fail_silently=False, html_message=html_message)
+
+
+@task("manage")
+def manage(command, args=(), options=None):
+    call_command(command, *args, **(options or {}))
+
+
+@task("purge_jobs")
+def purge_jobs(days=None):
+    """Deletes finished jobs older than ``KEEP_DAYS``. Failed ones stay for the admin."""
+    days = job_settings()["KEEP_DAYS"] if days is None else days
+    Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - timedelta(days=days)).delete()
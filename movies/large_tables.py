@@ -0,0 +1,278 @@
+"""
+Admin changelists for the log tables (``DownloadLog``, ``InstallTracker``).
+
+With millions of rows Django's default changelist does a lot of work on
+every page. It runs ``COUNT(*)`` twice, once filtered and once for the
+"N total" link. It pages with ``OFFSET``, which reads and throws away every
+row before the page. Its ``date_hierarchy`` runs ``SELECT DISTINCT`` date
+truncations over the whole range. ``icontains`` search can use no index.
+``LargeTableAdminMixin`` replaces each of these:
+
+* Paging is keyset based on ``(keyset_field, id)``, newest first. The
+  Older/Newer links carry a ``before``/``after`` cursor of the edge row.
+  The page is one ``LIMIT per_page + 1`` index range scan, so the last
+  page costs the same as the first. Sorting by a column falls back to
+  ``OFFSET`` pages.
+* ``EstimatedCountPaginator`` does the counting. Unfiltered on PostgreSQL
+  it uses the planner's estimate (``metrics.estimated_rows_sql``).
+  Otherwise it counts at most ``COUNT_LIMIT`` rows and shows "10000+".
+  ``show_full_result_count`` is off.
+* The ``date_hierarchy`` choices (``large_table_tags.large_date_hierarchy``)
+  come from the oldest and newest filtered row (two index lookups) and the
+  calendar, not from a ``DISTINCT`` scan. A month or day without rows can
+  therefore show up.
+* Search only uses indexed lookups:
+  * An address, dotted prefix (``10.1.``) or CIDR block (``10.1.0.0/16``)
+    matches ``ip_search_field``. On PostgreSQL it is an ``inet`` range.
+  * Any other term matches ``exact_search_fields`` exactly.
+  * ``related_search_fields`` (e.g. ``{"movie": "title"}``) looks up the
+    ids of matching related rows first, then filters the indexed FK.
+"""
+import ipaddress
+import re
+from datetime import date, datetime
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils import formats, timezone
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from .metrics import estimated_rows_sql
+
+COUNT_LIMIT = 10_000
+BEFORE_VAR = "before"
+AFTER_VAR = "after"
+CURSOR_VARS = (BEFORE_VAR, AFTER_VAR)
+DOTTED_PREFIX_RE = re.compile(r"^(\d{1,3}\.){1,3}$")
+
+
+class EstimatedCountPaginator(Paginator):
+    """``count`` without a full ``COUNT(*)``: ``estimated`` or ``capped`` tells the template it is not exact."""
+
+    estimated = False
+    capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            sql, params, _ = estimated_rows_sql(queryset.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                estimate = cursor.fetchone()[0]
+            if estimate > COUNT_LIMIT:
+                self.estimated = True
+                return estimate
+        counted = queryset.order_by()[:COUNT_LIMIT + 1].count()
+        if counted > COUNT_LIMIT:
+            self.capped = True
+            return COUNT_LIMIT
+        return counted
+
+
+def encode_cursor(value, pk):
+    return f"{value.isoformat()}_{pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        value, _, pk = cursor.rpartition("_")
+        return datetime.fromisoformat(value), int(pk)
+    except ValueError:
+        raise IncorrectLookupParameters("Invalid cursor")
+
+
+class KeysetChangeList(ChangeList):
+    """``ChangeList`` whose default (newest first) ordering is paged by cursor; see the module docstring."""
+
+    keyset = None
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for var in CURSOR_VARS:
+            lookup_params.pop(var, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, sort aur date links pehle page se shuru hon
+        new_params = new_params or {}
+        remove = [*(remove or ()), *(var for var in CURSOR_VARS if var not in new_params)]
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        field = self.model_admin.keyset_field
+        if not field or ORDER_VAR in self.params or ALL_VAR in self.params:
+            return super().get_results(request)
+
+        per_page = self.list_per_page
+        queryset = self.queryset
+        before, after = self.params.get(BEFORE_VAR), self.params.get(AFTER_VAR)
+        newer = older = False
+        rows = None
+        if after:
+            value, pk = decode_cursor(after)
+            rows = list(queryset.filter(Q(**{f"{field}__gte": value}) & (Q(**{f"{field}__gt": value}) | Q(pk__gt=pk)))
+                        .order_by(field, "pk")[:per_page + 1])
+            if len(rows) > per_page:
+                rows, newer, older = rows[:per_page][::-1], True, True
+            else:
+                rows = None  # sabse naye rows tak pahunch gaye: pehla page dikhao
+        if rows is None:
+            if before and not after:
+                value, pk = decode_cursor(before)
+                queryset = queryset.filter(Q(**{f"{field}__lte": value}) & (Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)))
+                newer = True
+            rows = list(queryset[:per_page + 1])
+            older = len(rows) > per_page
+            rows = rows[:per_page]
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, per_page)
+        self.result_count = paginator.count
+        self.paginator = paginator
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = False
+        self.keyset = {
+            "newest": self.get_query_string() if newer else None,
+            "newer": self.get_query_string({AFTER_VAR: encode_cursor(getattr(rows[0], field), rows[0].pk)}) if newer and rows else None,
+            "older": self.get_query_string({BEFORE_VAR: encode_cursor(getattr(rows[-1], field), rows[-1].pk)}) if older else None,
+        }
+
+
+def ip_filter(field, term):
+    """Q() for an address, a dotted prefix (``10.1.``) or a CIDR block; None if ``term`` is none of these."""
+    try:
+        return Q(**{field: str(ipaddress.ip_address(term))})
+    except ValueError:
+        pass
+    if DOTTED_PREFIX_RE.match(term):
+        octets = term.rstrip(".").split(".")
+        term = ".".join(octets + ["0"] * (4 - len(octets))) + f"/{8 * len(octets)}"
+    elif "/" not in term:
+        return None
+    try:
+        network = ipaddress.ip_network(term, strict=False)
+    except ValueError:
+        return None
+    if connection.vendor == "postgresql":
+        # inet column: btree range scan
+        return Q(**{f"{field}__gte": str(network.network_address), f"{field}__lte": str(network.broadcast_address)})
+    # Text column (SQLite dev): prefix, poore octet tak
+    if network.version == 4:
+        octets = str(network.network_address).split(".")[:network.prefixlen // 8]
+        prefix = ".".join(octets) + "." if octets else ""
+    else:
+        prefix = str(network.network_address).split("::")[0]
+    return Q(**{f"{field}__startswith": prefix})
+
+
+class LargeTableAdminMixin:
+    """Mix in before ``admin.ModelAdmin``; see the module docstring."""
+
+    keyset_field = None
+    ip_search_field = None
+    exact_search_fields = ()
+    related_search_fields = {}
+    related_search_limit = 500
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    change_list_template = "admin/large_table_change_list.html"
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_ordering(self, request):
+        if self.keyset_field:
+            return (f"-{self.keyset_field}", "-pk")
+        return super().get_ordering(request)
+
+    def get_search_fields(self, request):
+        # Sirf search box dikhane ke liye; search get_search_results karta hai
+        related = (f"{fk}__{field}" for fk, field in self.related_search_fields.items())
+        return tuple(filter(None, (self.ip_search_field, *self.exact_search_fields, *related)))
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if self.ip_search_field:
+            found = ip_filter(self.ip_search_field, term)
+            if found is not None:
+                return queryset.filter(found), False
+        q = Q()
+        for field in self.exact_search_fields:
+            q |= Q(**{field: term})
+        for fk, field in self.related_search_fields.items():
+            related = self.model._meta.get_field(fk).related_model
+            ids = list(related._default_manager.filter(**{f"{field}__icontains": term})
+                       .values_list("pk", flat=True)[:self.related_search_limit])
+            if ids:
+                q |= Q(**{f"{fk}__in": ids})
+        return (queryset.filter(q) if q else queryset.none()), False
+
+
+def date_hierarchy(cl):
+    """Context of ``admin/date_hierarchy.html``, like Django's tag but from the first and last row only."""
+    field = cl.date_hierarchy
+    year_field, month_field, day_field = f"{field}__year", f"{field}__month", f"{field}__day"
+    year, month, day = (cl.params.get(name) for name in (year_field, month_field, day_field))
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field}__"])
+
+    if year and month and day:
+        current = date(int(year), int(month), int(day))
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year, month_field: month}),
+                     "title": capfirst(formats.date_format(current, "YEAR_MONTH_FORMAT"))},
+            "choices": [{"title": capfirst(formats.date_format(current, "MONTH_DAY_FORMAT"))}],
+        }
+
+    # Do alag ORDER BY ... LIMIT 1: SQLite ek query me MIN aur MAX dono par index nahi lagata
+    edges = cl.queryset.order_by(field).values_list(field, flat=True)
+    first, last = edges.first(), edges.last()
+    if first is None or last is None:
+        return {"show": True, "back": {"link": link({}), "title": _("All dates")} if year else None, "choices": []}
+    first, last = (timezone.localtime(v) if timezone.is_aware(v) else v for v in (first, last))
+    if not year and first.year == last.year:
+        year = first.year
+        if first.month == last.month:
+            month = first.month
+
+    if year and month:
+        year, month = int(year), int(month)
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year}), "title": str(year)},
+            "choices": [
+                {"link": link({year_field: year, month_field: month, day_field: number}),
+                 "title": capfirst(formats.date_format(date(year, month, number), "MONTH_DAY_FORMAT"))}
+                for number in range(first.day, last.day + 1)
+            ],
+        }
+    if year:
+        year = int(year)
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {"link": link({year_field: year, month_field: number}),
+                 "title": capfirst(formats.date_format(date(year, number, 1), "YEAR_MONTH_FORMAT"))}
+                for number in range(first.month, last.month + 1)
+            ],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [{"link": link({year_field: str(number)}), "title": str(number)}
+                    for number in range(first.year, last.year + 1)],
+    }
@@ -0,0 +1,222 @@
+"""
+Concurrent link health checker (``manage.py check_links``).
+
+It replaces the old ``tasks/refresh_pixeldrain.py`` loop. That loop did a
+full ``requests.get`` per movie, one at a time, followed by a 5 second
+sleep. Here each link gets one small probe: by default a ``GET`` with
+``Range: bytes=0-0``, which still counts as an access for hosts that
+expire idle files, or optionally a ``HEAD``. Responses are opened with
+``stream=True`` and closed without reading the body. The probes run on a
+thread pool. Each thread has its own ``requests.Session``, so connections
+to a host are reused.
+
+Politeness is per host. A ``BoundedSemaphore`` caps the probes in flight
+to one host (``PER_HOST``), and a token bucket caps their rate (``RATE``
+per second, bursts of ``BURST``). A slow host therefore never holds up
+the others beyond its own share of the pool.
+
+Movies are streamed with ``only("id", "download_link", "udrop_link")``
+and ``iterator()``, and only a bounded number of probes are queued at a
+time. Results are upserted into ``LinkCheck`` (one row per movie and link
+field) in batches of ``BATCH_SIZE``.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .models import LinkCheck, Movie
+
+DEFAULTS = {
+    "CONCURRENCY": 16,
+    "PER_HOST": 4,
+    "RATE": 2.0,  # probes per second per host
+    "BURST": 4,
+    "TIMEOUT": 10,
+    "METHOD": "range",  # "range" (GET bytes=0-0) ya "head"
+    "BATCH_SIZE": 200,
+    "USER_AGENT": "BasharatMoviesHub-LinkCheck/1.0",
+}
+
+FIELDS = ("download_link", "udrop_link")
+
+
+def link_check_settings():
+    return {**DEFAULTS, **getattr(settings, "LINK_CHECK", {})}
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` saved up. ``acquire()`` blocks until one is free."""
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            self.sleep(wait_for)
+
+
+class HostLimits:
+    """Per-host semaphore and token bucket, created on first use."""
+
+    def __init__(self, per_host, rate, burst):
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = (threading.BoundedSemaphore(self.per_host), TokenBucket(self.rate, self.burst))
+            return self.hosts[host]
+
+
+class Result:
+    __slots__ = ("movie_id", "field", "url", "ok", "status_code", "latency_ms", "error")
+
+    def __init__(self, movie_id, field, url, ok=False, status_code=None, latency_ms=None, error=""):
+        self.movie_id = movie_id
+        self.field = field
+        self.url = url
+        self.ok = ok
+        self.status_code = status_code
+        self.latency_ms = latency_ms
+        self.error = error
+
+
+class LinkChecker:
+    def __init__(self, concurrency=16, per_host=4, rate=2.0, burst=4, timeout=10, method="range", user_agent=""):
+        self.concurrency = concurrency
+        self.limits = HostLimits(per_host, rate, burst)
+        self.timeout = timeout
+        self.method = method
+        self.user_agent = user_agent
+        self.local = threading.local()
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        conf = {key.lower(): value for key, value in link_check_settings().items()}
+        conf.update((key, value) for key, value in overrides.items() if value is not None)
+        conf.pop("batch_size", None)
+        return cls(**conf)
+
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=self.limits.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if self.user_agent:
+                session.headers["User-Agent"] = self.user_agent
+        return session
+
+    def request(self, method, url, headers):
+        response = self.session().request(
+            method, url, headers=headers, timeout=self.timeout, stream=True, allow_redirects=True,
+        )
+        response.close()  # body nahi padhna, sirf status
+        return response.status_code
+
+    def probe(self, movie_id, field, url):
+        try:
+            host = urlsplit(url).netloc.lower()
+        except ValueError as exc:
+            return Result(movie_id, field, url, error=f"{type(exc).__name__}: {exc}"[:255])
+        semaphore, bucket = self.limits.get(host)
+        with semaphore:
+            bucket.acquire()
+            start = time.perf_counter()
+            try:
+                if self.method == "head":
+                    status = self.request("HEAD", url, {})
+                    if status in (405, 501):  # HEAD allowed nahi: range GET
+                        status = self.request("GET", url, {"Range": "bytes=0-0"})
+                else:
+                    status = self.request("GET", url, {"Range": "bytes=0-0"})
+            except Exception as exc:  # requests ke bahar ki galti (InvalidURL, LocationParseError...) bhi sirf is link ki
+                latency = int((time.perf_counter() - start) * 1000)
+                return Result(movie_id, field, url, latency_ms=latency, error=f"{type(exc).__name__}: {exc}"[:255])
+            latency = int((time.perf_counter() - start) * 1000)
+            return Result(movie_id, field, url, ok=200 <= status < 400, status_code=status, latency_ms=latency)
+
+    def run(self, targets, on_result):
+        """``targets`` yields ``(movie_id, field, url)``; ``on_result`` is called from this thread for each result."""
+        max_pending = self.concurrency * 4
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="link-check") as pool:
+            pending = set()
+            for target in targets:
+                pending.add(pool.submit(self.probe, *target))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        on_result(future.result())
+            for future in wait(pending).done:
+                on_result(future.result())
+
+
+def link_targets(queryset=None, fields=FIELDS):
+    queryset = Movie.objects.all() if queryset is None else queryset
+    for movie in queryset.only("id", *FIELDS).order_by("pk").iterator(chunk_size=500):
+        for field in fields:
+            url = getattr(movie, field)
+            if url:
+                yield movie.id, field, url
+
+
+def save_results(results):
+    now = timezone.now()
+    # Run ke beech delete hui movies ka result chhod do, warna upsert FK par fail hota hai
+    existing = set(Movie.objects.filter(pk__in={r.movie_id for r in results}).values_list("pk", flat=True))
+    LinkCheck.objects.bulk_create(
+        [LinkCheck(movie_id=r.movie_id, field=r.field, url=r.url[:500], ok=r.ok, status_code=r.status_code,
+                   latency_ms=r.latency_ms, error=r.error, last_checked=now) for r in results if r.movie_id in existing],
+        update_conflicts=True,
+        unique_fields=["movie", "field"],
+        update_fields=["url", "ok", "status_code", "latency_ms", "error", "last_checked"],
+    )
+
+
+def check_links(queryset=None, fields=FIELDS, checker=None, batch_size=None, log=None):
+    """Probes every link and stores the results. Returns ``{"checked", "ok", "broken"}``."""
+    checker = checker or LinkChecker.from_settings()
+    batch_size = batch_size or link_check_settings()["BATCH_SIZE"]
+    totals = {"checked": 0, "ok": 0, "broken": 0}
+    batch = []
+
+    def on_result(result):
+        batch.append(result)
+        totals["checked"] += 1
+        totals["ok" if result.ok else "broken"] += 1
+        if log and not result.ok:
+            log(f"  ❌ {result.url}: {result.status_code or result.error}")
+        if len(batch) >= batch_size:
+            save_results(batch)
+            batch.clear()
+
+    checker.run(link_targets(queryset, fields), on_result)
+    if batch:
+        save_results(batch)
+    return totals
@@ -0,0 +1,138 @@
+"""
+Chunked rotation of ``Movie.udrop_link`` (``manage.py rotate_udrop_links``).
+
+The old ``tasks/shuffle_udrop_links.py`` loaded every movie as a full
+object and called ``save()`` on each: one UPDATE of every column per row,
+plus every save signal. Here ids are read in keyset chunks
+(``id > last_id ORDER BY id LIMIT n``) as ``(id, title, udrop_link)``
+tuples. A *provider* picks the new links for the chunk. Only the changed
+rows are written, with one ``bulk_update(fields=["udrop_link"])`` per
+chunk. A run therefore costs about two queries per chunk, whatever the
+catalog size.
+
+Providers subclass ``LinkProvider`` and implement ``links_for(rows)``.
+``settings.LINK_ROTATION["PROVIDER"]`` or ``--provider`` names the class.
+``SampleLinkProvider`` is the old script's fixed list.
+``DummyLinkProvider`` is deterministic, for tests and benchmarks.
+
+Each chunk commits in its own transaction, together with the
+``RollupWatermark`` row ``link_rotation`` that holds the last id done.
+``--resume`` continues after it. A finished run resets it to 0. A dry run
+writes nothing and leaves the checkpoint alone.
+
+``udrop_link`` is not shown on any page or cached, so skipping the save
+signals skips no invalidation.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Movie, RollupWatermark
+
+DEFAULTS = {
+    "PROVIDER": "movies.link_rotation.SampleLinkProvider",
+    "CHUNK_SIZE": 2000,
+}
+
+CHECKPOINT = "link_rotation"
+
+
+def rotation_settings():
+    return {**DEFAULTS, **getattr(settings, "LINK_ROTATION", {})}
+
+
+class LinkProvider:
+    """Returns new links for a chunk of movies."""
+
+    def links_for(self, rows):
+        """``rows`` is a list of ``(id, title, udrop_link)``. Returns ``{id: new_link}``; missing ids are left alone."""
+        raise NotImplementedError
+
+
+class SampleLinkProvider(LinkProvider):
+    # Dummy example – future me apne udrop API ya source se link fetch karna
+    links = [
+        "https://udrop.link/abc123",
+        "https://udrop.link/xyz456",
+        "https://udrop.link/pqr789",
+    ]
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def links_for(self, rows):
+        return {pk: self.random.choice(self.links) for pk, _, _ in rows}
+
+
+class DummyLinkProvider(LinkProvider):
+    """``https://udrop.link/<id>-<generation>``: every call gives each row a new, predictable link."""
+
+    def __init__(self, generation=1):
+        self.generation = generation
+
+    def links_for(self, rows):
+        return {pk: f"https://udrop.link/{pk}-{self.generation}" for pk, _, _ in rows}
+
+
+def get_provider(path=None, **kwargs):
+    return import_string(path or rotation_settings()["PROVIDER"])(**kwargs)
+
+
+def checkpoint():
+    return RollupWatermark.objects.filter(name=CHECKPOINT).values_list("last_id", flat=True).first() or 0
+
+
+def save_checkpoint(last_id):
+    if not RollupWatermark.objects.filter(name=CHECKPOINT).update(last_id=last_id):
+        RollupWatermark.objects.create(name=CHECKPOINT, last_id=last_id)
+
+
+def rotate_links(provider=None, chunk_size=None, resume=False, dry_run=False, limit=None, log=None):
+    """
+    Rotates links chunk by chunk. Returns ``{"scanned", "changed",
+    "chunks", "seconds", "rows_per_second", "last_id"}``.
+    """
+    provider = provider or get_provider()
+    chunk_size = chunk_size or rotation_settings()["CHUNK_SIZE"]
+    last_id = checkpoint() if resume else 0
+    scanned = changed = chunks = 0
+    start = time.perf_counter()
+
+    while limit is None or scanned < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - scanned)
+        rows = list(
+            Movie.objects.filter(pk__gt=last_id).order_by("pk").values_list("id", "title", "udrop_link")[:size]
+        )
+        if not rows:
+            break
+        new_links = provider.links_for(rows)
+        updates = [Movie(pk=pk, udrop_link=new_links[pk]) for pk, _, old in rows
+                   if pk in new_links and new_links[pk] != old]
+        last_id = rows[-1][0]
+
+        if not dry_run:
+            with transaction.atomic():
+                Movie.objects.bulk_update(updates, ["udrop_link"], batch_size=chunk_size)
+                save_checkpoint(last_id)
+        scanned += len(rows)
+        changed += len(updates)
+        chunks += 1
+        if log:
+            log(f"  up to id {last_id}: {scanned} scanned, {changed} {'would change' if dry_run else 'changed'}")
+
+    finished = limit is None or scanned < limit
+    if finished and not dry_run:
+        save_checkpoint(0)  # agla run shuru se
+
+    seconds = time.perf_counter() - start
+    return {
+        "scanned": scanned,
+        "changed": changed,
+        "chunks": chunks,
+        "seconds": seconds,
+        "rows_per_second": scanned / seconds if seconds else 0.0,
+        "last_id": last_id,
+    }
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.retention import ArchiveError, archive_old_months
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports whole months of DownloadLog older than --max-age-days to gzip JSONL, "
+        "checks the row counts, then drops the partition (PostgreSQL) or deletes the rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-days", type=int, help="Default: DOWNLOAD_LOG_RETENTION['MAX_AGE_DAYS']")
+        parser.add_argument("--archive-dir", help="Default: DOWNLOAD_LOG_RETENTION['ARCHIVE_DIR']")
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument("--dry-run", action="store_true", help="Only list the months that would be archived")
+
+    def handle(self, *args, **options):
+        try:
+            done = archive_old_months(
+                max_age_days=options["max_age_days"],
+                archive_dir=options["archive_dir"],
+                chunk_size=options["chunk_size"],
+                dry_run=options["dry_run"],
+                log=self.stdout.write,
+            )
+        except ArchiveError as exc:
+            raise CommandError(str(exc))
+
+        if options["dry_run"]:
+            for month, rows, path in done:
+                self.stdout.write(f"  would archive {month:%Y-%m}: {rows} rows -> {path}")
+            return
+        rows = sum(rows for _, rows, _ in done)
+        self.stdout.write(self.style.SUCCESS(f"✅ Archived {len(done)} months ({rows} download rows)"))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.models import DownloadLog, Movie
+from movies.user_agents import intern_many
+
+
+class Command(BaseCommand):
+    help = "Sets DownloadLog.movie from movie_title and moves user_agent text into the UserAgent table, in pk chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--start-id", type=int, default=0, help="Resume after this DownloadLog id")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk, scanned, updated = options["start_id"], 0, 0
+
+        # Har chunk apni chhoti transaction me, taaki table par lamba lock na lage
+        while True:
+            batch = list(
+                DownloadLog.objects.filter(pk__gt=last_pk).order_by("pk")
+                .only("id", "movie_title", "user_agent", "movie_id", "agent_id")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            todo = [log for log in batch if log.movie_id is None or log.user_agent]
+            if todo:
+                titles = {log.movie_title for log in todo if log.movie_id is None}
+                movie_ids = {}
+                for pk, title in Movie.objects.filter(title__in=titles).order_by("-id").values_list("id", "title"):
+                    movie_ids[title] = pk  # same title ho to sabse purani movie
+                agent_ids = intern_many(log.user_agent for log in todo)
+
+                changed = []
+                for log in todo:
+                    movie_id = log.movie_id or movie_ids.get(log.movie_title)
+                    if movie_id == log.movie_id and not log.user_agent:
+                        continue
+                    log.movie_id = movie_id
+                    if log.user_agent:
+                        log.agent_id = agent_ids[log.user_agent]
+                        log.user_agent = ""
+                    changed.append(log)
+                with transaction.atomic():
+                    DownloadLog.objects.bulk_update(changed, ["movie", "agent", "user_agent"])
+                updated += len(changed)
+            self.stdout.write(f"  scanned {scanned} rows (last id {last_pk}), updated {updated}...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Backfilled {updated} of {scanned} download log rows"))
@@ -0,0 +1,63 @@
+import cloudinary.api
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.models import Movie, Playlist
+from movies.posters import build_variants
+
+# Admin API resources_by_ids ek call me 100 ids tak leta hai
+API_BATCH = 100
+
+
+class Command(BaseCommand):
+    help = "Fills Movie.poster_variants / Playlist.banner_variants (srcset URLs), optionally with image sizes from Cloudinary."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=API_BATCH)
+        parser.add_argument("--fetch-dimensions", action="store_true", help="Ask the Cloudinary Admin API for width/height (1 call per batch)")
+        parser.add_argument("--all", action="store_true", help="Also rows whose variants are already current")
+
+    def handle(self, *args, **options):
+        for model, field in ((Movie, "poster"), (Playlist, "banner")):
+            updated = self.backfill(model, field, options)
+            self.stdout.write(self.style.SUCCESS(f"✅ {model.__name__}: {updated} {field} variants updated"))
+
+    def backfill(self, model, field, options):
+        variants_field = f"{field}_variants"
+        batch_size = min(options["batch_size"], API_BATCH) if options["fetch_dimensions"] else options["batch_size"]
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by("pk").only("id", field, variants_field)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            changed = []
+            for obj in batch:
+                previous = getattr(obj, variants_field) or {}
+                found = build_variants(getattr(obj, field), previous)
+                if found != previous or options["all"]:
+                    setattr(obj, variants_field, found)
+                    changed.append(obj)
+            if options["fetch_dimensions"]:
+                changed = self.fetch_dimensions(batch, field, variants_field, changed)
+
+            if changed:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, [variants_field])
+                updated += len(changed)
+            self.stdout.write(f"  {model.__name__} up to id {last_pk}: {updated} updated...")
+        return updated
+
+    def fetch_dimensions(self, batch, field, variants_field, changed):
+        missing = {getattr(obj, field).public_id: obj for obj in batch
+                   if getattr(obj, variants_field) and not getattr(obj, variants_field).get("width")}
+        if not missing:
+            return changed
+        changed = {obj.pk: obj for obj in changed}
+        for resource in cloudinary.api.resources_by_ids(list(missing), max_results=len(missing)).get("resources", ()):
+            obj = missing.get(resource["public_id"])
+            if obj is not None:
+                getattr(obj, variants_field).update(width=resource.get("width"), height=resource.get("height"))
+                changed[obj.pk] = obj
+        return list(changed.values())
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.models import Movie, Playlist
+
+
+class Command(BaseCommand):
+    help = "Fills Movie.season_num / episode_num / order_num from titles and recomputes Playlist.order_mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk, updated = 0, 0
+
+        # pk ke hisaab se chunks me chalo, taaki lambe locks na lagen
+        while True:
+            batch = list(Movie.objects.filter(pk__gt=last_pk).order_by("pk").only("id", "title")[:batch_size])
+            if not batch:
+                break
+            for movie in batch:
+                movie.compute_sort_keys()
+            with transaction.atomic():
+                Movie.objects.bulk_update(batch, ["season_num", "episode_num", "order_num"])
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f"  {updated} movies...")
+
+        modes = 0
+        for playlist in Playlist.objects.only("id", "order_mode").iterator():
+            mode = playlist.detect_order_mode()
+            if mode != playlist.order_mode:
+                Playlist.objects.filter(pk=playlist.pk).update(order_mode=mode)
+                modes += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Sort keys updated for {updated} movies, {modes} playlists changed order mode"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = "Runs the micro-benchmarks in movies/benchmarks.py."
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all). Available: {', '.join(sorted(BENCHMARKS))}")
+        parser.add_argument("--size", type=int, help="Dataset size, for benchmarks that take one.")
+
+    def handle(self, *args, **options):
+        names = options["names"] or sorted(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"▶ {name}"))
+            BENCHMARKS[name](self.stdout, options)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from movies.snapshots import build_snapshot, snapshot_root
+
+
+class Command(BaseCommand):
+    help = "Writes the catalog as content-hashed, precompressed JSON shards into STATIC_ROOT/catalog/. Only changed shards are rewritten."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", help=f"Output directory (default {snapshot_root()})")
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        result = build_snapshot(root=options["root"], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Catalog snapshot {result['version']}: {result['shards']} shards, "
+            f"{result['written']} written, {result['unchanged']} unchanged, {result['removed']} files removed"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from movies.sitemaps import build_sitemaps, sitemap_settings
+
+
+class Command(BaseCommand):
+    help = "Writes the sitemap index and its movie/playlist/category sections (with .gz copies). Unchanged files are kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", help=f"Output directory (default {sitemap_settings()['ROOT']})")
+        parser.add_argument("--base-url", help="Scheme and host put in front of every URL (default SITEMAPS['BASE_URL'])")
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        result = build_sitemaps(root=options["root"], base_url=options["base_url"], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Sitemaps: {result['urls']} urls in {result['files']} files, "
+            f"{result['written']} written, {result['removed']} files removed"
+        ))
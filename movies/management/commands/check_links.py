@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from movies.link_health import FIELDS, LinkChecker, check_links
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Probes every movie's download/udrop link concurrently (per-host limits) and stores the results in LinkCheck."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, help="Probe threads in total")
+        parser.add_argument("--per-host", type=int, help="Probes in flight per host")
+        parser.add_argument("--rate", type=float, help="Probes per second per host (0 = no limit)")
+        parser.add_argument("--burst", type=int)
+        parser.add_argument("--timeout", type=float, help="Seconds per probe")
+        parser.add_argument("--method", choices=["range", "head"])
+        parser.add_argument("--field", action="append", choices=FIELDS, help="Only this link field (repeatable)")
+        parser.add_argument("--broken-only", action="store_true", help="Only movies whose last check failed")
+
+    def handle(self, *args, **options):
+        checker = LinkChecker.from_settings(
+            concurrency=options["concurrency"], per_host=options["per_host"], rate=options["rate"],
+            burst=options["burst"], timeout=options["timeout"], method=options["method"],
+        )
+        queryset = Movie.objects.all()
+        if options["broken_only"]:
+            queryset = queryset.filter(link_checks__ok=False).distinct()
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        totals = check_links(queryset, fields=options["field"] or FIELDS, checker=checker, log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Checked {totals['checked']} links: {totals['ok']} ok, {totals['broken']} broken"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from movies.asset_deletions import drain, retry_failed
+from movies.models import PendingAssetDeletion
+
+
+class Command(BaseCommand):
+    help = "Deletes queued Cloudinary assets in batches of up to 100 ids (delete_resources), with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-batches", type=int, help="Stop after this many API calls")
+        parser.add_argument("--retry-failed", action="store_true", help="First reset rows that used up their attempts")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            self.stdout.write(f"  {retry_failed()} failed deletions queued again")
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        result = drain(max_batches=options["max_batches"], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['deleted']} assets deleted in {result['calls']} calls, "
+            f"{result['retrying']} to retry, {result['failed']} failed, {PendingAssetDeletion.objects.count()} left in queue"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from movies.retention import ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "PostgreSQL: creates DownloadLog partitions for this month and the next --months-ahead, "
+        "and moves rows out of the default partition into their month's own."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, help="Default: DOWNLOAD_LOG_RETENTION['MONTHS_AHEAD']")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write("DownloadLog is not partitioned on this database, nothing to do")
+            return
+        created = ensure_partitions(options["months_ahead"])
+        for month in created:
+            self.stdout.write(f"  created partition {month:%Y-%m}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(created)} DownloadLog partitions created"))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.catalog_import import FORMATS, get_uploader, import_catalog
+from movies.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = ("Imports movies from a CSV or JSONL file: creates categories/playlists, upserts movies in batches "
+            "and uploads posters in parallel. Re-running the same file changes nothing; resumable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (header row) or JSONL file")
+        parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension (.jsonl/.ndjson, else csv)")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--workers", type=int, help="Parallel poster uploads")
+        parser.add_argument("--uploader", help="Dotted path of a PosterUploader class (default settings.CATALOG_IMPORT)")
+        parser.add_argument("--poster-root", help="Directory of relative poster paths (default: the file's directory)")
+        parser.add_argument("--resume", action="store_true", help="Skip the rows of the batches already committed")
+        parser.add_argument("--no-sitemaps", action="store_true", help="Do not rebuild the sitemaps afterwards")
+
+    def handle(self, *args, **options):
+        try:
+            result = import_catalog(
+                options["path"],
+                file_format=options["format"],
+                uploader=get_uploader(options["uploader"]),
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                poster_root=options["poster_root"],
+                resume=options["resume"],
+                log=self.stdout.write if options["verbosity"] > 0 else None,
+            )
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        if (result["created"] or result["updated"]) and not options["no_sitemaps"]:
+            build_sitemaps()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['rows']} rows in {result['seconds']:.1f}s ({result['rows_per_second']:.0f} rows/s): "
+            f"{result['created']} created, {result['updated']} updated, {result['unchanged']} unchanged, "
+            f"{result['skipped']} skipped; {result['uploaded']} posters uploaded, {result['poster_errors']} failed; "
+            f"{result['categories_created']} categories and {result['playlists_created']} playlists created"
+        ))
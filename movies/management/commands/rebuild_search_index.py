@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from movies.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index for movies and playlists."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {count} rows with {type(backend).__name__}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from movies.installs import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recounts active installs (install_count=1) into the sharded InstallCounter and repairs drift."
+
+    def handle(self, *args, **options):
+        before, after = reconcile()
+        if before == after:
+            self.stdout.write(self.style.SUCCESS(f"✅ Install counter OK ({after} active installs)"))
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ Install counter drift fixed: {before} -> {after} active installs"))
@@ -0,0 +1,38 @@
+import os
+import re
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.retention import archive_path, get_archive_storage, restore_archive, retention_settings
+
+MONTH_RE = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads DownloadLog archives (paths or YYYY-MM months) back into the table. Already present ids are skipped. "
+        "A month missing from --archive-dir is fetched from DOWNLOAD_LOG_RETENTION['STORAGE']."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archives", nargs="+", help="Archive file paths or months like 2025-01")
+        parser.add_argument("--archive-dir", help="Where YYYY-MM months are looked up")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        archive_dir = options["archive_dir"] or str(retention_settings()["ARCHIVE_DIR"])
+        storage = get_archive_storage()
+        total = 0
+        for name in options["archives"]:
+            match = MONTH_RE.match(name)
+            if match:
+                name = archive_path(archive_dir, datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc))
+                if not os.path.exists(name) and storage is not None:
+                    storage.fetch(os.path.basename(name), name)
+            if not os.path.exists(name):
+                raise CommandError(f"Archive not found: {name}")
+            rows = restore_archive(name, chunk_size=options["chunk_size"])
+            self.stdout.write(f"  {name}: {rows} rows restored")
+            total += rows
+        self.stdout.write(self.style.SUCCESS(f"✅ Restored {total} download rows"))
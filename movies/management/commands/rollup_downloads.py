@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from movies.rollups import LAG, WINDOW, roll_up
+
+
+class Command(BaseCommand):
+    help = "Adds new DownloadLog rows to the hourly/daily rollups and Movie.download_count. Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window", type=int, default=WINDOW, help="DownloadLog ids per transaction")
+        parser.add_argument("--lag", type=int, default=int(LAG.total_seconds()),
+                            help="Seconds a seen id waits before it is rolled up (0 = no wait, single writer only)")
+
+    def handle(self, *args, **options):
+        rows = roll_up(window=options["window"], lag=timedelta(seconds=options["lag"]))
+        self.stdout.write(self.style.SUCCESS(f"✅ Rolled up {rows} download rows"))
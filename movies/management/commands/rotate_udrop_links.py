@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from movies.link_rotation import get_provider, rotate_links
+
+
+class Command(BaseCommand):
+    help = "Gives movies new udrop links from the configured provider, in chunks with one bulk UPDATE each. Resumable."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", help="Dotted path of a LinkProvider class (default settings.LINK_ROTATION)")
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument("--resume", action="store_true", help="Continue after the last committed chunk")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would change")
+        parser.add_argument("--limit", type=int, help="Stop after this many movies (checkpoint stays for --resume)")
+
+    def handle(self, *args, **options):
+        result = rotate_links(
+            provider=get_provider(options["provider"]),
+            chunk_size=options["chunk_size"],
+            resume=options["resume"],
+            dry_run=options["dry_run"],
+            limit=options["limit"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        verb = "would change" if options["dry_run"] else "changed"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['scanned']} movies scanned, {result['changed']} links {verb} in {result['chunks']} chunks "
+            f"({result['rows_per_second']:.0f} rows/s, last id {result['last_id']})"
+        ))
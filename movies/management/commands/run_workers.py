@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from movies.jobs import job_settings, run_workers
+from movies.models import Job
+
+
+class Command(BaseCommand):
+    help = "Runs background job workers (movies/jobs.py): claims due jobs with SKIP LOCKED, retries, recurring jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, help=f"Worker processes (default {job_settings()['CONCURRENCY']})")
+        parser.add_argument("--batch-size", type=int, help="Jobs claimed per query")
+        parser.add_argument("--poll-interval", type=float, help="Seconds to wait when no job is due")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is due (cron, deploy hooks)")
+        parser.add_argument("--max-jobs", type=int, help="Stop each worker after this many jobs")
+        parser.add_argument("--no-schedule", action="store_true", help="Don't queue the recurring jobs from settings.JOBS")
+
+    def handle(self, *args, **options):
+        counts = run_workers(
+            options["concurrency"], batch_size=options["batch_size"], poll_interval=options["poll_interval"],
+            burst=options["burst"], max_jobs=options["max_jobs"], schedule=not options["no_schedule"],
+        )
+        if counts is None:
+            self.stdout.write(self.style.SUCCESS("✅ Workers stopped"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {counts[Job.DONE]} jobs done, {counts[Job.QUEUED]} to retry, {counts[Job.FAILED]} failed"
+        ))
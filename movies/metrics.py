@@ -0,0 +1,204 @@
+"""
+Admin metrics snapshot, shared by ``MyAdminSite.index``,
+``custom_admin_dashboard`` and the ``/admin/metrics/`` JSON endpoint.
+
+Both dashboards used to run seven queries on every load. One of them was
+``DownloadLog.objects.count()``, a full scan of the biggest table.
+``compute_snapshot()`` now gets every headline number in a single
+``SELECT``. Each table contributes one single-row aggregate subquery, and
+the subqueries are ``CROSS JOIN``ed. Conditional aggregation (``COUNT(*)
+FILTER (WHERE ...)``) produces several numbers from one pass over a
+table:
+
+    users      total, joined in the last 7 days
+    movies     total, in playlists, added in the last 7 days
+    installs   active (sum of the InstallCounter shards)
+    downloads  last 24 h / 7 days from the hourly rollups, total
+
+On PostgreSQL the ``DownloadLog`` total is the planner's estimate
+(``pg_class.reltuples`` of the table and its partitions), and
+``approximate["downloads"]`` is set. Only when the estimate is below
+``EXACT_BELOW`` is the exact count run. Top movies, recent downloads and
+recent installs are three small indexed queries.
+
+The snapshot is cached in ``METRICS["ALIAS"]``. After ``TTL`` seconds it is
+still served, while one background thread (guarded by ``cache.add``)
+recomputes it. After ``MAX_AGE`` seconds it is recomputed in the request.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count, IntegerField, Q, Sum, Value
+from django.utils import timezone
+
+from .models import DownloadLog, DownloadRollupHourly, InstallCounter, InstallTracker, Movie
+from .rollups import top_movies
+
+DEFAULTS = {
+    "ALIAS": "default",
+    "TTL": 60,
+    "MAX_AGE": 600,
+    "EXACT_BELOW": 100_000,  # PostgreSQL: estimate isse kam ho to exact COUNT(*)
+    "TOP": 5,
+    "RECENT": 5,
+}
+
+CACHE_KEY = "admin-metrics:v1"
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, "METRICS", {})}
+
+
+def single_row(queryset, **aggregates):
+    """``queryset.aggregate(**aggregates)`` as a queryset: one row, no GROUP BY, usable as a subquery."""
+    return (queryset.order_by().annotate(_one=Value(1, output_field=IntegerField())).values("_one")
+            .annotate(**aggregates).values(*aggregates))
+
+
+def fetch_one_row(parts):
+    """
+    Runs ``{prefix: single_row queryset or (sql, params, columns)}`` as one
+    ``SELECT * FROM (...) CROSS JOIN (...)``. Returns ``{prefix: {column: value}}``.
+    """
+    sources, params, columns = [], [], []
+    for index, (prefix, part) in enumerate(parts.items()):
+        if isinstance(part, tuple):
+            sql, part_params, names = part
+        else:
+            sql, part_params = part.query.get_compiler(connection=connection).as_sql()
+            names = list(part.query.annotation_select)
+        sources.append(f"({sql}) AS part{index}")
+        params.extend(part_params)
+        columns.extend((prefix, name) for name in names)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT * FROM " + " CROSS JOIN ".join(sources), params)
+        row = cursor.fetchone()
+    result = {prefix: {} for prefix in parts}
+    for (prefix, name), value in zip(columns, row):
+        result[prefix][name] = value
+    return result
+
+
+def estimated_rows_sql(table):
+    # Partitioned table ka apna reltuples -1 hota hai: partitions ka sum lo
+    return (
+        "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint FROM pg_class c "
+        "WHERE c.oid = %s::regclass OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)",
+        [table, table],
+        ["estimate"],
+    )
+
+
+def compute_snapshot():
+    conf = metrics_settings()
+    now = timezone.now()
+    day, week = now - timedelta(days=1), now - timedelta(days=7)
+    parts = {
+        "users": single_row(get_user_model().objects, total=Count("pk"),
+                            new_7d=Count("pk", filter=Q(date_joined__gte=week))),
+        "movies": single_row(Movie.objects, total=Count("pk"), in_playlists=Count("pk", filter=Q(playlist__isnull=False)),
+                             new_7d=Count("pk", filter=Q(created_at__gte=week))),
+        "installs": single_row(InstallCounter.objects, active=Sum("active")),
+        # Rollups (har 5 min) se: DownloadLog ka range scan nahi
+        "window": single_row(DownloadRollupHourly.objects.filter(bucket__gte=week),
+                             last_24h=Sum("downloads", filter=Q(bucket__gte=day)), last_7d=Sum("downloads")),
+    }
+    estimate = connection.vendor == "postgresql"
+    if estimate:
+        parts["downloads"] = estimated_rows_sql(DownloadLog._meta.db_table)
+    else:
+        parts["downloads"] = single_row(DownloadLog.objects, estimate=Count("pk"))
+    row = fetch_one_row(parts)
+
+    downloads = row["downloads"]["estimate"] or 0
+    approximate = estimate and downloads >= conf["EXACT_BELOW"]
+    if estimate and not approximate:
+        downloads = DownloadLog.objects.count()  # chhoti table: exact count sasta hai
+
+    return {
+        "computed_at": now,
+        "approximate": {"downloads": approximate},
+        "totals": {
+            "users": row["users"]["total"],
+            "movies": row["movies"]["total"],
+            "downloads": downloads,
+            "installs": row["installs"]["active"] or 0,
+        },
+        "recent": {
+            "users_7d": row["users"]["new_7d"],
+            "movies_7d": row["movies"]["new_7d"],
+            "movies_in_playlists": row["movies"]["in_playlists"],
+            "downloads_24h": row["window"]["last_24h"] or 0,
+            "downloads_7d": row["window"]["last_7d"] or 0,
+        },
+        "top_movies": top_movies(conf["TOP"]),
+        "recent_downloads": list(
+            DownloadLog.objects.order_by("-download_time").values("movie_title", "download_time")[:conf["RECENT"]]
+        ),
+        "recent_installs": list(
+            InstallTracker.objects.order_by("-updated_at").values("device_id", "last_action", "created_at")[:conf["RECENT"]]
+        ),
+    }
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+def metrics_cache():
+    return caches[metrics_settings()["ALIAS"]]
+
+
+def refresh():
+    """Recomputes and caches the snapshot. Returns it."""
+    conf = metrics_settings()
+    snapshot = compute_snapshot()
+    metrics_cache().set(CACHE_KEY, {"computed": time.time(), "snapshot": snapshot}, conf["MAX_AGE"])
+    return snapshot
+
+
+def _refresh_in_thread():
+    try:
+        refresh()
+    finally:
+        metrics_cache().delete(CACHE_KEY + ":refreshing")
+        connection.close()  # is thread ka apna connection
+
+
+def refresh_in_background():
+    # Ek hi thread: baaki requests purana snapshot dikhati rahein
+    if metrics_cache().add(CACHE_KEY + ":refreshing", 1, metrics_settings()["TTL"]):
+        threading.Thread(target=_refresh_in_thread, name="admin-metrics", daemon=True).start()
+
+
+def get_snapshot():
+    conf = metrics_settings()
+    entry = metrics_cache().get(CACHE_KEY)
+    age = time.time() - entry["computed"] if entry else None
+    if entry is None or age > conf["MAX_AGE"]:
+        return refresh()
+    if age > conf["TTL"]:
+        refresh_in_background()
+    return entry["snapshot"]
+
+
+def dashboard_context():
+    """Template context of both admin dashboards (``templates/admin/index.html``)."""
+    snapshot = get_snapshot()
+    totals = snapshot["totals"]
+    return {
+        "metrics": snapshot,
+        "total_users": totals["users"],
+        "total_movies": totals["movies"],
+        "total_downloads": totals["downloads"],
+        "total_installs": totals["installs"],
+        "downloads_approximate": snapshot["approximate"]["downloads"],
+        "top_movies": snapshot["top_movies"],
+        "recent_downloads": snapshot["recent_downloads"],
+        "recent_installs": snapshot["recent_installs"],
+    }
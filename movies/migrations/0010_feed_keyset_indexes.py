@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_alter_installtracker_install_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-created_at', '-id'], name='movies_movie_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(fields=['-created_at', '-id'], name='movies_playlist_created_idx'),
+        ),
+    ]
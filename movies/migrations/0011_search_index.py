@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:49
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# PostgreSQL: GIN index + existing rows ka tsvector. SQLite: FTS5 virtual tables.
+POSTGRES_FORWARD = [
+    "CREATE INDEX movies_movie_search_idx ON movies_movie USING gin (search_vector)",
+    "CREATE INDEX movies_playlist_search_idx ON movies_playlist USING gin (search_vector)",
+    "UPDATE movies_movie SET search_vector = "
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+    "UPDATE movies_playlist SET search_vector = setweight(to_tsvector('simple', coalesce(name, '')), 'A')",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS movies_movie_search_idx",
+    "DROP INDEX IF EXISTS movies_playlist_search_idx",
+]
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE movies_movie_fts USING fts5(title, description, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE movies_playlist_fts USING fts5(name, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO movies_movie_fts (rowid, title, description) SELECT id, title, description FROM movies_movie",
+    "INSERT INTO movies_playlist_fts (rowid, name) SELECT id, name FROM movies_playlist",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS movies_movie_fts",
+    "DROP TABLE IF EXISTS movies_playlist_fts",
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {"postgresql": postgres, "sqlite": sqlite}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
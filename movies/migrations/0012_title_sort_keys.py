@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='episode_num',
+            field=models.PositiveIntegerField(default=9999, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='order_num',
+            field=models.PositiveIntegerField(default=9999, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='season_num',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='order_mode',
+            field=models.CharField(choices=[('episode', 'Season / Episode'), ('numeric', 'Numbered titles')], default='episode', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['playlist', 'season_num', 'episode_num', 'id'], name='movies_movie_episode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['playlist', 'order_num', 'id'], name='movies_movie_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['category', 'order_num', 'id'], name='movies_movie_cat_order_idx'),
+        ),
+    ]
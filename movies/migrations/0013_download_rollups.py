@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_title_sort_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='download_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='DownloadRollupDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movie_title', models.CharField(max_length=200)),
+                ('bucket', models.DateTimeField()),
+                ('downloads', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='movies.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'movie_title'), name='unique_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DownloadRollupHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movie_title', models.CharField(max_length=200)),
+                ('bucket', models.DateTimeField()),
+                ('downloads', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='movies.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'movie_title'), name='unique_hourly_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:59
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+# Sirf PostgreSQL: movies_downloadlog ko download_time par monthly range partitions me badlo.
+# Primary key (id, download_time) hai kyunki partition key PK me hona zaroori hai; id ab bhi
+# ek sequence se unique aata hai. Naye mahino ke partitions movies/retention.py banata hai.
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_download_log(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    execute = schema_editor.execute
+    execute("ALTER TABLE movies_downloadlog RENAME TO movies_downloadlog_unpartitioned")
+    execute("ALTER INDEX movies_downloadlog_pkey RENAME TO movies_downloadlog_unpartitioned_pkey")
+    execute(
+        "CREATE TABLE movies_downloadlog (LIKE movies_downloadlog_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (download_time)"
+    )
+    execute("CREATE SEQUENCE movies_downloadlog_part_id_seq OWNED BY movies_downloadlog.id")
+    execute("ALTER TABLE movies_downloadlog ALTER COLUMN id SET DEFAULT nextval('movies_downloadlog_part_id_seq')")
+    execute("ALTER TABLE movies_downloadlog ADD CONSTRAINT movies_downloadlog_pkey PRIMARY KEY (id, download_time)")
+    execute("CREATE TABLE movies_downloadlog_default PARTITION OF movies_downloadlog DEFAULT")
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(download_time) FROM movies_downloadlog_unpartitioned")
+        oldest = cursor.fetchone()[0]
+    now = datetime.now(timezone.utc)
+    month = (oldest or now).astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), MONTHS_AHEAD)
+    while month <= last:
+        execute(
+            f"CREATE TABLE movies_downloadlog_p{month:%Y%m} PARTITION OF movies_downloadlog "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    execute("INSERT INTO movies_downloadlog SELECT * FROM movies_downloadlog_unpartitioned")
+    execute(
+        "SELECT setval('movies_downloadlog_part_id_seq', "
+        "COALESCE((SELECT max(id) FROM movies_downloadlog), 0) + 1, false)"
+    )
+    execute("DROP TABLE movies_downloadlog_unpartitioned")
+
+
+def unpartition_download_log(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    execute = schema_editor.execute
+    execute("ALTER TABLE movies_downloadlog RENAME TO movies_downloadlog_partitioned")
+    execute("ALTER INDEX movies_downloadlog_pkey RENAME TO movies_downloadlog_partitioned_pkey")
+    execute("ALTER SEQUENCE movies_downloadlog_part_id_seq OWNED BY NONE")
+    execute("CREATE TABLE movies_downloadlog (LIKE movies_downloadlog_partitioned INCLUDING DEFAULTS)")
+    execute("ALTER SEQUENCE movies_downloadlog_part_id_seq OWNED BY movies_downloadlog.id")
+    execute("ALTER TABLE movies_downloadlog ADD CONSTRAINT movies_downloadlog_pkey PRIMARY KEY (id)")
+    execute("INSERT INTO movies_downloadlog SELECT * FROM movies_downloadlog_partitioned")
+    execute("DROP TABLE movies_downloadlog_partitioned")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_download_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_download_log, unpartition_download_log),
+        migrations.AddIndex(
+            model_name='downloadlog',
+            index=models.Index(fields=['download_time'], name='movies_downloadlog_time_idx'),
+        ),
+    ]
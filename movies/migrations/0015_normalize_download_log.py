@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0014_downloadlog_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=40, unique=True)),
+                ('value', models.TextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='downloadlog',
+            name='movie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='movies.movie'),
+        ),
+        migrations.AlterField(
+            model_name='downloadlog',
+            name='user_agent',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='downloadlog',
+            name='agent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='movies.useragent'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:02
+
+from django.db import migrations, models
+
+
+def seed_counter(apps, schema_editor):
+    InstallTracker = apps.get_model("movies", "InstallTracker")
+    InstallCounter = apps.get_model("movies", "InstallCounter")
+    InstallCounter.objects.create(shard=0, active=InstallTracker.objects.filter(install_count=1).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_normalize_download_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstallCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(unique=True)),
+                ('active', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0016_install_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='installtracker',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='installtracker',
+            name='last_event_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
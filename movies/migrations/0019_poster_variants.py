@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:55
+
+import movies.posters
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0018_card_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='poster_variants',
+            field=movies.posters.VariantsField(source='poster'),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='banner_variants',
+            field=movies.posters.VariantsField(source='banner'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0019_poster_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAssetDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.CharField(max_length=255)),
+                ('resource_type', models.CharField(default='image', max_length=20)),
+                ('delivery_type', models.CharField(default='upload', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['next_attempt_at'], name='movies_asset_deletion_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('public_id', 'resource_type', 'delivery_type'), name='movies_asset_deletion_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0020_pending_asset_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('download_link', 'Download link'), ('udrop_link', 'Udrop link')], max_length=20)),
+                ('url', models.URLField(max_length=500)),
+                ('ok', models.BooleanField(default=False)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('last_checked', models.DateTimeField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='link_checks', to='movies.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ok', 'last_checked'], name='movies_linkcheck_ok_idx')],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'field'), name='movies_linkcheck_movie_field_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0022_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='installtracker',
+            index=models.Index(fields=['-updated_at'], name='movies_install_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0023_install_tracker_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='downloadlog',
+            index=models.Index(fields=['ip_address'], name='movies_downloadlog_ip_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='downloadlog',
+            index=models.Index(fields=['username'], name='movies_downloadlog_user_idx'),
+        ),
+    ]
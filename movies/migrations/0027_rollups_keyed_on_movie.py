@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_movie_rows(apps, schema_editor):
+    # Title par keyed purani rows: rename hui movie ki ek bucket me do rows ho sakti hain
+    for name in ("DownloadRollupHourly", "DownloadRollupDaily"):
+        model = apps.get_model("movies", name)
+        dupes = (
+            model.objects.filter(movie__isnull=False)
+            .values("bucket", "movie_id")
+            .annotate(rows=Count("id"), total=Sum("downloads"))
+            .filter(rows__gt=1)
+            .order_by()
+        )
+        for dupe in list(dupes):
+            ids = list(model.objects.filter(bucket=dupe["bucket"], movie_id=dupe["movie_id"])
+                       .order_by("id").values_list("id", flat=True))
+            model.objects.filter(pk=ids[0]).update(downloads=dupe["total"])
+            model.objects.filter(pk__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0026_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='downloadrollupdaily',
+            name='unique_daily_rollup',
+        ),
+        migrations.RemoveConstraint(
+            model_name='downloadrolluphourly',
+            name='unique_hourly_rollup',
+        ),
+        migrations.RunPython(merge_movie_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='downloadrollupdaily',
+            constraint=models.UniqueConstraint(condition=models.Q(('movie__isnull', False)), fields=('bucket', 'movie'), name='unique_daily_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='downloadrolluphourly',
+            constraint=models.UniqueConstraint(condition=models.Q(('movie__isnull', False)), fields=('bucket', 'movie'), name='unique_hourly_rollup'),
+        ),
+    ]
@@ -1,10 +1,14 @@
 from django.db import models
 from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 from cloudinary.models import CloudinaryField
+from .ordering import NO_NUMBER, extract_episode_number, extract_movie_order_number
+from .posters import VariantsField
 
 # 🔹 Category Model
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)  # page cache ke validators (movies/page_cache.py)
 
     def __str__(self):
         return self.name
@@ -12,52 +16,280 @@ class Category(models.Model):
 
 # 🔹 Playlist Model
 class Playlist(models.Model):
+    ORDER_EPISODE = "episode"  # S01E01, S01E02 ...
+    ORDER_NUMERIC = "numeric"  # "1. Iron Man", "2. Iron Man 2" ... (Movie Order, jaise Marvel Universe)
+    ORDER_MODE_CHOICES = [
+        (ORDER_EPISODE, "Season / Episode"),
+        (ORDER_NUMERIC, "Numbered titles"),
+    ]
+
     name = models.CharField(max_length=100)
     banner = CloudinaryField("banner", blank=True, null=True)
+    banner_variants = VariantsField(source="banner")  # srcset URLs + size (movies/posters.py)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # card fragment cache ka version (movies/cards.py)
+    # Movie save/delete par update hota hai (signals.py), views sirf isse padhte hain
+    order_mode = models.CharField(max_length=10, choices=ORDER_MODE_CHOICES, default=ORDER_EPISODE, editable=False)
+    # PostgreSQL full-text index (movies/search.py); SQLite par FTS5 table use hoti hai
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Feed/grid ordering (created_at DESC, id DESC) ke liye keyset index
+            models.Index(fields=["-created_at", "-id"], name="movies_playlist_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def detect_order_mode(self):
+        """Numbered mode if any of the first 5 movies has a "1." style title prefix."""
+        first = self.movie_set.order_by("pk").values_list("order_num", flat=True)[:5]
+        return self.ORDER_NUMERIC if any(num != NO_NUMBER for num in first) else self.ORDER_EPISODE
+
+    def movie_ordering(self):
+        if self.order_mode == self.ORDER_NUMERIC:
+            return ("order_num", "id")
+        return ("season_num", "episode_num", "id")
+
 
 # 🔹 Movie Model
 class Movie(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     poster = CloudinaryField("poster")
+    poster_variants = VariantsField(source="poster")  # srcset URLs + size (movies/posters.py)
     download_link = models.URLField()
     udrop_link = models.URLField(blank=True, null=True)
     playlist = models.ForeignKey(Playlist, on_delete=models.SET_NULL, null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)  # card fragment cache ka version (movies/cards.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # import_catalog ka upsert key (movies/catalog_import.py); admin se bani movies me NULL
+    import_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    # Title se nikale gaye sort keys, save() me ek baar compute hote hain (movies/ordering.py)
+    season_num = models.PositiveIntegerField(default=1, editable=False)
+    episode_num = models.PositiveIntegerField(default=NO_NUMBER, editable=False)
+    order_num = models.PositiveIntegerField(default=NO_NUMBER, editable=False)
+
+    # Running total, rollup_downloads command se update hota hai (movies/rollups.py)
+    download_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="movies_movie_created_idx"),
+            models.Index(fields=["playlist", "season_num", "episode_num", "id"], name="movies_movie_episode_idx"),
+            models.Index(fields=["playlist", "order_num", "id"], name="movies_movie_order_idx"),
+            models.Index(fields=["category", "order_num", "id"], name="movies_movie_cat_order_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def compute_sort_keys(self):
+        self.season_num, self.episode_num = extract_episode_number(self.title)
+        self.order_num = extract_movie_order_number(self.title)
+
+    def save(self, *args, **kwargs):
+        self.compute_sort_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "title" in update_fields:
+            kwargs["update_fields"] = update_fields = {*update_fields, "season_num", "episode_num", "order_num"}
+        if update_fields is not None and "poster" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "poster_variants"}
+        super().save(*args, **kwargs)
+
+
+# 🔹 User Agent Lookup (har distinct user agent ek baar, movies/user_agents.py)
+class UserAgent(models.Model):
+    digest = models.CharField(max_length=40, unique=True)  # sha1(value)
+    value = models.TextField()
+
+    def __str__(self):
+        return self.value
+
 
 # 🔹 Download Log Model
 class DownloadLog(models.Model):
-    movie_title = models.CharField(max_length=200)
+    movie = models.ForeignKey(Movie, on_delete=models.SET_NULL, null=True, blank=True)
+    movie_title = models.CharField(max_length=200)  # download ke waqt ka title (movie delete hone par bhi rehta hai)
     download_time = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField()
-    user_agent = models.TextField()
+    agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True)
+    user_agent = models.TextField(blank=True, default="")  # sirf purane rows; naye rows agent use karte hain
     user_email = models.EmailField(blank=True, null=True)
     username = models.CharField(max_length=150, blank=True, null=True)
 
+    class Meta:
+        # PostgreSQL par table download_time ke mahino me partitioned hai (migration 0014, movies/retention.py)
+        indexes = [
+            models.Index(fields=["download_time"], name="movies_downloadlog_time_idx"),
+            # Admin search: exact / prefix IP aur exact username (movies/large_tables.py)
+            models.Index(fields=["ip_address"], name="movies_downloadlog_ip_idx"),
+            models.Index(fields=["username"], name="movies_downloadlog_user_idx"),
+        ]
+
+    @property
+    def user_agent_text(self):
+        return self.agent.value if self.agent_id else self.user_agent
+
     def __str__(self):
         user_display = self.username or self.user_email or "Anonymous"
         return f"{self.movie_title} by {user_display} at {self.download_time.strftime('%Y-%m-%d %H:%M')}"
 
 
+# 🔹 Download Rollups (DownloadLog ka hourly / daily aggregate, movies/rollups.py)
+class DownloadRollupBase(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.SET_NULL, null=True, blank=True)
+    movie_title = models.CharField(max_length=200)
+    bucket = models.DateTimeField()
+    downloads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.movie_title} @ {self.bucket:%Y-%m-%d %H:%M}: {self.downloads}"
+
+
+class DownloadRollupHourly(DownloadRollupBase):
+    class Meta:
+        constraints = [
+            # Movie wali rows movie par keyed; title sirf un rows ke liye jinki movie nahi (delete ho chuki)
+            models.UniqueConstraint(fields=["bucket", "movie"], condition=models.Q(movie__isnull=False),
+                                    name="unique_hourly_rollup"),
+        ]
+
+
+class DownloadRollupDaily(DownloadRollupBase):
+    class Meta:
+        constraints = [
+            # Movie wali rows movie par keyed; title sirf un rows ke liye jinki movie nahi (delete ho chuki)
+            models.UniqueConstraint(fields=["bucket", "movie"], condition=models.Q(movie__isnull=False),
+                                    name="unique_daily_rollup"),
+        ]
+
+
+# 🔹 Rollup Watermark (kis DownloadLog id tak aggregate ho chuka hai)
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
 # 🔹 Install Tracker Model (Unique Installs Only)
 class InstallTracker(models.Model):
     device_id = models.CharField(max_length=255, unique=True)  # unique device
     device_name = models.CharField(max_length=100, blank=True, null=True)  # Android / iOS / Windows PC/Laptop
     install_count = models.PositiveIntegerField(default=1)  # Always 1 for unique installs
     last_action = models.CharField(max_length=20, default="Install")
+    # Batch endpoint ka watermark: (last_event_at, last_event_id) tak ke events apply ho chuke hain
+    last_event_at = models.DateTimeField(blank=True, null=True)
+    last_event_id = models.CharField(max_length=64, blank=True, default="")
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard ki "Recent Installations" (movies/metrics.py)
+            models.Index(fields=["-updated_at"], name="movies_install_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.device_id} ({self.device_name or 'Unknown'})"
+
+
+# 🔹 Active Install Counter (sharded, movies/installs.py)
+class InstallCounter(models.Model):
+    shard = models.PositiveSmallIntegerField(unique=True)
+    active = models.IntegerField(default=0)  # is shard ke active installs (sab shards ka sum = total)
+
+    def __str__(self):
+        return f"shard {self.shard}: {self.active}"
+
+
+# 🔹 Cloudinary Deletion Queue (movies/asset_deletions.py)
+class PendingAssetDeletion(models.Model):
+    public_id = models.CharField(max_length=255)
+    resource_type = models.CharField(max_length=20, default="image")
+    delivery_type = models.CharField(max_length=20, default="upload")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["public_id", "resource_type", "delivery_type"], name="movies_asset_deletion_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["next_attempt_at"], name="movies_asset_deletion_due_idx"),
+        ]
+
+    def __str__(self):
+        return self.public_id
+
+
+# 🔹 Link Health (movies/link_health.py, `manage.py check_links`)
+class LinkCheck(models.Model):
+    FIELD_CHOICES = [("download_link", "Download link"), ("udrop_link", "Udrop link")]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="link_checks")
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    url = models.URLField(max_length=500)
+    ok = models.BooleanField(default=False)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True, default="")
+    last_checked = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["movie", "field"], name="movies_linkcheck_movie_field_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["ok", "last_checked"], name="movies_linkcheck_ok_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.url} ({self.status_code or self.error or '?'})"
+
+
+# 🔹 Background Jobs (movies/jobs.py, `manage.py run_workers`)
+class Job(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    schedule = models.CharField(max_length=100, blank=True, default="")  # recurring job ka naam (settings.JOBS["SCHEDULE"])
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Har recurring job ki ek hi pending copy
+            models.UniqueConstraint(
+                fields=["schedule"], condition=models.Q(status__in=["queued", "running"]) & ~models.Q(schedule=""),
+                name="movies_job_schedule_pending_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="movies_job_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,86 @@
+"""
+Sort keys parsed from movie titles.
+
+They are computed once in ``Movie.save()`` and stored on the row, so
+playlists and categories are ordered with ``ORDER BY`` instead of running
+these regexes on every request. Existing rows are filled in by
+``manage.py backfill_sort_keys``.
+"""
+import re
+
+# Jis title me number na mile woh sabse last sort hota hai
+NO_NUMBER = 9999
+
+
+# -------------------------------
+# Helper function: Robust Season and Episode number extraction
+# -------------------------------
+def extract_episode_number(title):
+    """
+    Extracts the Season and Episode numbers from a movie/series title for correct sorting.
+    Returns (season_num, episode_num). This version is highly robust against bad titles.
+    """
+    title = title or ""
+    title = title.lower()
+
+    # Default values: Season 1, and a very high episode number (for movies or unsorted items)
+    season_num = 1
+    episode_num = NO_NUMBER
+
+    # 1. Season extraction (e.g., season 1, s01, s 1)
+    # Searches for 's' or 'season' followed by digits
+    season_match = re.search(r"s(?:eason)?\s*(\d+)", title)
+    if season_match:
+        try:
+            # Safely convert to integer
+            season_num = int(season_match.group(1))
+        except ValueError:
+            pass
+
+    # 2. Episode extraction (e.g., episode 10, e10, e 10)
+    # Searches for 'e' or 'episode' followed by digits
+    episode_match = re.search(r"e(?:pisode)?\s*(\d+)", title)
+    if episode_match:
+        try:
+            # Safely convert to integer
+            episode_num = int(episode_match.group(1))
+        except ValueError:
+            pass
+
+    # If no explicit episode found, check for a standalone number (which might be the episode number)
+    # Only assign this if a season number was also found (to avoid treating movie years as episode numbers)
+    if episode_num == NO_NUMBER and season_match:
+        # Look for a standalone number that might represent the episode (e.g., "Series Title 12")
+        # This part handles simple titles like "Show Name 1", "Show Name 2" within a season.
+        cleaned_title = title.replace(season_match.group(0), '')
+        simple_number_match = re.search(r"\b(\d+)\b", cleaned_title)
+        if simple_number_match:
+            try:
+                # Safely convert to integer
+                episode_num = int(simple_number_match.group(1))
+            except ValueError:
+                pass
+
+    # Returns (1, 10) for S1 E10, (2, 1) for S2 E1, etc.
+    return (season_num, episode_num)
+
+
+# -------------------------------
+# Helper function: Extracting order number (e.g., 1., 2., 10.)
+# -------------------------------
+def extract_movie_order_number(title):
+    """
+    Extracts the numeric order number (e.g., 1, 2, 10) from the start of a title.
+    Returns 9999 if no number is found, ensuring it sorts last.
+    """
+    title = title or ""
+    # RegEx searches for one or more digits at the start of the string, followed by a dot.
+    match = re.match(r'^(\d+)\.', title.strip())
+    if match:
+        try:
+            # Safely convert the captured number (group 1) to an integer
+            return int(match.group(1))
+        except ValueError:
+            pass
+    # Default to a high number if no sequence number is found
+    return NO_NUMBER
@@ -0,0 +1,357 @@
+"""
+Whole-page cache for the anonymous catalog pages.
+
+``@cached_page("category:{category_id}")`` caches the rendered response
+under the path plus the normalised ``page`` and ``q`` parameters. Each
+entry also stores the *generations* of the scopes it depends on. A scope
+is a name like ``home``, ``category:3``, ``playlist:7`` or ``movie:42``,
+and its generation is a counter in the same cache. The ``Movie``,
+``Playlist`` and ``Category`` receivers in ``signals.py`` bump exactly the
+scopes a change touches. An entry whose stored generations no longer match
+is stale.
+
+Stampede guard: for a stale entry, the first request to win a short
+``cache.add`` lock rebuilds it, and the others keep serving the stale copy
+meanwhile. When there is no entry at all, the others wait up to
+``LOCK_WAIT_MS`` for the rebuild before rendering themselves.
+
+Conditional GET: the same generations (plus a ``pagemod:`` timestamp per
+scope, set on every bump) give each response an ``ETag`` and a
+``Last-Modified``. A request whose ``If-None-Match`` / ``If-Modified-Since``
+still matches gets a 304 from one ``get_many`` on the cache. The view
+never runs and no template is rendered. ``@conditional_page`` adds only
+this part, without storing the body. The sitemap and the JSON feeds use it.
+
+Rows: generations only move in the process (or shared cache) that saw the
+change. With a per-process backend, another worker's edit would leave this
+worker's counters, entries and ETags as they were indefinitely. So every
+scope's state also carries a row fingerprint from ``ROWS``
+(``catalog_rows``): the row count and newest ``updated_at`` of the tables
+the scope's pages show. It is memoised per process for ``ROWS_TTL``
+seconds and dropped on every local bump, so an edit made elsewhere
+reaches this worker's pages and validators within ``ROWS_TTL``.
+
+Authenticated users, requests carrying flash messages and non-200
+responses are never cached and get no validators. The cache alias (``settings.CACHES``) decides
+the backend: local memory, file-based or database.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+
+from .models import Category, Movie, Playlist
+
+DEFAULTS = {
+    "ENABLED": True,
+    "ALIAS": "default",
+    "TIMEOUT": 600,
+    "LOCK_TIMEOUT": 30,
+    "LOCK_WAIT_MS": 2000,
+    "VERSION": "",  # deploy id: naye templates ke saath purane ETag/entries match na hon
+    "ROWS": "movies.page_cache.catalog_rows",
+    "ROWS_TTL": 5,
+}
+
+GENERATION_PREFIX = "pagegen:"
+MODIFIED_PREFIX = "pagemod:"
+PAGE_PREFIX = "page:"
+SCOPE_HOME = "home"
+SCOPE_CATALOG = "catalog"  # koi bhi Movie/Playlist/Category change
+MAX_MEMOISED_ROWS = 10_000
+
+
+def scope(kind, pk):
+    return f"{kind}:{pk}"
+
+
+def catalog_rows(name):
+    """``(fingerprint, last_modified)`` of the rows shown under scope ``name``: count and newest ``updated_at`` per table."""
+    kind, _, pk = name.partition(":")
+    if kind == SCOPE_HOME:
+        querysets = [Category.objects.all(), Playlist.objects.all(), Movie.objects.filter(playlist__isnull=True)]
+    elif kind == SCOPE_CATALOG:
+        querysets = [Category.objects.all(), Playlist.objects.all(), Movie.objects.all()]
+    elif kind == "category":
+        querysets = [Category.objects.filter(pk=pk), Playlist.objects.filter(category_id=pk), Movie.objects.filter(category_id=pk)]
+    elif kind == "playlist":
+        querysets = [Playlist.objects.filter(pk=pk), Movie.objects.filter(playlist_id=pk)]
+    elif kind == "movie":
+        querysets = [Movie.objects.filter(pk=pk)]
+    else:
+        querysets = []
+    fingerprint, modified = [], 0
+    for queryset in querysets:
+        found = queryset.aggregate(rows=Count("pk"), latest=Max("updated_at"))
+        latest = found["latest"].timestamp() if found["latest"] else 0
+        # Count deletes pakadta hai, updated_at inserts aur edits
+        fingerprint += [found["rows"], int(latest * 1_000_000)]
+        modified = max(modified, int(latest) + 1)
+    return tuple(fingerprint), modified
+
+
+def normalized_params(request):
+    """``(page, q)`` as used in the key: page is a positive int (else 1), q has its whitespace collapsed."""
+    page = request.GET.get("page", "")
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+    q = " ".join(request.GET.get("q", "").split())
+    return page, q
+
+
+def cacheable_request(request):
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if request.COOKIES.get(getattr(settings, "MESSAGE_COOKIE_NAME", "messages")):
+        return False
+    return not request.user.is_authenticated
+
+
+class PageCache:
+    def __init__(self, cache, timeout=600, lock_timeout=30, lock_wait_ms=2000, version="", rows=None, rows_ttl=5):
+        self.cache = cache
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait_ms / 1000
+        self.version = version
+        self.rows = rows
+        self.rows_ttl = rows_ttl
+        self.memoised_rows = {}
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "waited": 0, "bypassed": 0, "not_modified": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    # ------------------------------------------------------------------
+    # Generations
+    # ------------------------------------------------------------------
+    def state(self, scopes):
+        """``(generations, last_modified)`` of ``scopes`` with one ``get_many`` (when none is missing)."""
+        gen_keys = [GENERATION_PREFIX + name for name in scopes]
+        mod_keys = [MODIFIED_PREFIX + name for name in scopes]
+        found = self.cache.get_many(gen_keys + mod_keys)
+        missing = [key for key in gen_keys + mod_keys if key not in found]
+        if missing:
+            # Time-based start: evicted counter dobara 1 se shuru ho kar purane pages se match na kare
+            start = time.time_ns() // 1000
+            for key in missing:
+                self.cache.add(key, start if key.startswith(GENERATION_PREFIX) else start // 1_000_000, timeout=None)
+            found.update(self.cache.get_many(missing))
+        gens = tuple(found.get(key) for key in gen_keys)
+        modified = max((found.get(key) or 0 for key in mod_keys), default=0)
+        if self.rows is not None:
+            for name in scopes:
+                fingerprint, changed = self.scope_rows(name)
+                gens += (fingerprint,)
+                modified = max(modified, changed)
+        return gens, modified
+
+    def scope_rows(self, name):
+        """``self.rows(name)``, memoised for ``rows_ttl`` seconds."""
+        now = time.monotonic()
+        with self.lock:
+            found = self.memoised_rows.get(name)
+        if found is not None and found[0] > now:
+            return found[1]
+        value = self.rows(name)
+        with self.lock:
+            if len(self.memoised_rows) >= MAX_MEMOISED_ROWS:
+                self.memoised_rows.clear()
+            self.memoised_rows[name] = (now + self.rows_ttl, value)
+        return value
+
+    def generations(self, scopes):
+        return self.state(scopes)[0]
+
+    def bump(self, scopes):
+        # Agle second ka timestamp: isi second me pehle bheje gaye Last-Modified se match na ho
+        modified = int(time.time()) + 1
+        for name in scopes:
+            key = GENERATION_PREFIX + name
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns() // 1000, timeout=None)
+        self.cache.set_many({MODIFIED_PREFIX + name: modified for name in scopes}, timeout=None)
+        with self.lock:
+            for name in scopes:
+                self.memoised_rows.pop(name, None)
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+    def page_key(self, request):
+        page, q = normalized_params(request)
+        raw = f"{self.version}\n{request.path}\n{page}\n{q}"
+        return PAGE_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def etag(self, key, gens):
+        raw = f"{self.version}\n{key}\n{gens}"
+        return '"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32]
+
+    def not_modified(self, request, key, gens, modified):
+        """A 304 (or 412) when the request's validators still match, else None."""
+        response = get_conditional_response(request, etag=self.etag(key, gens), last_modified=modified)
+        if response is not None:
+            self.count("not_modified")
+            self.add_validators(response, key, gens, modified)
+        return response
+
+    def add_validators(self, response, key, gens, modified):
+        response["ETag"] = self.etag(key, gens)
+        response["Last-Modified"] = http_date(modified)
+        response["Cache-Control"] = "no-cache"  # browser har baar revalidate kare (304 sasta hai)
+        return response
+
+    def conditional(self, request, scopes, render):
+        """Validators only; the body is rendered every time. Key is the full path with query string."""
+        key = request.get_full_path()
+        gens, modified = self.state(scopes)
+        response = self.not_modified(request, key, gens, modified)
+        if response is not None:
+            return response
+        response = render()
+        if response.status_code == 200:
+            self.add_validators(response, key, gens, modified)
+        return response
+
+    def serve(self, request, scopes, render):
+        key = self.page_key(request)
+        lock_key = key + ":lock"
+        gens, modified = self.state(scopes)
+        response = self.not_modified(request, key, gens, modified)
+        if response is not None:
+            return response
+
+        entry = self.cache.get(key)
+        if entry is not None and entry["gens"] == gens:
+            self.count("hits")
+            return self.to_response(entry, key)
+
+        if not self.cache.add(lock_key, 1, timeout=self.lock_timeout):
+            if entry is not None:
+                self.count("stale")
+                return self.to_response(entry, key)
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = self.cache.get(key)
+                if entry is not None and entry["gens"] == gens:
+                    self.count("waited")
+                    return self.to_response(entry, key)
+
+        self.count("misses")
+        try:
+            response = render()
+            if response.status_code == 200 and not response.streaming:
+                self.cache.set(key, {
+                    "gens": gens,
+                    "modified": modified,
+                    "content": response.content,
+                    "content_type": response.get("Content-Type"),
+                }, timeout=self.timeout)
+                self.add_validators(response, key, gens, modified)
+            return response
+        finally:
+            self.cache.delete(lock_key)
+
+    def to_response(self, entry, key):
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        response["X-Page-Cache"] = "hit"
+        # Stale copy ke validators uski apni generations se, taaki agli request use refresh kare
+        return self.add_validators(response, key, entry["gens"], entry.get("modified", 0))
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+# ----------------------------------------------------------------------
+# Process-wide cache
+# ----------------------------------------------------------------------
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def page_cache_settings():
+    return {**DEFAULTS, **getattr(settings, "PAGE_CACHE", {})}
+
+
+def get_page_cache():
+    """The process-wide page cache, or None when it is disabled."""
+    global _page_cache
+    conf = page_cache_settings()
+    if not conf["ENABLED"]:
+        return None
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache(
+                    caches[conf["ALIAS"]],
+                    timeout=conf["TIMEOUT"],
+                    lock_timeout=conf["LOCK_TIMEOUT"],
+                    lock_wait_ms=conf["LOCK_WAIT_MS"],
+                    version=conf["VERSION"],
+                    rows=import_string(conf["ROWS"]) if conf["ROWS"] else None,
+                    rows_ttl=conf["ROWS_TTL"],
+                )
+    return _page_cache
+
+
+def reset_page_cache():
+    global _page_cache
+    _page_cache = None
+
+
+def invalidate(scopes):
+    """
+    Bumps the generations of ``scopes`` now and again after the current
+    transaction commits. A page rebuilt by another request before the
+    commit (from the old rows) is then not kept under the new generation.
+    """
+    page_cache = get_page_cache()
+    if page_cache is None or not scopes:
+        return
+    scopes = sorted(scopes)
+    page_cache.bump(scopes)
+    transaction.on_commit(lambda: page_cache.bump(scopes))
+
+
+def cached_page(*scopes):
+    """View decorator. ``scopes`` are format strings filled from the view's kwargs."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_cache = get_page_cache()
+            if page_cache is None or not cacheable_request(request):
+                if page_cache is not None:
+                    page_cache.count("bypassed")
+                return view(request, *args, **kwargs)
+            names = [name.format(**kwargs) for name in scopes]
+            return page_cache.serve(request, names, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def conditional_page(*scopes):
+    """Like ``cached_page`` but only answers conditional requests; for views whose body is cheap or varied."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_cache = get_page_cache()
+            if page_cache is None or not cacheable_request(request):
+                return view(request, *args, **kwargs)
+            names = [name.format(**kwargs) for name in scopes]
+            return page_cache.conditional(request, names, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
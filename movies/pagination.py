@@ -0,0 +1,164 @@
+"""
+Database-side pagination for the catalog grids (home and category pages).
+
+The grid mixes two tables, so instead of loading both into Python and
+sorting there, ``CatalogQuery`` pushes the merge into a single ordered
+``UNION ALL`` with LIMIT/OFFSET and only loads the rows of the requested
+page. ``CatalogPaginator`` knows the grid layout: 24 cards on page 1 and
+20 on every page after that.
+"""
+from math import ceil
+
+from django.core.paginator import Page, Paginator
+from django.db.models import F, Value
+from django.utils.functional import cached_property
+
+from .ordering import NO_NUMBER
+
+KIND_PLAYLIST = 0
+KIND_MOVIE = 1
+
+FIRST_PAGE_SIZE = 24
+PAGE_SIZE = 20
+
+
+class CatalogRows:
+    """
+    Base class for lazily-sliced playlist + movie listings.
+
+    Subclasses return ``(kind, id)`` rows for a slice; this class turns them
+    back into model instances with one ``in_bulk`` query per table.
+    """
+
+    def __init__(self, playlists, movies, as_items=False):
+        self.playlists = playlists
+        self.movies = movies
+        # Category page template ko {"type": ..., "obj": ...} dicts chahiye
+        self.as_items = as_items
+
+    def count(self):
+        raise NotImplementedError
+
+    def rows(self, start, stop):
+        raise NotImplementedError
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice) or k.step not in (None, 1):
+            raise TypeError("Catalog listings only support contiguous slices.")
+        start = k.start or 0
+        stop = k.stop if k.stop is not None else self.count()
+        if start >= stop:
+            return []
+        return self.hydrate(self.rows(start, stop))
+
+    def hydrate(self, rows):
+        playlist_ids = [pk for kind, pk in rows if kind == KIND_PLAYLIST]
+        movie_ids = [pk for kind, pk in rows if kind == KIND_MOVIE]
+        found = {
+            KIND_PLAYLIST: self.playlists.in_bulk(playlist_ids) if playlist_ids else {},
+            KIND_MOVIE: self.movies.in_bulk(movie_ids) if movie_ids else {},
+        }
+
+        objects = []
+        for kind, pk in rows:
+            obj = found[kind].get(pk)
+            if obj is None:
+                continue  # row deleted between the two queries
+            if self.as_items:
+                obj = {"type": "playlist" if kind == KIND_PLAYLIST else "movie", "obj": obj}
+            objects.append(obj)
+        return objects
+
+
+class CatalogQuery(CatalogRows):
+    """
+    Pages over playlists + movies with one ordered ``UNION ALL`` query.
+
+    ``sort_fields`` are columns (or annotations) present on both querysets;
+    ``ordering`` may refer to them, plus ``kind`` and ``id``. The default is
+    newest first, with rows that have no ``created_at`` at the end.
+    """
+
+    def __init__(self, playlists, movies, sort_fields=("created_at",), ordering=None, as_items=False):
+        super().__init__(playlists, movies, as_items=as_items)
+        self.sort_fields = tuple(sort_fields)
+        self.ordering = ordering or (F("created_at").desc(nulls_last=True), "kind", "-id")
+
+    @classmethod
+    def ranked(cls, playlists, movies, as_items=False):
+        """Search results: querysets annotated with ``rank`` (see ``movies.search``), best match first."""
+        return cls(
+            playlists,
+            movies,
+            sort_fields=("rank", "created_at"),
+            ordering=("-rank", F("created_at").desc(nulls_last=True), "kind", "-id"),
+            as_items=as_items,
+        )
+
+    @classmethod
+    def numbered(cls, playlists, movies, as_items=False):
+        """Category "Movie Order" mode: movies by ``order_num`` (1, 2, 3...), then playlists."""
+        return cls(
+            playlists.annotate(order_num=Value(NO_NUMBER)),
+            movies,
+            sort_fields=("order_num",),
+            ordering=("-kind", "order_num", "id"),
+            as_items=as_items,
+        )
+
+    def _union(self):
+        fields = ("kind", "id", *self.sort_fields)
+        playlists = self.playlists.annotate(kind=Value(KIND_PLAYLIST)).values_list(*fields)
+        movies = self.movies.annotate(kind=Value(KIND_MOVIE)).values_list(*fields)
+        return playlists.union(movies, all=True)
+
+    def count(self):
+        return self._union().count()
+
+    def rows(self, start, stop):
+        page = self._union().order_by(*self.ordering)[start:stop]
+        return [(row[0], row[1]) for row in page]
+
+
+class CatalogPage(Page):
+    def start_index(self):
+        if self.paginator.count == 0:
+            return 0
+        return self.paginator.page_bounds(self.number)[0] + 1
+
+    def end_index(self):
+        return self.paginator.page_bounds(self.number)[0] + len(self)
+
+
+class CatalogPaginator(Paginator):
+    """Paginator whose first page holds more items than the following ones."""
+
+    def __init__(self, object_list, per_page=PAGE_SIZE, first_page_size=FIRST_PAGE_SIZE, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.first_page_size = int(first_page_size)
+
+    @cached_property
+    def num_pages(self):
+        if self.count == 0 and not self.allow_empty_first_page:
+            return 0
+        rest = max(self.count - self.first_page_size, 0)
+        return 1 + ceil(rest / self.per_page)
+
+    def page_bounds(self, number):
+        """Returns the ``[bottom, top)`` item offsets of page ``number``."""
+        if number == 1:
+            return 0, self.first_page_size
+        bottom = self.first_page_size + (number - 2) * self.per_page
+        return bottom, bottom + self.per_page
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom, top = self.page_bounds(number)
+        top = min(top, self.count)
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+    def _get_page(self, *args, **kwargs):
+        return CatalogPage(*args, **kwargs)
@@ -0,0 +1,115 @@
+"""
+Responsive poster URLs, built once and stored on the row.
+
+Building a Cloudinary URL costs tens of microseconds, and the cards
+needed one per card on every render, always at full size. ``Movie.poster``
+and ``Playlist.banner`` now each have a ``VariantsField`` next to them
+(``poster_variants`` / ``banner_variants``). Its ``pre_save`` runs after
+the image field has uploaded. It stores the URLs for ``WIDTHS`` (``c_limit``,
+auto format and quality) and the intrinsic width and height from the
+upload response:
+
+    {"source": "image/upload/v1/posters/x", "urls": {"160": ..., "320": ..., "640": ...},
+     "width": 1000, "height": 1500}
+
+``variants(obj, "poster")`` returns the stored dict while its ``source``
+still matches the field. Otherwise (rows changed with ``update()``,
+or not yet backfilled) it builds the dict with an in-process LRU keyed by
+the stored value. The ``{% poster_img %}`` tag in ``templatetags/poster_tags.py``
+turns it into ``<img src srcset sizes width height>``. Old rows are filled
+by ``manage.py backfill_poster_variants``. Its ``--fetch-dimensions`` option
+also asks the Cloudinary Admin API for the sizes, 100 ids per call.
+"""
+from functools import lru_cache
+
+from cloudinary import CloudinaryResource
+from cloudinary.models import CloudinaryField
+from django.db import models
+
+WIDTHS = (160, 320, 640)
+SRC_WIDTH = 320  # srcset na samajhne wale browsers ke liye
+TRANSFORMATION = {"crop": "limit", "fetch_format": "auto", "quality": "auto"}
+CARD_SIZES = "(max-width: 575px) 50vw, (max-width: 767px) 33vw, 25vw"
+
+_parser = CloudinaryField()
+
+
+def source_value(value):
+    """The stored ``image/upload/...`` string of an image field value, or None (empty / not uploaded yet)."""
+    if isinstance(value, CloudinaryResource):
+        return value.get_prep_value() or None
+    if isinstance(value, str) and value:
+        return normalized(value)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def normalized(value):
+    # "posters/x" aur DB se aaya "image/upload/posters/x" ek hi image hain
+    return _parser.parse_cloudinary_resource(value).get_prep_value()
+
+
+@lru_cache(maxsize=4096)
+def build_urls(source):
+    resource = _parser.parse_cloudinary_resource(source)
+    return {str(width): resource.build_url(width=width, secure=True, **TRANSFORMATION) for width in WIDTHS}
+
+
+def build_variants(value, previous=None):
+    """Variants of image field ``value``. Dimensions come from a fresh upload, else from ``previous`` if it is the same image."""
+    source = source_value(value)
+    if source is None:
+        return {}
+    width = height = None
+    metadata = getattr(value, "metadata", None) or {}
+    if metadata.get("width"):
+        width, height = metadata["width"], metadata.get("height")
+    elif previous and previous.get("source") == source:
+        width, height = previous.get("width"), previous.get("height")
+    return {"source": source, "urls": build_urls(source), "width": width, "height": height}
+
+
+def variants(obj, field):
+    stored = getattr(obj, f"{field}_variants", None) or {}
+    source = source_value(getattr(obj, field))
+    if source is None:
+        return {}
+    if stored.get("source") == source:
+        return stored
+    return {"source": source, "urls": build_urls(source), "width": None, "height": None}
+
+
+def srcset(found):
+    return ", ".join(f"{url} {width}w" for width, url in found["urls"].items())
+
+
+def variant_url(found, width=SRC_WIDTH):
+    """URL of the smallest stored variant at least ``width`` wide (the largest one if none is)."""
+    urls = found["urls"]
+    wide_enough = [int(w) for w in urls if int(w) >= width]
+    return urls[str(min(wide_enough))] if wide_enough else urls[str(max(map(int, urls)))]
+
+
+class VariantsField(models.JSONField):
+    """JSON column holding ``build_variants()`` of the image field ``source``; declare it after that field."""
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault("default", dict)
+        kwargs.setdefault("blank", True)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["source"] = self.source
+        for key, value in (("default", dict), ("blank", True), ("editable", False)):
+            if kwargs.get(key) == value:
+                del kwargs[key]
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        # Image field ka pre_save (upload) pehle chal chuka hai: fields declaration order me save hote hain
+        value = build_variants(getattr(model_instance, self.source), getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
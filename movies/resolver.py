@@ -0,0 +1,128 @@
+"""
+In-process cache for the ``download_movie`` redirect: movie id -> (download_link, title).
+
+On a warm cache the redirect path runs no catalog queries at all. The
+cache is an LRU bounded by ``MAX_SIZE``. The first lookup bulk-loads the
+newest ``MAX_SIZE`` movies (when ``WARM`` is set); after that, misses are
+filled one at a time with a two-column query. ``Movie`` save/delete
+receivers in ``signals.py`` evict the entry in this process, and ``TTL``
+bounds how long another worker can keep serving an old link.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Movie
+
+DEFAULTS = {
+    "ENABLED": True,
+    "MAX_SIZE": 10000,
+    "TTL": 300,
+    "WARM": True,
+}
+
+
+class DownloadResolver:
+    def __init__(self, max_size=10000, ttl=300, warm=True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # movie_id -> (download_link, title, expires_at)
+        self.lock = threading.Lock()
+        self.needs_warm = warm
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self):
+        """Bulk-loads the newest ``max_size`` movies in one query."""
+        rows = (
+            Movie.objects.order_by("-id")
+            .values_list("id", "download_link", "title")[:self.max_size]
+        )
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            self.needs_warm = False
+            # Purani movies pehle daalo taaki LRU me naye wale "recent" rahein
+            for pk, link, title in reversed(list(rows)):
+                self.entries[pk] = (link, title, expires_at)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def resolve(self, movie_id):
+        """Returns ``(download_link, title)`` or None if the movie doesn't exist."""
+        if self.needs_warm:
+            self.warm()
+
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(movie_id)
+            if entry is not None and entry[2] > now:
+                self.entries.move_to_end(movie_id)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        row = Movie.objects.filter(pk=movie_id).values_list("download_link", "title").first()
+        if row is None:
+            return None
+        with self.lock:
+            self.entries[movie_id] = (row[0], row[1], now + self.ttl)
+            self.entries.move_to_end(movie_id)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return row
+
+    def invalidate(self, movie_id):
+        with self.lock:
+            self.entries.pop(movie_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+# ----------------------------------------------------------------------
+# Process-wide resolver
+# ----------------------------------------------------------------------
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def resolver_settings():
+    return {**DEFAULTS, **getattr(settings, "DOWNLOAD_RESOLVER", {})}
+
+
+def get_resolver():
+    """The process-wide resolver, or None when the cache is disabled."""
+    global _resolver
+    conf = resolver_settings()
+    if not conf["ENABLED"]:
+        return None
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = DownloadResolver(max_size=conf["MAX_SIZE"], ttl=conf["TTL"], warm=conf["WARM"])
+    return _resolver
+
+
+def resolve_download(movie_id):
+    """``(download_link, title)`` for a movie, from the cache when it is enabled."""
+    resolver = get_resolver()
+    if resolver is None:
+        return Movie.objects.filter(pk=movie_id).values_list("download_link", "title").first()
+    return resolver.resolve(movie_id)
+
+
+def invalidate_download(movie_id):
+    if _resolver is not None:
+        _resolver.invalidate(movie_id)
+
+
+def reset_resolver():
+    global _resolver
+    _resolver = None
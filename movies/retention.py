@@ -0,0 +1,380 @@
+"""
+Retention for ``DownloadLog``: archive old months to gzip JSONL, then remove them.
+
+On PostgreSQL the table is range-partitioned by month on ``download_time``
+(migration 0014). There is one partition per UTC month, named
+``movies_downloadlog_pYYYYMM``, plus a default partition. A month that is
+archived is detached and dropped as a whole. On other databases (SQLite
+locally) the month's rows are deleted in id chunks instead.
+
+Either way, a month is removed only after its archive file has been
+written, read back, and found to hold exactly as many rows as the
+database. It must also have been copied to the ``STORAGE`` backend.
+``ARCHIVE_DIR`` is only scratch space: on Render the disk goes away with
+every deploy. Without a storage nothing is dropped. Archives are
+``downloadlog-YYYY-MM.jsonl.gz`` with one JSON object per row.
+``restore_archive()`` loads a file back (recreating the partition if
+needed) and skips ids that are already present.
+
+``ensure_partitions()`` (the scheduled ``ensure_download_log_partitions``
+command) keeps ``MONTHS_AHEAD`` partitions ready. It also gives every
+month found in the default partition a partition of its own and moves
+those rows into it.
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import cloudinary.uploader
+import cloudinary.utils
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import DownloadLog
+
+DEFAULTS = {
+    "MAX_AGE_DAYS": 180,
+    "ARCHIVE_DIR": os.path.join(settings.BASE_DIR, "var", "archive", "downloads"),
+    "CHUNK_SIZE": 5000,
+    "MONTHS_AHEAD": 3,
+    "STORAGE": "movies.retention.CloudinaryArchiveStorage",  # None: kuch drop nahi hota
+    "STORAGE_OPTIONS": {},
+}
+
+PARTITION_RE = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def retention_settings():
+    return {**DEFAULTS, **getattr(settings, "DOWNLOAD_LOG_RETENTION", {})}
+
+
+# ----------------------------------------------------------------------
+# Archive storage
+# ----------------------------------------------------------------------
+class ArchiveStorage:
+    """Keeps a copy of each archive that outlives the machine that wrote it."""
+
+    def save(self, path, name):
+        """Copies the file at ``path`` as ``name``; raises ``ArchiveError`` unless the copy is complete."""
+        raise NotImplementedError
+
+    def fetch(self, name, path):
+        """Writes the copy called ``name`` to ``path``; returns False if there is none."""
+        raise NotImplementedError
+
+
+class CloudinaryArchiveStorage(ArchiveStorage):
+    """Raw ``authenticated`` files (the rows hold IP addresses): only signed URLs can read them."""
+
+    def __init__(self, folder="archives/downloads"):
+        self.folder = folder
+
+    def save(self, path, name):
+        result = cloudinary.uploader.upload_large(path, public_id=f"{self.folder}/{name}", resource_type="raw",
+                                                  type="authenticated", overwrite=True)
+        if result.get("bytes") != os.path.getsize(path):
+            raise ArchiveError(f"{name}: uploaded {result.get('bytes')} bytes, the file has {os.path.getsize(path)}")
+
+    def fetch(self, name, path):
+        url, _ = cloudinary.utils.cloudinary_url(f"{self.folder}/{name}", resource_type="raw",
+                                                 type="authenticated", sign_url=True)
+        response = requests.get(url, stream=True, timeout=60)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+        os.replace(path + ".tmp", path)
+        return True
+
+
+class LocalArchiveStorage(ArchiveStorage):
+    """Copies archives to ``root``; only for a directory on a persistent disk (or a mounted bucket)."""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(settings.BASE_DIR, "var", "archive", "stored")
+
+    def save(self, path, name):
+        target = os.path.join(self.root, name)
+        os.makedirs(self.root, exist_ok=True)
+        shutil.copyfile(path, target + ".tmp")
+        if os.path.getsize(target + ".tmp") != os.path.getsize(path):
+            raise ArchiveError(f"{target}: copy is incomplete")
+        os.replace(target + ".tmp", target)
+
+    def fetch(self, name, path):
+        source = os.path.join(self.root, name)
+        if not os.path.exists(source):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(source, path)
+        return True
+
+
+def get_archive_storage(path=None, **kwargs):
+    """The configured ``ArchiveStorage`` (built with ``STORAGE_OPTIONS``), or None when ``STORAGE`` is unset."""
+    conf = retention_settings()
+    path = path or conf["STORAGE"]
+    return import_string(path)(**{**conf["STORAGE_OPTIONS"], **kwargs}) if path else None
+
+
+# ----------------------------------------------------------------------
+# Months
+# ----------------------------------------------------------------------
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_range(month):
+    return DownloadLog.objects.filter(download_time__gte=month, download_time__lt=add_months(month, 1))
+
+
+def archive_path(archive_dir, month):
+    return os.path.join(archive_dir, f"downloadlog-{month:%Y-%m}.jsonl.gz")
+
+
+# ----------------------------------------------------------------------
+# PostgreSQL partitions
+# ----------------------------------------------------------------------
+def table_name():
+    return DownloadLog._meta.db_table
+
+
+def partition_name(month):
+    return f"{table_name()}_p{month:%Y%m}"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s)",
+            [table_name()],
+        )
+        return cursor.fetchone()[0]
+
+
+def partition_months():
+    """Months that currently have their own partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [table_name()],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = []
+    for name in names:
+        match = PARTITION_RE.search(name)
+        if match:
+            months.append(datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc))
+    return sorted(months)
+
+
+def ensure_partition(month):
+    """Creates the partition for ``month`` and moves any of its rows out of the default partition."""
+    table, name = table_name(), partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+        if cursor.fetchone()[0]:
+            return False
+        cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        # Restore ya der se aaye rows default partition me pade ho sakte hain
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {table}_default WHERE download_time >= %s AND download_time < %s "
+            f"RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    return True
+
+
+def default_partition_months():
+    """Months that have rows in the default partition, i.e. no partition of their own yet."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', download_time AT TIME ZONE 'UTC') FROM {table_name()}_default"
+        )
+        return sorted(row[0].replace(tzinfo=dt_timezone.utc) for row in cursor.fetchall())
+
+
+def ensure_partitions(months_ahead=None):
+    """
+    Makes sure the current month and the next ``MONTHS_AHEAD`` have
+    partitions, and moves rows out of the default partition into their own.
+    Returns the months whose partition was created.
+    """
+    if months_ahead is None:
+        months_ahead = retention_settings()["MONTHS_AHEAD"]
+    current = month_start(timezone.now())
+    months = {add_months(current, i) for i in range(months_ahead + 1)} | set(default_partition_months())
+    return [month for month in sorted(months) if ensure_partition(month)]
+
+
+# ----------------------------------------------------------------------
+# Archive / remove
+# ----------------------------------------------------------------------
+def months_to_archive(cutoff, partitioned):
+    """Whole months that ended before ``cutoff`` and still have a partition (or, unpartitioned, rows)."""
+    if partitioned:
+        months = partition_months()
+    else:
+        oldest = DownloadLog.objects.order_by("download_time").values_list("download_time", flat=True).first()
+        if oldest is None:
+            return []
+        months, month = [], month_start(oldest)
+        while add_months(month, 1) <= cutoff:
+            if month_range(month).exists():
+                months.append(month)
+            month = add_months(month, 1)
+    return [month for month in months if add_months(month, 1) <= cutoff]
+
+
+def export_month(month, path, chunk_size=5000):
+    """Writes the month's rows to ``path`` and reads the file back. Returns ``(rows, max_id)``."""
+    fields = [field.attname for field in DownloadLog._meta.concrete_fields]
+    rows = month_range(month).order_by("id").values(*fields).iterator(chunk_size=chunk_size)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    written, max_id = 0, 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as archive:
+        for row in rows:
+            row["download_time"] = row["download_time"].isoformat()
+            archive.write(json.dumps(row, default=str) + "\n")
+            written += 1
+            max_id = row["id"]
+
+    with gzip.open(tmp, "rt", encoding="utf-8") as archive:
+        read_back = sum(1 for line in archive if line.strip())
+    if read_back != written:
+        raise ArchiveError(f"{tmp}: wrote {written} rows but read back {read_back}")
+    os.replace(tmp, path)
+    return written, max_id
+
+
+def drop_partition(month, expected):
+    table, name = table_name(), partition_name(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        cursor.execute(f"SELECT count(*) FROM {name}")
+        found = cursor.fetchone()[0]
+        if found != expected:
+            # ArchiveError se transaction rollback hota hai, partition wapas attach rehta hai
+            raise ArchiveError(f"{name} has {found} rows but the archive has {expected}, not dropping it")
+        # Isi transaction me move/insert hue rows ke deferred FK checks pehle chala do, warna DROP nahi hota
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"DROP TABLE {name}")
+
+
+def delete_month(month, expected, max_id, chunk_size=5000):
+    rows = month_range(month).filter(id__lte=max_id)
+    found = rows.count()
+    if found != expected:
+        raise ArchiveError(f"{month:%Y-%m} has {found} rows but the archive has {expected}, not deleting them")
+    deleted = 0
+    while True:
+        ids = list(rows.order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += DownloadLog.objects.filter(id__in=ids).delete()[0]
+
+
+def archive_old_months(max_age_days=None, archive_dir=None, chunk_size=None, dry_run=False, log=None):
+    """
+    Archives and removes every whole month older than ``max_age_days``.
+
+    Returns ``[(month, rows, path)]``. ``log`` is called with a progress line per month.
+    """
+    conf = retention_settings()
+    max_age_days = conf["MAX_AGE_DAYS"] if max_age_days is None else max_age_days
+    archive_dir = archive_dir or str(conf["ARCHIVE_DIR"])
+    chunk_size = chunk_size or conf["CHUNK_SIZE"]
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    storage = get_archive_storage()
+    if storage is None and not dry_run:
+        raise ArchiveError("DOWNLOAD_LOG_RETENTION['STORAGE'] is not set: not dropping rows whose archive "
+                           "would only exist on local disk")
+
+    partitioned = is_partitioned()
+    if partitioned and not dry_run:
+        ensure_partitions(conf["MONTHS_AHEAD"])
+
+    done = []
+    for month in months_to_archive(cutoff, partitioned):
+        path = archive_path(archive_dir, month)
+        if dry_run:
+            done.append((month, month_range(month).count(), path))
+            continue
+        rows, max_id = export_month(month, path, chunk_size)
+        storage.save(path, os.path.basename(path))
+        if partitioned:
+            drop_partition(month, rows)
+        else:
+            delete_month(month, rows, max_id, chunk_size)
+        done.append((month, rows, path))
+        if log:
+            log(f"  {month:%Y-%m}: {rows} rows -> {path}")
+    return done
+
+
+# ----------------------------------------------------------------------
+# Restore
+# ----------------------------------------------------------------------
+def read_archive(path):
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore_archive(path, chunk_size=5000):
+    """Loads an archive back into DownloadLog. Rows whose id already exists are skipped."""
+    fields = {field.attname for field in DownloadLog._meta.concrete_fields}
+    partitioned = is_partitioned()
+    ensured = set()
+
+    def insert(batch):
+        if partitioned:
+            for month in {month_start(obj.download_time) for obj in batch} - ensured:
+                ensure_partition(month)
+                ensured.add(month)
+        existing = set(DownloadLog.objects.filter(id__in=[obj.id for obj in batch]).values_list("id", flat=True))
+        DownloadLog.objects.bulk_create([obj for obj in batch if obj.id not in existing], batch_size=chunk_size)
+        return len(batch) - len(existing)
+
+    restored, batch = 0, []
+    for row in read_archive(path):
+        # Purane archives me jo columns ab nahi hain unhe chhod do
+        row = {key: value for key, value in row.items() if key in fields}
+        row["download_time"] = parse_datetime(row["download_time"])
+        batch.append(DownloadLog(**row))
+        if len(batch) >= chunk_size:
+            restored += insert(batch)
+            batch = []
+    if batch:
+        restored += insert(batch)
+    return restored
@@ -0,0 +1,178 @@
+"""
+Incremental download rollups.
+
+``roll_up()`` reads the ``DownloadLog`` rows above the ``"downloads"``
+watermark in id windows. For each window it adds the counts to the hourly
+and daily rollup tables and to ``Movie.download_count``. The increments and
+the new watermark are saved in the same transaction, so re-running after a
+crash neither double counts nor skips rows. Rollup rows are keyed on
+``(bucket, movie)``; the logged title is the key only for rows whose movie
+is gone (deleted). Run ``backfill_download_log_refs`` first for old rows
+that only have a title.
+
+Ids are handed out when a row is inserted, not when it commits. On
+PostgreSQL, a batch holding id 100 can commit after id 101 is already
+visible. A watermark moved straight to ``max(id)`` would skip id 100 for
+good. So each run rolls up only to the highest id the previous run saw,
+kept in the ``"downloads:seen"`` watermark, and only once that is at
+least ``LAG`` old. Every lower id has committed or rolled back by then.
+
+Dashboards read ``top_movies()``, whose cost depends on the number of
+movies, not the number of downloads.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import DownloadLog, DownloadRollupDaily, DownloadRollupHourly, Movie, RollupWatermark
+
+WATERMARK = "downloads"
+SEEN = "downloads:seen"
+WINDOW = 50000  # ek transaction me itni DownloadLog ids
+LAG = timedelta(minutes=2)  # koi bhi DownloadLog insert transaction isse lamba nahi chalta
+
+
+def day_bucket(hour_bucket):
+    return timezone.localtime(hour_bucket).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_to_rollup(model, counts, titles):
+    """
+    Adds ``{(bucket, movie_id, title): downloads}`` to a rollup table (read,
+    then bulk update/insert). Rows of a movie are keyed on the movie, with
+    ``title`` None; only rows without a movie are keyed on their title.
+    ``titles`` gives the title stored on new rows of each movie.
+    """
+    if not counts:
+        return
+    buckets = {bucket for bucket, _, _ in counts}
+    movie_ids = {movie_id for _, movie_id, _ in counts} - {None}
+    orphans = {title for _, movie_id, title in counts if movie_id is None}
+    existing = {}
+    # -id: movie delete hone par ek title ki kai orphan rows ho sakti hain, sabse purani me jodo
+    for row in (model.objects.filter(bucket__in=buckets)
+                .filter(Q(movie_id__in=movie_ids) | Q(movie__isnull=True, movie_title__in=orphans))
+                .order_by("-id")):
+        existing[(row.bucket, row.movie_id, None if row.movie_id else row.movie_title)] = row
+
+    to_update, to_create = [], []
+    for (bucket, movie_id, title), downloads in counts.items():
+        row = existing.get((bucket, movie_id, title))
+        if row is None:
+            to_create.append(model(bucket=bucket, movie_id=movie_id, movie_title=title or titles[movie_id],
+                                   downloads=downloads))
+        else:
+            row.downloads += downloads
+            to_update.append(row)
+    model.objects.bulk_update(to_update, ["downloads"], batch_size=1000)
+    model.objects.bulk_create(to_create, batch_size=1000)
+
+
+def roll_up_window(low, high):
+    """Aggregates DownloadLog ids in ``(low, high]``. Must run inside the watermark transaction."""
+    logs = DownloadLog.objects.filter(id__gt=low, id__lte=high).annotate(hour=TruncHour("download_time"))
+    # Movie wali rows movie_id par group hoti hain (title string par nahi); title sirf nayi rollup row ke liye
+    rows = [
+        {**row, "movie_title": None}
+        for row in logs.filter(movie__isnull=False)
+        .values("movie_id", "hour")
+        .annotate(downloads=Count("id"), title=Max("movie_title"))
+        .order_by()
+    ]
+    rows += [
+        {**row, "movie_id": None}
+        for row in logs.filter(movie__isnull=True)
+        .values("movie_title", "hour")
+        .annotate(downloads=Count("id"))
+        .order_by()
+    ]
+
+    hourly = defaultdict(int)
+    daily = defaultdict(int)
+    per_movie = defaultdict(int)
+    titles = {}
+    for row in rows:
+        movie_id, title = row["movie_id"], row["movie_title"]
+        hourly[(row["hour"], movie_id, title)] += row["downloads"]
+        daily[(day_bucket(row["hour"]), movie_id, title)] += row["downloads"]
+        if movie_id is not None:
+            per_movie[movie_id] += row["downloads"]
+            titles[movie_id] = row["title"]
+
+    add_to_rollup(DownloadRollupHourly, hourly, titles)
+    add_to_rollup(DownloadRollupDaily, daily, titles)
+
+    if per_movie:
+        Movie.objects.filter(pk__in=per_movie).update(
+            download_count=F("download_count") + Case(
+                *(When(pk=pk, then=Value(downloads)) for pk, downloads in per_movie.items()),
+                default=Value(0),
+            )
+        )
+    return sum(hourly.values())
+
+
+def settled_id(lag=LAG):
+    """
+    Highest DownloadLog id below which no insert can still commit: the
+    newest id seen at least ``lag`` ago (then the current newest is
+    remembered for the next run). 0 when nothing has settled yet.
+    """
+    newest = DownloadLog.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    if not lag:
+        return newest
+    with transaction.atomic():
+        seen, created = RollupWatermark.objects.get_or_create(name=SEEN, defaults={"last_id": newest})
+        seen = RollupWatermark.objects.select_for_update().get(pk=seen.pk)
+        if created or seen.updated_at > timezone.now() - lag:
+            return 0
+        settled = seen.last_id
+        seen.last_id = newest
+        seen.save(update_fields=["last_id", "updated_at"])
+    return settled
+
+
+def roll_up(window=WINDOW, lag=LAG):
+    """Processes the DownloadLog rows above the watermark up to ``settled_id(lag)``. Returns the number rolled up."""
+    settled = settled_id(lag)
+    total = 0
+    while True:
+        with transaction.atomic():
+            mark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+            mark = RollupWatermark.objects.select_for_update().get(pk=mark.pk)
+            newest = (DownloadLog.objects.filter(id__gt=mark.last_id, id__lte=settled)
+                      .order_by("-id").values_list("id", flat=True).first())
+            if newest is None:
+                return total
+            high = min(newest, mark.last_id + window)
+            total += roll_up_window(mark.last_id, high)
+            mark.last_id = high
+            mark.save(update_fields=["last_id", "updated_at"])
+
+
+def top_movies(limit=5, since=None):
+    """
+    Most downloaded movies as ``{"movie_title", "download_count"}`` dicts.
+
+    All-time totals come from ``Movie.download_count``; with ``since`` the
+    hourly rollups after that moment are summed per movie instead. Both
+    list only movies still in the catalog, under their current title.
+    """
+    if since is None:
+        return list(
+            Movie.objects.filter(download_count__gt=0)
+            .order_by("-download_count", "id")
+            .annotate(movie_title=F("title"))
+            .values("movie_title", "download_count")[:limit]
+        )
+    return list(
+        DownloadRollupHourly.objects.filter(bucket__gte=since, movie__isnull=False)
+        .values("movie_id")
+        .annotate(movie_title=F("movie__title"), download_count=Sum("downloads"))
+        .order_by("-download_count", "movie_id")
+        .values("movie_title", "download_count")[:limit]
+    )
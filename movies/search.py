@@ -0,0 +1,194 @@
+"""
+Pluggable full-text search for movies and playlists.
+
+``get_search_backend()`` picks an implementation for the active database
+(or the dotted path in ``settings.SEARCH_BACKEND``):
+
+* PostgreSQL: a stored ``tsvector`` column per model with a GIN index,
+  ranked with ``ts_rank``.
+* SQLite: one FTS5 virtual table per model (``<db_table>_fts``, rowid = pk),
+  ranked with ``bm25``. Mainly for local development and tests.
+* Anything else: the old ``icontains`` filter, with a constant rank.
+
+``search()`` returns the queryset filtered to matching rows and, when
+``ranked`` is true, annotated with a ``rank`` column (higher is better).
+The index is kept current by the save/delete receivers in ``signals.py``
+and can be rebuilt with ``manage.py rebuild_search_index``.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Movie, Playlist
+
+# Model -> (field, weight) jo index me jaate hain. Weight A title ke liye, B baaki text.
+SEARCH_FIELDS = {
+    Movie: (("title", "A"), ("description", "B")),
+    Playlist: (("name", "A"),),
+}
+
+
+def tokenize(text):
+    """Lowercased word tokens of a user query, safe to splice into FTS syntax."""
+    return re.findall(r"\w+", (text or "").lower())
+
+
+class SearchBackend:
+    def search(self, queryset, text, ranked=True):
+        raise NotImplementedError
+
+    def update(self, instance):
+        """Indexes (or re-indexes) one saved instance."""
+
+    def remove(self, instance):
+        """Drops one deleted instance from the index."""
+
+    def update_many(self, model, pks):
+        """Indexes the saved rows ``pks`` of ``model`` (rows written with ``bulk_create``, no signals)."""
+        for instance in model._default_manager.filter(pk__in=list(pks)):
+            self.update(instance)
+
+    def rebuild(self):
+        """Rebuilds the whole index; returns the number of indexed rows."""
+        return 0
+
+
+class IcontainsSearchBackend(SearchBackend):
+    """Fallback for databases without a full-text engine we know about."""
+
+    def search(self, queryset, text, ranked=True):
+        (field, _), *_ = SEARCH_FIELDS[queryset.model]
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset.none()
+        condition = Q()
+        for token in tokens:
+            condition &= Q(**{f"{field}__icontains": token})
+        queryset = queryset.filter(condition)
+        if ranked:
+            queryset = queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+        return queryset
+
+
+class PostgresSearchBackend(SearchBackend):
+    config = "simple"  # titles Hindi/English mix hain, stemming se zyada nuksaan hota hai
+
+    def vector(self, model):
+        vectors = [SearchVector(field, weight=weight, config=self.config) for field, weight in SEARCH_FIELDS[model]]
+        combined = vectors[0]
+        for vector in vectors[1:]:
+            combined = combined + vector
+        return combined
+
+    def search(self, queryset, text, ranked=True):
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset.none()
+        # Har word prefix match karta hai ("aveng" -> "avengers")
+        query = SearchQuery(" & ".join(f"{token}:*" for token in tokens), search_type="raw", config=self.config)
+        queryset = queryset.filter(search_vector=query)
+        if ranked:
+            queryset = queryset.annotate(rank=SearchRank(F("search_vector"), query))
+        return queryset
+
+    def update(self, instance):
+        model = type(instance)
+        model._default_manager.filter(pk=instance.pk).update(search_vector=self.vector(model))
+
+    def update_many(self, model, pks):
+        model._default_manager.filter(pk__in=list(pks)).update(search_vector=self.vector(model))
+
+    def rebuild(self):
+        return sum(model._default_manager.update(search_vector=self.vector(model)) for model in SEARCH_FIELDS)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    def table(self, model):
+        return f"{model._meta.db_table}_fts"
+
+    def match(self, text):
+        return " ".join(f'"{token}"*' for token in tokenize(text))
+
+    def search(self, queryset, text, ranked=True):
+        match = self.match(text)
+        if not match:
+            return queryset.none()
+        model = queryset.model
+        table = self.table(model)
+        queryset = queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", (match,)))
+        if ranked:
+            weights = ", ".join("10.0" if weight == "A" else "1.0" for _, weight in SEARCH_FIELDS[model])
+            pk_column = f'"{model._meta.db_table}"."{model._meta.pk.column}"'
+            rank = RawSQL(
+                f"SELECT -bm25({table}, {weights}) FROM {table} WHERE {table} MATCH %s AND rowid = {pk_column}",
+                (match,),
+                output_field=FloatField(),
+            )
+            queryset = queryset.annotate(rank=rank)
+        return queryset
+
+    def update(self, instance):
+        model = type(instance)
+        fields = [field for field, _ in SEARCH_FIELDS[model]]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table(model)} WHERE rowid = %s", [instance.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table(model)} (rowid, {', '.join(fields)}) VALUES (%s, {', '.join(['%s'] * len(fields))})",
+                [instance.pk, *(getattr(instance, field) or "" for field in fields)],
+            )
+
+    def remove(self, instance):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table(type(instance))} WHERE rowid = %s", [instance.pk])
+
+    def update_many(self, model, pks):
+        pks = list(pks)
+        if not pks:
+            return
+        columns = ", ".join(field for field, _ in SEARCH_FIELDS[model])
+        placeholders = ", ".join(["%s"] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table(model)} WHERE rowid IN ({placeholders})", pks)
+            cursor.execute(
+                f"INSERT INTO {self.table(model)} (rowid, {columns}) "
+                f"SELECT {model._meta.pk.column}, {columns} FROM {model._meta.db_table} "
+                f"WHERE {model._meta.pk.column} IN ({placeholders})",
+                pks,
+            )
+
+    def rebuild(self):
+        total = 0
+        with connection.cursor() as cursor:
+            for model, fields in SEARCH_FIELDS.items():
+                columns = ", ".join(field for field, _ in fields)
+                cursor.execute(f"DELETE FROM {self.table(model)}")
+                cursor.execute(
+                    f"INSERT INTO {self.table(model)} (rowid, {columns}) "
+                    f"SELECT {model._meta.pk.column}, {columns} FROM {model._meta.db_table}"
+                )
+                total += cursor.rowcount
+        return total
+
+
+VENDOR_BACKENDS = {
+    "postgresql": "movies.search.PostgresSearchBackend",
+    "sqlite": "movies.search.SQLiteSearchBackend",
+}
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    path = getattr(settings, "SEARCH_BACKEND", None) or VENDOR_BACKENDS.get(
+        connection.vendor, "movies.search.IcontainsSearchBackend"
+    )
+    return _load_backend(path)
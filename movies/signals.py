@@ -1,16 +1,121 @@
-from django.db.models.signals import post_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Movie, Playlist
-import cloudinary.uploader
+from .models import Category, Movie, Playlist
+from .search import get_search_backend
+from . import suggest
+from .resolver import invalidate_download
+from . import page_cache
+from .asset_deletions import queue_deletion
+from . import sitemaps
 
+# 🗑️ Cloudinary image yahan delete nahi hoti: row queue me jaati hai (movies/asset_deletions.py),
+# `manage.py drain_asset_deletions` 100-100 ke batch me delete karta hai
 @receiver(post_delete, sender=Movie)
 def delete_movie_data(sender, instance, **kwargs):
-    if instance.poster:
-        public_id = instance.poster.public_id  # ✅ Correct way for CloudinaryField
-        cloudinary.uploader.destroy(public_id)
+    queue_deletion(instance.poster)
 
 @receiver(post_delete, sender=Playlist)
 def delete_playlist_data(sender, instance, **kwargs):
-    if instance.banner:
-        public_id = instance.banner.public_id  # ✅ Correct way for CloudinaryField
-        cloudinary.uploader.destroy(public_id)
+    queue_deletion(instance.banner)
+
+# 🔍 Full-text search index ko har save/delete par update rakho
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Playlist)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:  # loaddata fixtures ke baad rebuild_search_index chalao
+        get_search_backend().update(instance)
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Playlist)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(instance)
+
+# ⌨️ Typeahead index (movies/suggest.py) ko incremental update karo
+SUGGEST_KINDS = {
+    Movie: (suggest.KIND_MOVIE, "title"),
+    Playlist: (suggest.KIND_PLAYLIST, "name"),
+    Category: (suggest.KIND_CATEGORY, "name"),
+}
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=Category)
+def update_suggest_index(sender, instance, **kwargs):
+    kind, field = SUGGEST_KINDS[sender]
+    suggest.index_update(kind, instance.pk, getattr(instance, field))
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Playlist)
+@receiver(post_delete, sender=Category)
+def remove_from_suggest_index(sender, instance, **kwargs):
+    kind, _ = SUGGEST_KINDS[sender]
+    suggest.index_remove(kind, instance.pk)
+
+# 🔢 Playlist ka order mode (numbered / season-episode) movie save/delete par refresh karo
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def refresh_playlist_order_mode(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Movie dusri playlist me gayi ho to purani playlist ka mode bhi badal sakta hai (pre_save ne yaad rakha)
+    old = dict(zip(PAGE_SCOPE_FIELDS[Movie][1], getattr(instance, "_page_cache_old", None) or ()))
+    for playlist_id in {instance.playlist_id, old.get("playlist_id")} - {None}:
+        playlist = Playlist(pk=playlist_id)
+        mode = playlist.detect_order_mode()
+        Playlist.objects.filter(pk=playlist.pk).exclude(order_mode=mode).update(order_mode=mode)
+
+# ⬇️ Download redirect cache (movies/resolver.py) se purani entry hatao
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_download_cache(sender, instance, **kwargs):
+    invalidate_download(instance.pk)
+
+# 📄 Page cache (movies/page_cache.py): sirf un pages ki generation badhao jin par asar pada
+PAGE_SCOPE_FIELDS = {
+    Movie: ("movie", ("category_id", "playlist_id")),
+    Playlist: ("playlist", ("category_id",)),
+    Category: ("category", ()),
+}
+
+@receiver(pre_save, sender=Movie)
+@receiver(pre_save, sender=Playlist)
+def remember_page_scopes(sender, instance, raw=False, **kwargs):
+    # Category/playlist badla ho to purane page ko bhi invalidate karna hai
+    _, fields = PAGE_SCOPE_FIELDS[sender]
+    instance._page_cache_old = None
+    if not raw and instance.pk:
+        instance._page_cache_old = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+def page_scopes(sender, instance):
+    kind, fields = PAGE_SCOPE_FIELDS[sender]
+    scopes = {page_cache.scope(kind, instance.pk), page_cache.SCOPE_CATALOG}
+    if sender is not Movie:
+        scopes.add(page_cache.SCOPE_HOME)  # home par saari playlists aur categories dikhti hain
+    for values in ([getattr(instance, field) for field in fields], getattr(instance, "_page_cache_old", None)):
+        for field, value in zip(fields, values or ()):
+            if value:
+                scopes.add(page_cache.scope(field[:-3], value))
+            elif field == "playlist_id":
+                scopes.add(page_cache.SCOPE_HOME)  # playlist ke bina movies home par hain
+    return scopes
+
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Playlist)
+@receiver(post_delete, sender=Category)
+def invalidate_page_cache(sender, instance, **kwargs):
+    page_cache.invalidate(page_scopes(sender, instance))
+
+# 🗺️ Sitemap files (movies/sitemaps.py) commit ke baad thodi der me dobara likho
+@receiver(post_save, sender=Movie)
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=Playlist)
+@receiver(post_delete, sender=Category)
+def rebuild_sitemaps(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(sitemaps.schedule_rebuild)
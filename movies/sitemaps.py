@@ -0,0 +1,235 @@
+"""
+Pre-generated sitemaps (``manage.py build_sitemaps``).
+
+``/sitemap.xml`` used to be Django's sitemap view over
+``Movie.objects.all()``. Every crawler hit loaded every column of every
+movie and rendered the XML, and playlists and categories were left out.
+``build_sitemaps()`` now writes the files into ``settings.SITEMAPS["ROOT"]``:
+
+    sitemap.xml                  index, one <sitemap> per section file
+    sitemap-movies-1.xml         up to PAGE_SIZE <url>s (protocol limit 50,000)
+    sitemap-playlists-1.xml
+    sitemap-categories-1.xml
+
+Each file has a ``.gz`` copy next to it. Movies and playlists are streamed
+as ``(id, updated_at)`` tuples in id order, and ``updated_at`` becomes the
+``lastmod``. A category's ``lastmod`` is the newest ``updated_at`` of its
+movies and playlists, from one grouped query per model. A file whose
+content did not change is not rewritten, so its mtime, and the
+ETag/Last-Modified served from it, stay the same. Pages beyond the new
+page count are deleted.
+
+``views.sitemap_file`` serves the files from disk, using the ``.gz`` copy
+when the client accepts it, and runs no query. A missing index gets a 503
+and schedules an immediate background build. Files are written to
+``mkstemp`` names and renamed into place, so processes building at the
+same time never share a temp file. Saving or deleting a movie,
+playlist or category schedules a rebuild ``REBUILD_DELAY`` seconds after
+the commit. It runs on a background thread of the process that made the
+change, which shares the disk the web workers serve from. Further changes
+in that window are folded into the same rebuild.
+"""
+import gzip
+import logging
+import os
+import re
+import tempfile
+import threading
+from datetime import timezone as dt_timezone
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+
+from .models import Category, Movie, Playlist
+
+logger = logging.getLogger(__name__)
+
+MAX_URLS = 50_000  # sitemaps.org: har file me itne URLs (aur 50 MB) se zyada nahi
+INDEX_NAME = "sitemap.xml"
+FILE_NAME_RE = re.compile(r"^sitemap(-[a-z]+-[1-9][0-9]*)?\.xml$")
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+DEFAULTS = {
+    "ROOT": os.path.join(settings.BASE_DIR, "var", "sitemaps"),
+    "BASE_URL": "",
+    "PAGE_SIZE": MAX_URLS,
+    "REBUILD_DELAY": 30,  # None: save par rebuild nahi
+}
+
+
+def sitemap_settings():
+    return {**DEFAULTS, **getattr(settings, "SITEMAPS", {})}
+
+
+def lastmod(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00") if value else None
+
+
+# ----------------------------------------------------------------------
+# Sections
+# ----------------------------------------------------------------------
+def movie_rows():
+    return Movie.objects.order_by("id").values_list("id", "updated_at").iterator(chunk_size=2000)
+
+
+def playlist_rows():
+    return Playlist.objects.order_by("id").values_list("id", "updated_at").iterator(chunk_size=2000)
+
+
+def category_rows():
+    newest = {}
+    for model in (Movie, Playlist):
+        grouped = (model.objects.filter(category__isnull=False).order_by().values("category_id")
+                   .annotate(newest=Max("updated_at")).values_list("category_id", "newest"))
+        for category_id, value in grouped:
+            if value and (category_id not in newest or value > newest[category_id]):
+                newest[category_id] = value
+    for category_id in Category.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=2000):
+        yield category_id, newest.get(category_id)
+
+
+SECTIONS = (
+    ("movies", "/movie/{}/", movie_rows),
+    ("playlists", "/playlist/{}/", playlist_rows),
+    ("categories", "/category/{}/", category_rows),
+)
+
+
+def url_entry(loc, modified):
+    entry = f"<url><loc>{escape(loc)}</loc>"
+    if modified:
+        entry += f"<lastmod>{modified}</lastmod>"
+    return entry + "</url>\n"
+
+
+def index_entry(loc, modified):
+    entry = f"<sitemap><loc>{escape(loc)}</loc>"
+    if modified:
+        entry += f"<lastmod>{modified}</lastmod>"
+    return entry + "</sitemap>\n"
+
+
+# ----------------------------------------------------------------------
+# Files
+# ----------------------------------------------------------------------
+def write_file(root, name, text):
+    """Writes ``name`` and ``name.gz`` unless the content is unchanged. Returns True if written."""
+    data = text.encode("utf-8")
+    path = os.path.join(root, name)
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data and os.path.exists(path + ".gz"):
+                return False
+    except OSError:
+        pass
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=f".{name}-", suffix=".tmp")
+    gz_fd, gz_tmp_path = tempfile.mkstemp(dir=root, prefix=f".{name}.gz-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with os.fdopen(gz_fd, "wb") as raw:
+            # mtime=0: same XML ka same .gz
+            with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as f:
+                f.write(data)
+        os.replace(gz_tmp_path, path + ".gz")
+        os.replace(tmp_path, path)
+    except BaseException:
+        for leftover in (tmp_path, gz_tmp_path):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+        raise
+    return True
+
+
+def prune(root, keep):
+    removed = 0
+    for filename in os.listdir(root):
+        name = filename[:-3] if filename.endswith(".gz") else filename
+        if FILE_NAME_RE.match(name) and name not in keep:
+            os.remove(os.path.join(root, filename))
+            removed += 1
+    return removed
+
+
+def build_sitemaps(root=None, base_url=None, page_size=None, log=None):
+    """
+    Writes every section and the index. Returns ``{"urls", "files",
+    "written", "removed"}``.
+    """
+    conf = sitemap_settings()
+    root = root or conf["ROOT"]
+    base_url = (conf["BASE_URL"] if base_url is None else base_url).rstrip("/")
+    page_size = min(page_size or conf["PAGE_SIZE"], MAX_URLS)
+    os.makedirs(root, exist_ok=True)
+
+    files, urls, written = [], 0, 0
+    for section, path, rows in SECTIONS:
+        rows = iter(rows())
+        for page in range(1, MAX_URLS + 1):
+            chunk = list(islice(rows, page_size))
+            if not chunk:
+                break
+            name = f"sitemap-{section}-{page}.xml"
+            newest = max((value for _, value in chunk if value), default=None)
+            body = "".join(url_entry(base_url + path.format(pk), lastmod(value)) for pk, value in chunk)
+            changed = write_file(root, name, f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n{body}</urlset>\n')
+            files.append((name, newest))
+            urls += len(chunk)
+            written += changed
+            if log:
+                log(f"  {name}: {len(chunk)} urls, {'written' if changed else 'unchanged'}")
+
+    body = "".join(index_entry(f"{base_url}/{name}", lastmod(newest)) for name, newest in files)
+    written += write_file(root, INDEX_NAME, f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n{body}</sitemapindex>\n')
+    removed = prune(root, {INDEX_NAME, *(name for name, _ in files)})
+    return {"urls": urls, "files": len(files), "written": written, "removed": removed}
+
+
+def sitemap_path(name, accept_encoding=""):
+    """``(path, encoding)`` of sitemap file ``name`` for the client, or None."""
+    if not FILE_NAME_RE.match(name):
+        return None
+    path = os.path.join(sitemap_settings()["ROOT"], name)
+    accepted = {token.split(";")[0].strip() for token in accept_encoding.split(",")}
+    if "gzip" in accepted and os.path.exists(path + ".gz"):
+        return path + ".gz", "gzip"
+    return (path, None) if os.path.exists(path) else None
+
+
+# ----------------------------------------------------------------------
+# Rebuild on change
+# ----------------------------------------------------------------------
+_rebuild_lock = threading.Lock()
+_rebuild_timer = None
+
+
+def schedule_rebuild(delay=None):
+    """Rebuilds the sitemaps ``delay`` (default ``REBUILD_DELAY``) seconds from now on a background thread; calls in between share it."""
+    global _rebuild_timer
+    if delay is None:
+        delay = sitemap_settings()["REBUILD_DELAY"]
+    if delay is None:
+        return
+    with _rebuild_lock:
+        if _rebuild_timer is not None:
+            return
+        _rebuild_timer = threading.Timer(delay, _rebuild)
+        _rebuild_timer.daemon = True
+        _rebuild_timer.start()
+
+
+def _rebuild():
+    global _rebuild_timer
+    with _rebuild_lock:
+        _rebuild_timer = None  # ab ke baad ke changes naya rebuild schedule karein
+    try:
+        build_sitemaps()
+    except Exception:
+        logger.exception("Sitemap rebuild failed")
+    finally:
+        connection.close()  # is thread ka apna connection
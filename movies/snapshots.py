@@ -0,0 +1,253 @@
+"""
+Static catalog snapshot for the PWA.
+
+``manage.py build_catalog_snapshot`` writes the catalog as JSON shards
+into ``STATIC_ROOT/catalog/``. There is one shard per category, with its
+playlists (each carrying its episodes in playlist order) and its
+standalone movies, plus ``uncategorized`` for the rest. A shard's name
+carries the first 12 hex digits of the sha256 of its content
+(``category-3.1a2b3c4d5e6f.json``). It is written next to a ``.gz`` and,
+when the optional ``brotli`` package is installed, a ``.br`` copy, so
+WhiteNoise serves the precompressed file with far-future ``immutable``
+headers.
+
+Rows are streamed from ``iterator()`` into a temporary file while they
+are hashed. A shard whose hash already exists on disk is not rewritten,
+so a re-run only touches categories that changed. ``index.json`` lists
+the current shards and is rewritten only when that list changes. The
+PWA reads it through ``/api/catalog/``. Shards that are in neither the
+new nor the previous index are deleted.
+
+WhiteNoise only knows the files present when the worker started. Shards
+written later are served by ``views.catalog_shard`` straight from disk
+(no database) until the next restart.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from itertools import groupby
+
+from django.conf import settings
+
+from .models import Category, Movie, Playlist
+
+try:
+    import brotli
+except ImportError:  # optional: tab sirf .gz likhe jayenge
+    brotli = None
+
+SNAPSHOT_DIR = "catalog"
+INDEX_NAME = "index.json"
+UNCATEGORIZED = "uncategorized"
+HASH_LENGTH = 12
+SHARD_NAME_RE = re.compile(r"^[a-z0-9-]+\.[0-9a-f]{%d}\.json$" % HASH_LENGTH)
+CHUNK_SIZE = 64 * 1024
+
+
+def snapshot_root():
+    return os.path.join(settings.STATIC_ROOT, SNAPSHOT_DIR)
+
+
+def shard_url(name):
+    return f"{settings.STATIC_URL}{SNAPSHOT_DIR}/{name}"
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def encodings():
+    """Precompressed variants written next to every shard, best first."""
+    return ("br", "gz") if brotli is not None else ("gz",)
+
+
+# ----------------------------------------------------------------------
+# Rows -> JSON
+# ----------------------------------------------------------------------
+def movie_entry(movie):
+    return {
+        "id": movie.id,
+        "title": movie.title,
+        "description": movie.description,
+        "poster": movie.poster.url if movie.poster else None,
+        "created_at": movie.created_at.isoformat() if movie.created_at else None,
+        "url": f"/movie/{movie.id}/",
+        "download": f"/download/{movie.id}/",
+    }
+
+
+def playlist_entry(playlist, episodes):
+    return {
+        "id": playlist.id,
+        "title": playlist.name,
+        "poster": playlist.banner.url if playlist.banner else None,
+        "created_at": playlist.created_at.isoformat() if playlist.created_at else None,
+        "url": f"/playlist/{playlist.id}/",
+        "episodes": [movie_entry(movie) for movie in episodes],
+    }
+
+
+MOVIE_FIELDS = ("id", "title", "description", "poster", "created_at", "playlist_id",
+                "season_num", "episode_num", "order_num")
+
+
+def shard_parts(category):
+    """
+    Yields the JSON text of one shard in pieces. ``category=None`` is the
+    ``uncategorized`` shard. Playlists and movies are in id order, episodes
+    in their playlist's order (``Playlist.movie_ordering``).
+    """
+    playlists = Playlist.objects.filter(category=category).order_by("id")
+    episodes = (
+        Movie.objects.filter(playlist__isnull=False, playlist__category=category).only(*MOVIE_FIELDS)
+        .order_by("playlist_id", "id").iterator(chunk_size=2000)
+    )
+    episodes = groupby(episodes, key=lambda movie: movie.playlist_id)
+    pending = next(episodes, None)
+
+    header = {"id": category.id, "name": category.name} if category else None
+    yield '{"category":' + dumps(header) + ',"playlists":['
+    for index, playlist in enumerate(playlists.iterator(chunk_size=500)):
+        # Dono id order me hain: merge-join, poori category memory me nahi aati
+        while pending is not None and pending[0] < playlist.id:
+            pending = next(episodes, None)
+        movies = []
+        if pending is not None and pending[0] == playlist.id:
+            ordering = playlist.movie_ordering()
+            movies = sorted(pending[1], key=lambda movie: tuple(getattr(movie, field) for field in ordering))
+            pending = next(episodes, None)
+        yield ("," if index else "") + dumps(playlist_entry(playlist, movies))
+
+    yield '],"movies":['
+    movies = Movie.objects.filter(category=category, playlist__isnull=True).only(*MOVIE_FIELDS).order_by("id")
+    for index, movie in enumerate(movies.iterator(chunk_size=2000)):
+        yield ("," if index else "") + dumps(movie_entry(movie))
+    yield "]}"
+
+
+# ----------------------------------------------------------------------
+# Files
+# ----------------------------------------------------------------------
+def write_compressed(path):
+    """Writes ``path.gz`` (and ``path.br``) next to ``path``, chunk by chunk."""
+    with open(path, "rb") as source, open(path + ".gz.tmp", "wb") as raw:
+        # mtime=0: same content ka same .gz, taaki rebuild par bytes na badlein
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+    os.replace(path + ".gz.tmp", path + ".gz")
+
+    if brotli is not None:
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT)
+        with open(path, "rb") as source, open(path + ".br.tmp", "wb") as target:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                target.write(compressor.process(chunk))
+            target.write(compressor.finish())
+        os.replace(path + ".br.tmp", path + ".br")
+
+
+def write_shard(root, key, parts):
+    """
+    Streams ``parts`` to a temp file while hashing it. Returns
+    ``(name, written)``; ``written`` is False when that content already existed.
+    """
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=f".{key}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for part in parts:
+                data = part.encode("utf-8")
+                digest.update(data)
+                tmp.write(data)
+        name = f"{key}.{digest.hexdigest()[:HASH_LENGTH]}.json"
+        path = os.path.join(root, name)
+        if os.path.exists(path) and all(os.path.exists(f"{path}.{ext}") for ext in encodings()):
+            return name, False
+        os.replace(tmp_path, path)
+        write_compressed(path)
+        return name, True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_index(root=None):
+    path = os.path.join(root or snapshot_root(), INDEX_NAME)
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(root, index):
+    path = os.path.join(root, INDEX_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(dumps(index))
+    os.replace(path + ".tmp", path)
+    write_compressed(path)
+
+
+def prune(root, keep):
+    """Deletes shard files (and their compressed copies) whose name is not in ``keep``."""
+    removed = 0
+    for filename in os.listdir(root):
+        name = filename
+        for ext in (".gz", ".br"):
+            if name.endswith(ext):
+                name = name[:-len(ext)]
+        if SHARD_NAME_RE.match(name) and name not in keep:
+            os.remove(os.path.join(root, filename))
+            removed += 1
+    return removed
+
+
+def build_snapshot(root=None, log=None):
+    """
+    Writes the shards and the index. Returns a dict with ``shards``,
+    ``written``, ``unchanged`` and ``removed`` counts and the ``version``.
+    """
+    root = root or snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    previous = read_index(root)
+
+    shards, written = [], 0
+    for category in [*Category.objects.order_by("id"), None]:
+        key = f"category-{category.id}" if category else UNCATEGORIZED
+        name, changed = write_shard(root, key, shard_parts(category))
+        written += changed
+        shards.append({
+            "key": key,
+            "category": {"id": category.id, "name": category.name} if category else None,
+            "url": shard_url(name),
+            "name": name,
+        })
+        if log:
+            log(f"  {name} {'written' if changed else 'unchanged'}")
+
+    version = hashlib.sha256("".join(shard["name"] for shard in shards).encode()).hexdigest()[:HASH_LENGTH]
+    if previous is None or previous.get("version") != version:
+        write_index(root, {"version": version, "encodings": list(encodings()), "shards": shards})
+
+    # Pichle index ke shards bhi rakho: jin clients ke paas purana index hai woh abhi fetch kar rahe honge
+    keep = {shard["name"] for shard in shards}
+    if previous and previous.get("version") != version:
+        keep.update(shard["name"] for shard in previous.get("shards", ()))
+    removed = prune(root, keep)
+    return {"version": version, "shards": len(shards), "written": written,
+            "unchanged": len(shards) - written, "removed": removed}
+
+
+def shard_file(name, accept_encoding=""):
+    """``(path, encoding)`` of the best variant of shard ``name`` for the client, or None."""
+    if not SHARD_NAME_RE.match(name):
+        return None
+    path = os.path.join(snapshot_root(), name)
+    accepted = {token.split(";")[0].strip() for token in accept_encoding.split(",")}
+    for ext, encoding in (("br", "br"), ("gz", "gzip")):
+        if encoding in accepted and os.path.exists(f"{path}.{ext}"):
+            return f"{path}.{ext}", encoding
+    return (path, None) if os.path.exists(path) else None
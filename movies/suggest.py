@@ -0,0 +1,275 @@
+"""
+Per-process typeahead index for ``/api/suggest/``.
+
+Titles of movies, playlists and categories are normalised into word tokens
+("S01E02" becomes "season 1 episode 2"). Each distinct token goes into
+
+* a sorted vocabulary array: a flattened prefix trie, where every token that
+  starts with a prefix sits in one contiguous ``bisect`` range, and
+* a trigram posting list (trigram -> tokens), used to find near misses such
+  as "avengrs" -> "avengers".
+
+A query scores the candidate titles against every query token: exact match,
+then prefix match, then trigram similarity. The best 10 are returned.
+
+The index is built lazily on first use. The signal receivers in
+``signals.py`` keep it current for saves made in this process. Saves made
+by other workers are picked up by a background rebuild once the index is
+older than ``settings.SUGGEST_INDEX_MAX_AGE`` seconds.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+
+KIND_CATEGORY = "category"
+KIND_PLAYLIST = "playlist"
+KIND_MOVIE = "movie"
+KIND_BONUS = {KIND_CATEGORY: 0.06, KIND_PLAYLIST: 0.04, KIND_MOVIE: 0.0}
+
+SUGGEST_LIMIT = 10
+CANDIDATE_LIMIT = 200  # ek query me zyada se zyada itne titles score hote hain
+FUZZY_MIN_SIMILARITY = 0.3
+FUZZY_MAX_POSTINGS = 4000  # bahut common trigrams ko skip karo (jaise "  s")
+PREFIX_MAX_TOKENS = 200
+
+EPISODE_RE = re.compile(r"\bs(\d+)\s*e(\d+)\b")
+SEASON_RE = re.compile(r"\bs(\d+)\b")
+EP_RE = re.compile(r"\be(?:p)?(\d+)\b")
+TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Lowercased tokens with season/episode shorthand expanded and leading zeros dropped."""
+    text = (text or "").lower()
+    text = EPISODE_RE.sub(r" season \1 episode \2 ", text)
+    text = SEASON_RE.sub(r" season \1 ", text)
+    text = EP_RE.sub(r" episode \1 ", text)
+    return [token.lstrip("0") or "0" if token.isdigit() else token for token in TOKEN_RE.findall(text)]
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Entry:
+    __slots__ = ("kind", "id", "title", "tokens", "bonus")
+
+    def __init__(self, kind, pk, title):
+        self.kind = kind
+        self.id = pk
+        self.title = title
+        self.tokens = tuple(dict.fromkeys(normalize(title)))
+        # Chhote titles aur categories/playlists thoda upar aate hain
+        self.bonus = KIND_BONUS[kind] + 0.1 / (1 + len(self.tokens))
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.entries = {}        # (kind, id) -> Entry
+        self.vocabulary = []     # sorted distinct tokens (prefix ranges via bisect)
+        self.token_entries = {}  # token -> set of (kind, id)
+        self.trigram_tokens = {}  # trigram -> set of tokens
+        self.built_at = time.monotonic()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def add(self, kind, pk, title):
+        with self.lock:
+            self.remove(kind, pk)
+            entry = Entry(kind, pk, title)
+            key = (kind, pk)
+            self.entries[key] = entry
+            for token in entry.tokens:
+                keys = self.token_entries.get(token)
+                if keys is None:
+                    keys = self.token_entries[token] = set()
+                    insort(self.vocabulary, token)
+                    for gram in trigrams(token):
+                        self.trigram_tokens.setdefault(gram, set()).add(token)
+                keys.add(key)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            entry = self.entries.pop((kind, pk), None)
+            if entry is None:
+                return
+            for token in entry.tokens:
+                keys = self.token_entries[token]
+                keys.discard((kind, pk))
+                if keys:
+                    continue
+                del self.token_entries[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+                for gram in trigrams(token):
+                    tokens = self.trigram_tokens[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.trigram_tokens[gram]
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def prefix_tokens(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        found = []
+        for token in self.vocabulary[start:start + PREFIX_MAX_TOKENS]:
+            if not token.startswith(prefix):
+                break
+            found.append(token)
+        return found
+
+    def fuzzy_tokens(self, token):
+        grams = trigrams(token)
+        postings = sorted(
+            (self.trigram_tokens[gram] for gram in grams if gram in self.trigram_tokens),
+            key=len,
+        )
+        shared = Counter()
+        budget = FUZZY_MAX_POSTINGS
+        for tokens in postings:
+            if len(tokens) > budget:
+                break
+            budget -= len(tokens)
+            shared.update(tokens)
+
+        matches = {}
+        for candidate, count in shared.items():
+            # Jaccard similarity: shared / (|a| + |b| - shared); |b| = len + 1 with our padding
+            similarity = count / (len(grams) + len(candidate) + 1 - count)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches[candidate] = similarity
+        return matches
+
+    def token_matches(self, token, is_last):
+        """Vocabulary tokens matching one query token, with a 0..1 score each."""
+        matches = {}
+        if token in self.token_entries:
+            matches[token] = 1.0
+        for candidate in self.prefix_tokens(token):
+            matches.setdefault(candidate, 0.9 if is_last else 0.8)
+        if len(matches) < 3 and len(token) >= 3:
+            for candidate, similarity in self.fuzzy_tokens(token).items():
+                matches.setdefault(candidate, 0.7 * similarity)
+        return matches
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        tokens = list(dict.fromkeys(normalize(query)))
+        if not tokens:
+            return []
+
+        with self.lock:
+            per_token = []
+            for position, token in enumerate(tokens):
+                matches = self.token_matches(token, position == len(tokens) - 1)
+                if matches:  # jis word ka kuch bhi match nahi, use ignore karo
+                    per_token.append(matches)
+            if not per_token:
+                return []
+
+            # Sabse selective query word se candidates lo, baaki words se score karo
+            def selectivity(matches):
+                return sum(len(self.token_entries[t]) for t in matches)
+
+            per_token.sort(key=selectivity)
+            seed = per_token[0]
+            candidates = set()
+            for token in sorted(seed, key=seed.get, reverse=True):
+                candidates.update(islice(self.token_entries[token], CANDIDATE_LIMIT - len(candidates)))
+                if len(candidates) >= CANDIDATE_LIMIT:
+                    break
+
+            # Plain loops: yeh hot path hai, generator + max() yahan ~2x slow tha
+            scored = []
+            for key in candidates:
+                entry = self.entries[key]
+                total = 0.0
+                for matches in per_token:
+                    best = 0.0
+                    for token in entry.tokens:
+                        score = matches.get(token)
+                        if score and score > best:
+                            best = score
+                    if not best:
+                        break
+                    total += best
+                else:
+                    scored.append((total / len(per_token) + entry.bonus, entry))
+
+        scored.sort(key=lambda item: (-item[0], item[1].title))
+        return [entry for _, entry in scored[:limit]]
+
+
+# ----------------------------------------------------------------------
+# Process-wide index
+# ----------------------------------------------------------------------
+_index = None
+_index_lock = threading.Lock()
+_rebuilding = threading.Event()
+
+
+def build_index():
+    from .models import Category, Movie, Playlist
+
+    index = SuggestIndex()
+    for kind, queryset, field in (
+        (KIND_CATEGORY, Category.objects.all(), "name"),
+        (KIND_PLAYLIST, Playlist.objects.all(), "name"),
+        (KIND_MOVIE, Movie.objects.all(), "title"),
+    ):
+        for pk, title in queryset.values_list("id", field).iterator(chunk_size=5000):
+            index.add(kind, pk, title)
+    return index
+
+
+def _rebuild_in_background():
+    global _index
+    try:
+        _index = build_index()
+    finally:
+        _rebuilding.clear()
+        connection.close()  # is thread ka apna DB connection tha
+
+
+def get_suggest_index():
+    """Returns the process-wide index, building it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+        return _index
+
+    max_age = getattr(settings, "SUGGEST_INDEX_MAX_AGE", 300)
+    if max_age and time.monotonic() - _index.built_at > max_age and not _rebuilding.is_set():
+        # Purana index serve karte raho, naya background me banta hai
+        _rebuilding.set()
+        threading.Thread(target=_rebuild_in_background, daemon=True).start()
+    return _index
+
+
+def index_update(kind, pk, title):
+    """Signal hook: updates the index only if this process has already built it."""
+    if _index is not None:
+        _index.add(kind, pk, title)
+
+
+def index_remove(kind, pk):
+    if _index is not None:
+        _index.remove(kind, pk)
+
+
+def reset_index():
+    global _index
+    _index = None
@@ -1,29 +1,16 @@
 import os
 import django
-import requests
-import time
 
 # Django settings load karo
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "basharat.settings")
 django.setup()
 
-from movies.models import Movie
+from django.core.management import call_command
+
 
 def refresh_links():
-    movies = Movie.objects.all()
-    for movie in movies:
-        link = movie.download_link
-        if link:
-            print(f"Refreshing: {link}")
-            try:
-                response = requests.get(link)
-                if response.status_code == 200:
-                    print("✅ Refreshed")
-                else:
-                    print(f"❌ Error: {response.status_code}")
-            except Exception as e:
-                print(f"❌ Exception: {e}")
-            time.sleep(5)
+    # Ab movies/link_health.py: concurrent, per-host rate limit, sirf Range probe (poori file download nahi)
+    call_command("check_links", field=["download_link"], verbosity=2)
 
 if __name__ == "__main__":
     refresh_links()
@@ -0,0 +1,26 @@
+from django import template
+from django.utils.html import format_html
+
+from ..posters import CARD_SIZES, SRC_WIDTH, srcset, variant_url, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def poster_img(obj, field="poster", alt="", css_class="", sizes=CARD_SIZES, loading="lazy"):
+    """``<img>`` with the stored srcset and intrinsic size: ``{% poster_img movie "poster" alt=movie.title css_class="card-img-top" %}``."""
+    found = variants(obj, field)
+    if not found:
+        return ""
+    size = format_html(' width="{}" height="{}"', found["width"], found["height"]) if found.get("width") else ""
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}"{} class="{}" alt="{}" loading="{}" decoding="async">',
+        variant_url(found, SRC_WIDTH), srcset(found), sizes, size, css_class, alt, loading,
+    )
+
+
+@register.simple_tag
+def poster_url(obj, field="poster", width=SRC_WIDTH):
+    """Single variant URL, e.g. for ``og:image``."""
+    found = variants(obj, field)
+    return variant_url(found, width) if found else ""
@@ -1,3 +1,1859 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.signals import template_rendered
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import download_buffer
+from .download_buffer import DownloadLogBuffer
+from .models import (
+    Category, DownloadLog, DownloadRollupDaily, DownloadRollupHourly, InstallCounter, InstallTracker, Job, Movie,
+    LinkCheck, PendingAssetDeletion, Playlist, RollupWatermark, UserAgent,
+)
+from .pagination import CatalogPaginator, CatalogQuery
+from .search import get_search_backend
+from . import suggest
+from .resolver import DownloadResolver, reset_resolver
+from . import rollups
+from .retention import read_archive
+from .user_agents import get_agent_cache, reset_agent_cache
+from . import installs
+from .page_cache import get_page_cache, reset_page_cache
+from . import cards
+from . import snapshots
+from . import posters
+from . import asset_deletions
+from . import link_health
+from . import link_rotation
+from . import jobs
+from . import sitemaps
+from . import metrics
+from . import large_tables
+from . import catalog_import
+
+
+def make_movie(title, **kwargs):
+    kwargs.setdefault("description", "")
+    kwargs.setdefault("poster", "posters/test")
+    kwargs.setdefault("download_link", "https://example.com/file")
+    return Movie.objects.create(title=title, **kwargs)
+
+
+def age(objects, start=None):
+    """Gives each object a distinct created_at, first one newest."""
+    start = start or timezone.now()
+    for i, obj in enumerate(objects):
+        type(obj).objects.filter(pk=obj.pk).update(created_at=start - timedelta(minutes=i))
+
+
+class CatalogPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Action")
+        items = []
+        for i in range(50):
+            if i % 5 == 0:
+                items.append(Playlist.objects.create(name=f"Playlist {i}", category=cls.category))
+            else:
+                items.append(make_movie(f"Movie {i}", category=cls.category))
+        age(items)
+        cls.expected = [f"{type(obj).__name__}:{obj.pk}" for obj in items]
+
+    def keys(self, objects):
+        return [f"{type(obj).__name__}:{obj.pk}" for obj in objects]
+
+    def test_first_page_is_bigger_and_nothing_is_skipped(self):
+        paginator = CatalogPaginator(CatalogQuery(Playlist.objects.all(), Movie.objects.filter(playlist__isnull=True)))
+        self.assertEqual(paginator.count, 50)
+        self.assertEqual(paginator.num_pages, 3)
+
+        pages = [paginator.page(n) for n in paginator.page_range]
+        self.assertEqual([len(page) for page in pages], [24, 20, 6])
+        self.assertEqual([page.start_index() for page in pages], [1, 25, 45])
+
+        seen = [key for page in pages for key in self.keys(page.object_list)]
+        self.assertEqual(seen, self.expected)
+
+    @override_settings(PAGE_CACHE={"ENABLED": False})  # query count view ka, page cache ke row checks ka nahi
+    def test_home_page_queries_do_not_grow_with_page_number(self):
+        counts = []
+        for page in (1, 2, 3):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse("home"), {"page": page})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1)
+
+    def test_category_detail_search(self):
+        response = self.client.get(reverse("category_detail", args=[self.category.pk]), {"q": "movie 1"})
+        titles = sorted(item["obj"].title for item in response.context["page_obj"])
+        self.assertEqual(titles, ["Movie 1", "Movie 11", "Movie 12", "Movie 13", "Movie 14", "Movie 16", "Movie 17", "Movie 18", "Movie 19"])
+
+    def test_category_detail_numeric_order(self):
+        category = Category.objects.create(name="Marvel")
+        for title in ["3. Iron Man 3", "1. Iron Man", "2. Iron Man 2"]:
+            make_movie(title, category=category)
+        response = self.client.get(reverse("category_detail", args=[category.pk]))
+        titles = [item["obj"].title for item in response.context["page_obj"]]
+        self.assertEqual(titles, ["1. Iron Man", "2. Iron Man 2", "3. Iron Man 3"])
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Drama")
+        Playlist.objects.bulk_create(Playlist(name=f"Series {i}", category=cls.category) for i in range(100))
+        cls.movies = Movie.objects.bulk_create(
+            Movie(title=f"Film {i}", description="", poster="posters/test", download_link="https://example.com/file")
+            for i in range(1101)
+        )
+        # Kuch rows ke timestamps barabar aur kuch NULL, taaki tie-breaks bhi test hon
+        # (ids sequence se: PostgreSQL par test classes ke beech reset nahi hote)
+        cls.undated = [movie.pk for movie in cls.movies[:50]]
+        Movie.objects.filter(pk__in=cls.undated).update(created_at=None)
+        call_command("rebuild_search_index", stdout=StringIO())  # bulk_create signals nahi chalata
+
+    def walk(self, url, params=None):
+        cursor, pages = None, []
+        while True:
+            query = dict(params or {}, limit=2)
+            if cursor:
+                query["cursor"] = cursor
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url, query).json()
+            pages.append((len(ctx.captured_queries), data["results"]))
+            cursor = data["next"]
+            if not cursor:
+                return pages
+
+    @override_settings(PAGE_CACHE={"ENABLED": False})  # query count view ka, page cache ke row checks ka nahi
+    def test_feed_walks_every_card_once_with_constant_queries(self):
+        pages = self.walk(reverse("api_feed"))
+        cards = [(card["type"], card["id"]) for _, page in pages for card in page]
+
+        self.assertEqual(len(cards), 1201)
+        self.assertEqual(len(set(cards)), 1201)
+        self.assertGreaterEqual(len(pages), 500)
+        self.assertEqual(pages[0][0], pages[499][0])
+        self.assertEqual(pages[499][0], 2)
+        # NULL created_at wali movies sabse last
+        self.assertEqual(sorted(cards[-50:]), [("movie", pk) for pk in sorted(self.undated)])
+        self.assertEqual(cards[-1], ("movie", min(self.undated)))
+
+    def test_category_feed_and_search(self):
+        pages = self.walk(reverse("api_category_feed", args=[self.category.pk]), {"q": "series 1"})
+        titles = sorted(card["title"] for _, page in pages for card in page)
+        self.assertEqual(titles, sorted(f"Series {i}" for i in range(100) if str(i).startswith("1")))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("api_feed"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.avengers = make_movie("Avengers Endgame", description="Marvel heroes")
+        cls.doc = make_movie("Making of a Blockbuster", description="Behind the scenes of Avengers")
+        cls.series = Playlist.objects.create(name="Avengers Assemble")
+        make_movie("Titanic", description="Ship")
+
+    def search(self, model, text):
+        return list(get_search_backend().search(model.objects.all(), text).order_by("-rank", "id"))
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search(Movie, "avengers"), [self.avengers, self.doc])
+        self.assertEqual(self.search(Playlist, "aveng"), [self.series])
+
+    def test_index_follows_save_and_delete(self):
+        self.avengers.title = "Infinity War"
+        self.avengers.save()
+        self.assertEqual(self.search(Movie, "infinity"), [self.avengers])
+        Movie.objects.get(pk=self.avengers.pk).delete()
+        self.assertEqual(self.search(Movie, "infinity"), [])
+
+    def test_rebuild_command(self):
+        Movie.objects.filter(pk=self.doc.pk).update(title="Renamed Quietly")  # update() signals nahi chalata
+        self.assertEqual(self.search(Movie, "renamed"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search(Movie, "renamed"), [self.doc])
+
+    def test_home_search_is_ranked(self):
+        response = self.client.get(reverse("home"), {"q": "avengers"})
+        items = response.context["media_items"]
+        self.assertCountEqual(items, [self.series, self.avengers, self.doc])
+        self.assertLess(items.index(self.avengers), items.index(self.doc))
+        self.assertFalse(response.context["not_found"])
+
+
+class SuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Web Series")
+        cls.playlist = Playlist.objects.create(name="Stranger Things")
+        cls.avengers = make_movie("Avengers Endgame")
+        cls.episode = make_movie("Stranger Things S01E03", playlist=cls.playlist)
+        make_movie("Stranger Things S02E01", playlist=cls.playlist)
+
+    def setUp(self):
+        suggest.reset_index()
+        self.addCleanup(suggest.reset_index)
+
+    def titles(self, query):
+        return [item["title"] for item in self.client.get(reverse("api_suggest"), {"q": query}).json()["results"]]
+
+    def test_typos_and_episode_shorthand(self):
+        self.assertEqual(self.titles("avengrs")[0], "Avengers Endgame")
+        self.assertEqual(self.titles("stranger thing s1")[0], "Stranger Things S01E03")
+        self.assertEqual(self.titles("web")[0], "Web Series")
+        self.assertEqual(self.titles(""), [])
+
+    def test_index_is_updated_by_signals(self):
+        self.titles("warm up")  # index ab bana
+        make_movie("Interstellar")
+        self.assertEqual(self.titles("interst"), ["Interstellar"])
+
+        self.avengers.title = "Oppenheimer"
+        self.avengers.save()
+        self.assertEqual(self.titles("avengers"), [])
+        Movie.objects.get(title="Oppenheimer").delete()
+        self.assertEqual(self.titles("oppenheimer"), [])
+
+
+class SortKeyTests(TestCase):
+    @override_settings(PAGE_CACHE={"ENABLED": False})  # query count view ka, page cache ke row checks ka nahi
+    def test_playlist_orders_by_stored_episode_keys(self):
+        playlist = Playlist.objects.create(name="Dark")
+        for title in ["Dark S02E01", "Dark S01E10", "Dark S01E02", "Dark Special"]:
+            make_movie(title, playlist=playlist)
+        playlist.refresh_from_db()
+        self.assertEqual(playlist.order_mode, Playlist.ORDER_EPISODE)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("playlist_detail", args=[playlist.pk]))
+        titles = [movie.title for movie in response.context["movies"]]
+        self.assertEqual(titles, ["Dark S01E02", "Dark S01E10", "Dark Special", "Dark S02E01"])
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_numbered_playlist_mode_is_stored(self):
+        playlist = Playlist.objects.create(name="Marvel")
+        for title in ["2. Iron Man 2", "10. Endgame", "1. Iron Man"]:
+            make_movie(title, playlist=playlist)
+        playlist.refresh_from_db()
+        self.assertEqual(playlist.order_mode, Playlist.ORDER_NUMERIC)
+        response = self.client.get(reverse("playlist_detail", args=[playlist.pk]))
+        self.assertEqual([m.title for m in response.context["movies"]], ["1. Iron Man", "2. Iron Man 2", "10. Endgame"])
+
+    def test_moving_a_movie_refreshes_its_old_playlist(self):
+        marvel = Playlist.objects.create(name="Marvel")
+        numbered = make_movie("1. Iron Man", playlist=marvel)
+        make_movie("Iron Man Extras", playlist=marvel)
+        other = Playlist.objects.create(name="Other")
+        numbered.playlist = other
+        numbered.save()
+        marvel.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((marvel.order_mode, other.order_mode), (Playlist.ORDER_EPISODE, Playlist.ORDER_NUMERIC))
+
+    def test_backfill_command(self):
+        movie = make_movie("3. Thor")
+        Movie.objects.filter(pk=movie.pk).update(order_num=9999, season_num=7)
+        call_command("backfill_sort_keys", stdout=StringIO())
+        movie.refresh_from_db()
+        self.assertEqual((movie.order_num, movie.season_num), (3, 1))
+
+
+class DownloadLogBufferTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spill_path = os.path.join(tmp.name, "spill.jsonl")
+
+    def event(self, i):
+        return {"movie_title": f"Movie {i}", "ip_address": "127.0.0.1", "user_agent": "test", "download_time": timezone.now()}
+
+    def buffer(self, **kwargs):
+        kwargs.setdefault("spill_path", self.spill_path)
+        return DownloadLogBuffer(start=False, **kwargs)
+
+    def test_batches_and_graceful_shutdown_lose_nothing(self):
+        buffer = self.buffer(batch_size=100)
+        for i in range(250):
+            buffer.add(self.event(i))
+        self.assertEqual(DownloadLog.objects.count(), 200)  # do poore batches
+        self.assertEqual(buffer.stats()["depth"], 50)
+
+        buffer.close()
+        self.assertEqual(DownloadLog.objects.count(), 250)
+        self.assertEqual(buffer.stats()["flushed"], 250)
+        with self.assertRaises(RuntimeError):
+            buffer.add(self.event(0))
+
+    def test_drop_policy(self):
+        buffer = self.buffer(batch_size=100, max_pending=5, overflow="drop")
+        results = [buffer.add(self.event(i)) for i in range(8)]
+        self.assertEqual(results.count(False), 3)
+        buffer.close()
+        self.assertEqual(DownloadLog.objects.count(), 5)
+        self.assertEqual(buffer.stats()["dropped"], 3)
+
+    def test_spill_policy_replays_on_next_flush(self):
+        buffer = self.buffer(batch_size=100, max_pending=5, overflow="spill")
+        for i in range(8):
+            buffer.add(self.event(i))
+        self.assertEqual(buffer.stats()["spilled"], 3)
+        buffer.close()
+        self.assertEqual(DownloadLog.objects.count(), 8)
+        self.assertFalse(os.path.exists(self.spill_path))
+
+    def test_failed_insert_is_spilled_not_lost(self):
+        buffer = self.buffer(batch_size=100)
+        for i in range(3):
+            buffer.add(self.event(i))
+        with mock.patch.object(DownloadLog.objects, "bulk_create", side_effect=RuntimeError("db down")):
+            buffer.flush()
+        self.assertEqual(buffer.stats()["failed_flushes"], 1)
+        buffer.close()
+        self.assertEqual(DownloadLog.objects.count(), 3)
+
+    def test_deleted_movie_is_logged_without_it(self):
+        movie = make_movie("Kept")
+        buffer = self.buffer(batch_size=100)
+        buffer.add({**self.event(1), "movie_id": movie.pk})
+        buffer.add({**self.event(2), "movie_id": movie.pk + 1000})  # resolver ki purani entry
+        buffer.close()
+        self.assertEqual(dict(DownloadLog.objects.values_list("movie_title", "movie_id")),
+                         {"Movie 1": movie.pk, "Movie 2": None})
+
+    def test_rejected_row_does_not_spill_the_batch(self):
+        buffer = self.buffer(batch_size=100)
+        for i in range(3):
+            buffer.add(self.event(i))
+        create = DownloadLog.objects.create
+
+        def reject_one(**fields):
+            if fields["movie_title"] == "Movie 1":
+                raise IntegrityError("bad row")
+            return create(**fields)
+
+        with mock.patch.object(DownloadLog.objects, "bulk_create", side_effect=IntegrityError("bad batch")), \
+                mock.patch.object(DownloadLog.objects, "create", side_effect=reject_one):
+            buffer.flush()
+        self.assertEqual(sorted(DownloadLog.objects.values_list("movie_title", flat=True)), ["Movie 0", "Movie 2"])
+        self.assertEqual((buffer.stats()["rejected"], buffer.stats()["spilled"]), (1, 0))
+        self.assertFalse(os.path.exists(self.spill_path))
+
+    def test_replay_is_skipped_while_another_process_replays(self):
+        self.buffer(batch_size=100)._spill([self.event(1)])
+        with download_buffer.file_lock(self.spill_path + ".replay.lock"):
+            # Doosri open file description: doosre process jaisa flock
+            self.assertEqual(self.buffer(batch_size=100).flush(), 0)
+        self.assertEqual(DownloadLog.objects.count(), 0)
+        self.assertEqual(self.buffer(batch_size=100).flush(), 1)
+
+    def test_poison_spill_file_is_moved_aside(self):
+        buffer = self.buffer(batch_size=100, max_replay_attempts=2)
+        buffer._spill([self.event(1)])
+        with mock.patch.object(DownloadLog.objects, "bulk_create", side_effect=RuntimeError("bad file")):
+            buffer.flush()
+            self.assertTrue(os.path.exists(self.spill_path + ".replaying"))
+            buffer.flush()
+        self.assertFalse(os.path.exists(self.spill_path + ".replaying"))
+        self.assertEqual(buffer.stats()["quarantined"], 1)
+        self.assertEqual(len([name for name in os.listdir(os.path.dirname(self.spill_path)) if ".failed-" in name]), 1)
+
+        buffer._spill([self.event(2)])  # baad ke spills ab bhi pahunchte hain
+        self.assertEqual(buffer.flush(), 1)
+
+    def test_download_view_uses_buffer_when_enabled(self):
+        reset_resolver()
+        self.addCleanup(reset_resolver)
+        movie = make_movie("Buffered")
+        buffer = self.buffer(batch_size=100)
+        with mock.patch("movies.download_buffer.get_download_buffer", return_value=buffer):
+            response = self.client.get(reverse("download_movie", args=[movie.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(DownloadLog.objects.count(), 0)
+        buffer.close()
+        self.assertEqual(DownloadLog.objects.get().movie_title, "Buffered")
+
+
+@override_settings(DOWNLOAD_LOG_BUFFER={"ENABLED": False})
+class UnbufferedDownloadTests(TransactionTestCase):
+    # Autocommit: FK har INSERT par check hota hai, jaise production me
+    def setUp(self):
+        reset_resolver()
+        self.addCleanup(reset_resolver)
+
+    def test_warm_redirect_only_inserts_the_log(self):
+        movie = make_movie("Unbuffered", download_link="https://example.com/one")
+        url = reverse("download_movie", args=[movie.pk])
+        self.client.get(url)  # warm
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertRedirects(response, "https://example.com/one", fetch_redirect_response=False)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertTrue(ctx.captured_queries[0]["sql"].startswith('INSERT INTO "movies_downloadlog"'))
+        self.assertEqual(DownloadLog.objects.filter(movie=movie).count(), 2)
+
+    def test_deleted_movie_is_logged_without_it(self):
+        with mock.patch("movies.views.resolve_download", return_value=("https://example.com/gone", "Gone")):
+            response = self.client.get(reverse("download_movie", args=[424242]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(DownloadLog.objects.get().movie_id)
+
+
+class DownloadResolverTests(TestCase):
+    def setUp(self):
+        reset_resolver()
+        self.addCleanup(reset_resolver)
+        self.movie = make_movie("Cached", download_link="https://example.com/one")
+
+    def test_warm_redirect_runs_no_catalog_queries(self):
+        buffer = DownloadLogBuffer(start=False, batch_size=1000)
+        url = reverse("download_movie", args=[self.movie.pk])
+        with mock.patch("movies.download_buffer.get_download_buffer", return_value=buffer):
+            self.client.get(url)  # warm
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+        self.assertRedirects(response, "https://example.com/one", fetch_redirect_response=False)
+        self.assertEqual(ctx.captured_queries, [])
+        self.assertEqual(self.client.get(reverse("download_movie", args=[self.movie.pk + 100])).status_code, 404)
+
+    def test_save_invalidates_entry(self):
+        url = reverse("download_movie", args=[self.movie.pk])
+        self.client.get(url)
+        self.movie.download_link = "https://example.com/two"
+        self.movie.save()
+        self.assertEqual(self.client.get(url)["Location"], "https://example.com/two")
+
+    def test_lru_is_bounded(self):
+        others = [make_movie(f"Other {i}") for i in range(3)]
+        resolver = DownloadResolver(max_size=2, warm=False)
+        for movie in [self.movie, *others]:
+            resolver.resolve(movie.pk)
+        self.assertEqual(list(resolver.entries), [others[1].pk, others[2].pk])
+
+
+class DownloadRollupTests(TestCase):
+    def setUp(self):
+        self.first = make_movie("First")
+        self.second = make_movie("Second")
+        self.hour = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+
+    def log(self, movie, count, when, title=None):
+        DownloadLog.objects.bulk_create(
+            DownloadLog(movie=movie, movie_title=title or movie.title, ip_address="1.2.3.4", download_time=when)
+            for _ in range(count)
+        )
+
+    def test_incremental_and_rerunnable(self):
+        self.log(self.first, 3, self.hour + timedelta(minutes=5))
+        self.log(self.second, 1, self.hour - timedelta(minutes=30))
+        self.assertEqual(rollups.roll_up(window=2, lag=None), 4)
+        self.assertEqual(rollups.roll_up(lag=None), 0)  # dobara chalane se kuch double nahi hota
+
+        self.log(self.first, 2, self.hour + timedelta(minutes=10))
+        self.log(None, 1, self.hour, title="Deleted movie")
+        self.assertEqual(rollups.roll_up(lag=None), 3)
+
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.download_count, 5)
+        hourly = DownloadRollupHourly.objects.get(movie_title="First")
+        self.assertEqual((hourly.bucket, hourly.downloads, hourly.movie_id), (self.hour, 5, self.first.pk))
+        self.assertIsNone(DownloadRollupHourly.objects.get(movie_title="Deleted movie").movie_id)
+        daily = DownloadRollupDaily.objects.filter(movie_title="First").values_list("downloads", flat=True)
+        self.assertEqual(sum(daily), 5)
+        self.assertEqual(rollups.top_movies(2), [
+            {"movie_title": "First", "download_count": 5},
+            {"movie_title": "Second", "download_count": 1},
+        ])
+        self.assertEqual(rollups.top_movies(5, since=self.hour), [
+            {"movie_title": "First", "download_count": 5},
+        ])
+
+    def test_rollups_are_keyed_on_the_movie_not_the_title(self):
+        twin = make_movie("First")
+        self.log(self.first, 2, self.hour)
+        self.log(twin, 1, self.hour)
+        self.log(self.second, 1, self.hour, title="Second (old title)")  # rename ke baad bhi ek hi row
+        self.log(None, 4, self.hour, title="First")  # delete hui movie: kisi aur "First" ko credit nahi
+        rollups.roll_up(lag=None)
+
+        self.assertEqual(
+            sorted(DownloadRollupHourly.objects.values_list("movie_id", "movie_title", "downloads"), key=str),
+            sorted([(self.first.pk, "First", 2), (twin.pk, "First", 1), (self.second.pk, "Second (old title)", 1),
+                    (None, "First", 4)], key=str),
+        )
+        self.log(self.second, 2, self.hour)
+        self.log(None, 1, self.hour, title="First")
+        rollups.roll_up(lag=None)
+        self.assertEqual(DownloadRollupDaily.objects.get(movie=self.second).downloads, 3)
+        self.assertEqual(DownloadRollupDaily.objects.get(movie=None).downloads, 5)
+        self.first.refresh_from_db()
+        twin.refresh_from_db()
+        self.assertEqual((self.first.download_count, twin.download_count), (2, 1))
+
+        Movie.objects.filter(pk=twin.pk).update(title="First Twin")
+        self.assertEqual(rollups.top_movies(5, since=self.hour), [
+            {"movie_title": "Second", "download_count": 3},
+            {"movie_title": "First", "download_count": 2},
+            {"movie_title": "First Twin", "download_count": 1},
+        ])
+
+    def test_ids_wait_for_the_lag_before_rolling_up(self):
+        self.log(self.first, 2, self.hour)
+        self.assertEqual(rollups.roll_up(), 0)  # pehli baar: sirf newest id yaad rakha
+        late = DownloadLog.objects.order_by("id").first()
+        # Kam id wali row jo baad me commit hui: agli run tak dikh jaati hai, skip nahi hoti
+        DownloadLog.objects.filter(pk=late.pk).delete()
+        self.assertEqual(rollups.roll_up(), 0)  # LAG abhi poora nahi hua
+        DownloadLog.objects.create(id=late.id, movie=self.first, movie_title="First", ip_address="1.2.3.4",
+                                   download_time=self.hour)
+        self.log(self.second, 1, self.hour)
+
+        RollupWatermark.objects.filter(name=rollups.SEEN).update(updated_at=timezone.now() - rollups.LAG)
+        self.assertEqual(rollups.roll_up(), 2)  # Second wali row agli run me
+        RollupWatermark.objects.filter(name=rollups.SEEN).update(updated_at=timezone.now() - rollups.LAG)
+        self.assertEqual(rollups.roll_up(), 1)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.download_count, 2)
+
+    def test_dashboard_reads_rollups(self):
+        from django.contrib.auth.models import User
+
+        self.log(self.second, 2, self.hour)
+        call_command("rollup_downloads", "--lag=0", stdout=StringIO())
+        metrics.metrics_cache().delete(metrics.CACHE_KEY)
+        self.client.force_login(User.objects.create_superuser("admin", "a@b.c", "pw"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("myadmin:index"))
+        self.assertContains(response, "Second")
+        self.assertFalse(any("GROUP BY" in query["sql"] for query in ctx.captured_queries))
+
+
+class DownloadLogRetentionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive_dir = os.path.join(tmp.name, "scratch")
+        self.stored_dir = os.path.join(tmp.name, "stored")
+        storage = override_settings(DOWNLOAD_LOG_RETENTION={
+            "ARCHIVE_DIR": self.archive_dir,
+            "STORAGE": "movies.retention.LocalArchiveStorage",
+            "STORAGE_OPTIONS": {"root": self.stored_dir},
+        })
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+    def log(self, count, when):
+        DownloadLog.objects.bulk_create(
+            DownloadLog(movie_title="Movie", ip_address="1.2.3.4", user_agent="UA", download_time=when)
+            for _ in range(count)
+        )
+
+    def archive(self, *extra):
+        call_command(
+            "archive_download_logs", "--max-age-days=30", f"--archive-dir={self.archive_dir}", "--chunk-size=3",
+            *extra, stdout=StringIO(),
+        )
+
+    def test_archives_old_months_and_restores(self):
+        self.log(7, datetime(2024, 1, 10, tzinfo=dt_timezone.utc))
+        self.log(2, datetime(2024, 3, 31, 23, tzinfo=dt_timezone.utc))
+        self.log(4, timezone.now())
+
+        self.archive("--dry-run")
+        self.assertEqual(DownloadLog.objects.count(), 13)
+        self.archive()
+
+        self.assertEqual(DownloadLog.objects.count(), 4)
+        self.assertEqual(sorted(os.listdir(self.archive_dir)), ["downloadlog-2024-01.jsonl.gz", "downloadlog-2024-03.jsonl.gz"])
+        rows = list(read_archive(os.path.join(self.archive_dir, "downloadlog-2024-01.jsonl.gz")))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]["user_agent"], "UA")
+
+        call_command("restore_download_logs", "2024-01", f"--archive-dir={self.archive_dir}", stdout=StringIO())
+        call_command("restore_download_logs", "2024-01", f"--archive-dir={self.archive_dir}", stdout=StringIO())
+        self.assertEqual(DownloadLog.objects.count(), 11)  # dusri baar kuch duplicate nahi hua
+        self.archive()
+        self.assertEqual(DownloadLog.objects.count(), 4)
+        self.assertEqual(len(list(read_archive(os.path.join(self.archive_dir, "downloadlog-2024-01.jsonl.gz")))), 7)
+
+    def test_archive_is_stored_before_rows_are_dropped(self):
+        self.log(3, datetime(2024, 1, 10, tzinfo=dt_timezone.utc))
+        self.archive()
+        self.assertEqual(os.listdir(self.stored_dir), ["downloadlog-2024-01.jsonl.gz"])
+
+        shutil.rmtree(self.archive_dir)  # naya deploy: scratch disk khali
+        call_command("restore_download_logs", "2024-01", stdout=StringIO())
+        self.assertEqual(DownloadLog.objects.count(), 3)
+
+        with override_settings(DOWNLOAD_LOG_RETENTION={"STORAGE": None}):
+            with self.assertRaisesMessage(CommandError, "STORAGE"):
+                self.archive()
+        self.assertEqual(DownloadLog.objects.count(), 3)
+
+
+class NormalizedDownloadLogTests(TestCase):
+    def setUp(self):
+        reset_agent_cache()
+        self.addCleanup(reset_agent_cache)  # rollback ke baad purane ids cache me na rahein
+        reset_resolver()
+        self.addCleanup(reset_resolver)
+        self.movie = make_movie("Normalized")
+
+    def test_download_writes_movie_and_interned_agent(self):
+        url = reverse("download_movie", args=[self.movie.pk])
+        self.client.get(url, HTTP_USER_AGENT="Agent/1.0")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, HTTP_USER_AGENT="Agent/1.0")
+        self.assertFalse(any("movies_useragent" in query["sql"] for query in ctx.captured_queries))
+
+        logs = list(DownloadLog.objects.select_related("agent"))
+        self.assertEqual([(log.movie_id, log.user_agent, log.user_agent_text) for log in logs],
+                         [(self.movie.pk, "", "Agent/1.0")] * 2)
+        self.assertEqual(UserAgent.objects.count(), 1)
+        self.assertEqual(get_agent_cache().stats()["hits"], 1)
+
+    def test_backfill_and_rollup_survive_rename(self):
+        DownloadLog.objects.bulk_create(
+            DownloadLog(movie_title="Normalized", ip_address="1.2.3.4", user_agent=agent)
+            for agent in ["Agent/1.0", "Agent/2.0", "Agent/1.0"]
+        )
+        DownloadLog.objects.create(movie_title="Gone", ip_address="1.2.3.4", user_agent="")
+        call_command("backfill_download_log_refs", "--batch-size=2", stdout=StringIO())
+        call_command("backfill_download_log_refs", stdout=StringIO())  # dobara chalana safe hai
+
+        self.assertEqual(DownloadLog.objects.filter(movie=self.movie, user_agent="").count(), 3)
+        self.assertEqual(UserAgent.objects.count(), 2)
+        self.assertIsNone(DownloadLog.objects.get(movie_title="Gone").movie_id)
+
+        self.movie.title = "Renamed"
+        self.movie.save()
+        rollups.roll_up(lag=None)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.download_count, 3)
+
+
+class InstallCounterTests(TestCase):
+    def post(self, name, device_id):
+        response = self.client.post(reverse(name), {"device_id": device_id}, content_type="application/json")
+        return response.json()
+
+    def test_counter_moves_only_on_transitions(self):
+        self.assertEqual(self.post("track_install", "a")["total_active_installs"], 1)
+        self.assertEqual(self.post("track_install", "b")["total_active_installs"], 2)
+        with CaptureQueriesContext(connection) as ctx:
+            reopen = self.post("track_install", "a")
+        self.assertEqual((reopen["message"], reopen["total_active_installs"]), ("Already tracked (count maintained)", 2))
+        self.assertFalse(any("COUNT(" in query["sql"] for query in ctx.captured_queries))
+
+        self.assertEqual(self.post("track_uninstall", "a")["total_active_installs"], 1)
+        self.assertEqual(self.post("track_uninstall", "a")["total_active_installs"], 1)
+        self.assertEqual(self.post("track_uninstall", "nobody")["message"], "Tracker not found, but uninstall acknowledged")
+        self.assertEqual(self.post("track_install", "a")["message"], "Re-install tracked (count restored)")
+        self.assertEqual(installs.active_installs(), 2)
+        self.assertEqual(InstallTracker.objects.get(device_id="a").last_action, "reinstall")
+
+    def test_reconcile_repairs_drift(self):
+        for device in "abc":
+            installs.record_install(device, "Android")
+        InstallTracker.objects.filter(device_id="c").update(install_count=0)  # haath se badla gaya row
+        InstallCounter.objects.filter(shard=installs.shard_for("a")).update(active=F("active") + 5)
+        out = StringIO()
+        call_command("reconcile_install_counter", stdout=out)
+        self.assertIn("8 -> 2", out.getvalue())
+        self.assertEqual(installs.active_installs(), 2)
+
+        installs.forget_devices(InstallTracker.objects.filter(device_id="a"))
+        self.assertEqual(installs.active_installs(), 1)
+
+
+def install_event(event_id, device_id, event_type, ts):
+    return {"id": event_id, "device_id": device_id, "type": event_type, "ts": ts, "device_name": "Android"}
+
+
+class InstallBatchTests(TestCase):
+    def setUp(self):
+        installs.reconcile()  # saare counter shards pehle se bane hon
+
+    def post(self, events):
+        url = reverse("api_install_events")
+        return self.client.post(url, {"events": events}, content_type="application/json").json()
+
+    def test_orders_dedupes_and_ignores_replays(self):
+        events = [
+            install_event("e2", "a", "uninstall", 2000),
+            install_event("e1", "a", "install", 1000),
+            install_event("e1", "a", "install", 1000),
+            install_event("e3", "b", "open", 1500),
+            {"id": "bad", "device_id": "c", "type": "explode", "ts": 1},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.post(events)
+        self.assertEqual((result["applied"], result["duplicates"], result["rejected"]), (3, 1, 1))
+        self.assertEqual(result["total_active_installs"], 1)
+        self.assertLessEqual(len(ctx.captured_queries), 8)  # events ki ginti par nahi, touched shards par depend
+
+        a = InstallTracker.objects.get(device_id="a")
+        self.assertEqual((a.install_count, a.last_action, a.last_event_id), (0, "uninstall", "e2"))
+
+        replay = self.post(events[:3])  # beacon dobara aaya
+        self.assertEqual((replay["applied"], replay["duplicates"]), (0, 3))
+        self.assertEqual(self.post([install_event("e4", "a", "install", 3000)])["total_active_installs"], 2)
+        self.assertEqual(InstallTracker.objects.get(device_id="a").last_action, "reinstall")
+
+    def test_rejects_bad_payloads(self):
+        url = reverse("api_install_events")
+        self.assertEqual(self.client.post(url, "nope", content_type="application/json").status_code, 400)
+        too_many = [install_event(str(i), "a", "open", i) for i in range(installs.MAX_EVENTS + 1)]
+        self.assertEqual(self.client.post(url, {"events": too_many}, content_type="application/json").status_code, 400)
+
+
+class ConcurrentInstallBatchTests(TransactionTestCase):
+    def test_concurrent_batches_keep_counts_exact(self):
+        devices = [f"device-{i}" for i in range(20)]
+        errors = []
+
+        def worker(n):
+            try:
+                # Har thread sab devices ke liye same events (alag order me) bhejta hai + apne events
+                events = [install_event(f"{device}-install", device, "install", 1000) for device in devices]
+                events.append(install_event(f"{devices[n]}-uninstall", devices[n], "uninstall", 2000 + n))
+                for attempt in range(20):
+                    try:
+                        installs.apply_events(installs.parse_events({"events": events[::-1] if n % 2 else events})[0])
+                        break
+                    except OperationalError:  # SQLite "database is locked": dobara try karo
+                        time.sleep(0.05 * (attempt + 1))
+                else:
+                    raise AssertionError("gave up after retries")
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(InstallTracker.objects.count(), 20)
+        self.assertEqual(installs.active_installs(), 12)
+        self.assertEqual(installs.active_installs(), InstallTracker.objects.filter(install_count=1).count())
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.action = Category.objects.create(name="Action")
+        cls.drama = Category.objects.create(name="Drama")
+        cls.movie = make_movie("Cached Movie", category=cls.action)
+
+    def setUp(self):
+        caches["pages"].clear()
+        reset_page_cache()
+        self.addCleanup(reset_page_cache)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_second_request_is_a_hit_without_queries(self):
+        self.assertNotIn("X-Page-Cache", self.get("home"))
+        with self.assertNumQueries(0):
+            response = self.get("home", page="1", q="")
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Cached Movie")
+        self.assertNotIn("X-Page-Cache", self.get("home", q="cached"))  # alag q = alag page
+        self.assertEqual(get_page_cache().stats()["hits"], 1)
+
+    def test_signals_invalidate_only_affected_pages(self):
+        for category in (self.action, self.drama):
+            self.get("category_detail", category.pk)
+        self.get("movie_detail", self.movie.pk)
+
+        self.movie.title = "Renamed Movie"
+        self.movie.save()
+        self.assertContains(self.get("category_detail", self.action.pk), "Renamed Movie")
+        self.assertEqual(self.get("category_detail", self.drama.pk)["X-Page-Cache"], "hit")
+        self.assertNotIn("X-Page-Cache", self.get("movie_detail", self.movie.pk))
+
+        self.movie.category = self.drama  # purani aur nayi dono category invalidate
+        self.movie.save()
+        self.assertNotContains(self.get("category_detail", self.action.pk), "Renamed Movie")
+        self.assertContains(self.get("category_detail", self.drama.pk), "Renamed Movie")
+
+    def test_authenticated_users_bypass_cache(self):
+        from django.contrib.auth.models import User
+
+        self.get("home")
+        self.client.force_login(User.objects.create_user("viewer", password="pw"))
+        self.assertNotIn("X-Page-Cache", self.get("home"))
+        self.assertEqual(get_page_cache().stats()["bypassed"], 1)
+
+    def test_stale_page_served_while_another_worker_rebuilds(self):
+        self.get("home")
+        page_cache = get_page_cache()
+        request = self.client.get(reverse("home")).wsgi_request
+        caches["pages"].add(page_cache.page_key(request) + ":lock", 1)  # koi aur rebuild kar raha hai
+
+        make_movie("Brand New")
+        response = self.get("home")
+        self.assertNotContains(response, "Brand New")
+        self.assertEqual(page_cache.stats()["stale"], 1)
+
+    @override_settings(PAGE_CACHE={"ALIAS": "pages", "ROWS_TTL": 0})
+    def test_change_made_by_another_process_is_picked_up(self):
+        first = self.get("movie_detail", self.movie.pk)
+        # update() koi signal nahi bhejta: jaise kisi dusre worker ne apne locmem me bump kiya ho
+        Movie.objects.filter(pk=self.movie.pk).update(title="Edited Elsewhere", updated_at=timezone.now())
+        response = self.client.get(reverse("movie_detail", args=[self.movie.pk]), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertContains(response, "Edited Elsewhere")
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+        drama = make_movie("Elsewhere Drama", category=self.drama)
+        category = self.get("category_detail", self.drama.pk)
+        with connection.cursor() as cursor:  # delete ka pata count se chalta hai
+            cursor.execute(f"DELETE FROM {Movie._meta.db_table} WHERE id = %s", [drama.pk])
+        self.assertNotContains(self.get("category_detail", self.drama.pk), "Elsewhere Drama")
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Action")
+        cls.playlist = Playlist.objects.create(name="Saga", category=cls.category)
+        cls.movie = make_movie("Validated Movie", category=cls.category, playlist=cls.playlist)
+
+    def setUp(self):
+        caches["pages"].clear()
+        reset_page_cache()
+        self.addCleanup(reset_page_cache)
+        self.rendered = []
+        on_render = lambda sender, template, **kwargs: self.rendered.append(template.name)
+        template_rendered.connect(on_render)
+        self.addCleanup(template_rendered.disconnect, on_render)
+
+    def assert_not_modified(self, url, **headers):
+        self.rendered.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertLessEqual(len(queries), 1)
+        self.assertEqual(self.rendered, [])
+        return response
+
+    def test_unchanged_catalog_pages_answer_304_without_rendering(self):
+        urls = [
+            reverse("home"),
+            reverse("category_detail", args=[self.category.pk]),
+            reverse("playlist_detail", args=[self.playlist.pk]),
+            reverse("movie_detail", args=[self.movie.pk]),
+        ]
+        for url in urls:
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            response = self.assert_not_modified(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(response["ETag"], first["ETag"])
+            self.assert_not_modified(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(get_page_cache().stats()["not_modified"], 8)
+
+    def test_change_gives_affected_pages_a_new_etag(self):
+        home = self.client.get(reverse("home"))["ETag"]
+        movie_url = reverse("movie_detail", args=[self.movie.pk])
+        movie = self.client.get(movie_url)["ETag"]
+
+        self.movie.title = "Edited Movie"
+        self.movie.save()
+        response = self.client.get(movie_url, HTTP_IF_NONE_MATCH=movie)
+        self.assertContains(response, "Edited Movie")
+        self.assertNotEqual(response["ETag"], movie)
+        # Playlist wali movie home par nahi dikhti, isliye home ka ETag wahi rehta hai
+        self.assert_not_modified(reverse("home"), HTTP_IF_NONE_MATCH=home)
+
+    def test_sitemap_and_feeds_are_conditional(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        with override_settings(SITEMAPS={"ROOT": root}):
+            sitemaps.build_sitemaps()
+            sitemap = self.client.get("/sitemap.xml")
+            self.assert_not_modified("/sitemap.xml", HTTP_IF_NONE_MATCH=sitemap["ETag"])
+            section = self.client.get("/sitemap-movies-1.xml")
+            time.sleep(0.01)
+            make_movie("Another Movie")
+            sitemaps.build_sitemaps()  # commit ke baad background rebuild yahi karta hai
+            self.assertEqual(self.client.get("/sitemap-movies-1.xml", HTTP_IF_NONE_MATCH=section["ETag"]).status_code, 200)
+
+        feed_url = reverse("api_category_feed", args=[self.category.pk])
+        feed = self.client.get(feed_url)
+        self.assert_not_modified(feed_url, HTTP_IF_NONE_MATCH=feed["ETag"])
+        other = self.client.get(feed_url, {"limit": "1"}, HTTP_IF_NONE_MATCH=feed["ETag"])
+        self.assertEqual(other.status_code, 200)  # alag query string = alag ETag
+
+    def test_authenticated_users_get_no_validators(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_user("viewer", password="pw"))
+        self.assertNotIn("ETag", self.client.get(reverse("home")))
+
+
+@override_settings(PAGE_CACHE={"ENABLED": False})
+class CardCacheTests(TestCase):
+    def setUp(self):
+        caches["pages"].clear()
+        reset_page_cache()
+        self.addCleanup(reset_page_cache)
+        self.playlist = Playlist.objects.create(name="Card Playlist")
+        self.movies = [make_movie(f"Card Movie {i}") for i in range(3)]
+
+    def test_only_missing_or_updated_cards_are_rendered(self):
+        with mock.patch("movies.cards.render_card", wraps=cards.render_card) as render:
+            self.assertContains(self.client.get(reverse("home")), "Card Movie 2")
+            self.assertEqual(render.call_count, 4)
+
+            render.reset_mock()
+            self.client.get(reverse("home"))
+            self.assertEqual(render.call_count, 0)
+
+            self.movies[0].title = "Card Movie Edited"
+            self.movies[0].save()
+            self.assertContains(self.client.get(reverse("home")), "Card Movie Edited")
+            self.assertEqual(render.call_count, 1)
+
+    def test_page_fetches_cards_with_one_get_many(self):
+        cache = caches["pages"]
+        with mock.patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            self.client.get(reverse("playlist_detail", args=[self.playlist.pk]))
+            self.client.get(reverse("home"))
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_deploy_renders_cards_again(self):
+        self.client.get(reverse("home"))
+        with override_settings(CARD_CACHE={**cards.card_settings(), "VERSION": "next-commit"}), \
+                mock.patch("movies.cards.render_card", wraps=cards.render_card) as render:
+            self.client.get(reverse("home"))
+        self.assertEqual(render.call_count, 4)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(STATIC_ROOT=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.root = snapshots.snapshot_root()
+
+        self.action = Category.objects.create(name="Action")
+        self.drama = Category.objects.create(name="Drama")
+        self.saga = Playlist.objects.create(name="Saga", category=self.action)
+        for title in ("Saga S01E03", "Saga S01E01", "Saga S01E02"):
+            make_movie(title, category=self.action, playlist=self.saga)
+        self.single = make_movie("Single Movie", category=self.action)
+        make_movie("Drama Movie", category=self.drama)
+        make_movie("Loose Movie")
+
+    def build(self):
+        return snapshots.build_snapshot()
+
+    def shard(self, key):
+        index = snapshots.read_index()
+        name = next(shard["name"] for shard in index["shards"] if shard["key"] == key)
+        with gzip.open(os.path.join(self.root, name + ".gz"), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_shards_hold_ordered_catalog_and_precompressed_copies(self):
+        result = self.build()
+        self.assertEqual((result["shards"], result["written"]), (3, 3))
+
+        action = self.shard(f"category-{self.action.pk}")
+        self.assertEqual(action["category"]["name"], "Action")
+        episodes = [movie["title"] for movie in action["playlists"][0]["episodes"]]
+        self.assertEqual(episodes, ["Saga S01E01", "Saga S01E02", "Saga S01E03"])
+        self.assertEqual([movie["title"] for movie in action["movies"]], ["Single Movie"])
+        self.assertEqual([movie["title"] for movie in self.shard("uncategorized")["movies"]], ["Loose Movie"])
+
+        for shard in snapshots.read_index()["shards"]:
+            self.assertRegex(shard["name"], snapshots.SHARD_NAME_RE)
+            self.assertTrue(shard["url"].endswith("/catalog/" + shard["name"]))
+
+    def test_rebuild_rewrites_only_changed_shards(self):
+        copies = 1 + len(snapshots.encodings())  # .json + .gz (+ .br)
+        first = self.build()
+        self.assertEqual(self.build()["written"], 0)
+        old_action = self.shard(f"category-{self.action.pk}")
+
+        self.single.title = "Single Movie Edited"
+        self.single.save()
+        second = self.build()
+        self.assertEqual((second["written"], second["unchanged"]), (1, 2))
+        self.assertNotEqual(second["version"], first["version"])
+        self.assertNotEqual(self.shard(f"category-{self.action.pk}"), old_action)
+
+        # Pichle index ki shard ek build tak rehti hai, phir hatai jaati hai
+        self.assertEqual(len([f for f in os.listdir(self.root) if f.startswith("category-%d." % self.action.pk)]), 2 * copies)
+        self.single.title = "Single Movie Again"
+        self.single.save()
+        self.assertEqual(self.build()["removed"], copies)
+
+    def test_index_and_late_shards_are_served(self):
+        self.build()
+        response = self.client.get(reverse("api_catalog"))
+        index = response.json()
+        self.assertEqual(self.client.get(reverse("api_catalog"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        name = index["shards"][0]["name"]
+        with CaptureQueriesContext(connection) as queries:
+            shard = self.client.get(reverse("catalog_shard", args=[name]), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(shard["Content-Encoding"], "gzip")
+        self.assertIn("immutable", shard["Cache-Control"])
+        self.assertEqual(json.loads(gzip.decompress(b"".join(shard.streaming_content)))["category"]["id"], self.action.pk)
+        self.assertEqual(self.client.get(reverse("catalog_shard", args=["settings.py"])).status_code, 404)
+
+
+class PosterVariantTests(TestCase):
+    def test_save_stores_width_variants_and_upload_dimensions(self):
+        from cloudinary import CloudinaryResource
+
+        movie = make_movie("Poster Movie")
+        self.assertEqual(movie.poster_variants["source"], "image/upload/posters/test")
+        movie.refresh_from_db()
+        self.assertIs(posters.variants(movie, "poster"), movie.poster_variants)
+        self.assertEqual(sorted(movie.poster_variants["urls"], key=int), ["160", "320", "640"])
+        self.assertIn("w_640", movie.poster_variants["urls"]["640"])
+        self.assertIn("f_auto", movie.poster_variants["urls"]["160"])
+
+        # Upload ke response me size aata hai (CloudinaryField.pre_save), wahi store hota hai
+        movie.poster = CloudinaryResource(metadata={"public_id": "posters/uploaded", "version": 7, "format": "jpg",
+                                                    "type": "upload", "resource_type": "image",
+                                                    "width": 1000, "height": 1500})
+        movie.save()
+        movie.refresh_from_db()
+        self.assertEqual((movie.poster_variants["width"], movie.poster_variants["height"]), (1000, 1500))
+
+        movie.title = "Renamed"
+        movie.save(update_fields=["title"])
+        movie.poster = "posters/other"
+        movie.save()
+        self.assertIsNone(movie.poster_variants["width"])  # nayi image, purana size nahi
+
+    def test_stale_or_missing_variants_fall_back_to_memoized_urls(self):
+        movie = make_movie("Poster Movie")
+        Movie.objects.filter(pk=movie.pk).update(poster="posters/changed")
+        movie.refresh_from_db()
+        found = posters.variants(movie, "poster")
+        self.assertEqual(found["source"], "image/upload/posters/changed")
+        self.assertIs(posters.build_urls("image/upload/posters/changed"), found["urls"])
+
+        call_command("backfill_poster_variants", stdout=StringIO())
+        movie.refresh_from_db()
+        self.assertEqual(movie.poster_variants["source"], "image/upload/posters/changed")
+
+    @override_settings(PAGE_CACHE={"ENABLED": False}, CARD_CACHE={"ENABLED": False})
+    def test_cards_and_detail_page_use_srcset(self):
+        movie = make_movie("Poster Movie")
+        Playlist.objects.create(name="Poster Playlist", banner="banners/test")
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, "w_160", count=2)
+        self.assertContains(response, 'sizes="%s"' % posters.CARD_SIZES, count=2)
+        self.assertNotContains(response, "/image/upload/v1/")  # full-size URL kahin nahi
+
+        detail = self.client.get(reverse("movie_detail", args=[movie.pk]))
+        self.assertContains(detail, "%s 640w" % movie.poster_variants["urls"]["640"])
+        self.assertContains(detail, 'loading="eager"')
+
+
+class FakeCloudinaryApi:
+    """Stands in for ``cloudinary.api``: records calls, can fail or leave ids out of the answer."""
+
+    def __init__(self, failures=0, unanswered=()):
+        self.calls = []
+        self.failures = failures
+        self.unanswered = set(unanswered)
+
+    def delete_resources(self, public_ids, resource_type="image", type="upload"):
+        import cloudinary.exceptions
+
+        self.calls.append((list(public_ids), resource_type, type))
+        if self.failures:
+            self.failures -= 1
+            raise cloudinary.exceptions.RateLimited("Rate Limit Exceeded")
+        return {"deleted": {pid: "deleted" for pid in public_ids if pid not in self.unanswered}, "partial": False}
+
+
+@mock.patch("cloudinary.uploader.destroy", side_effect=AssertionError("no per-row destroy calls"))
+class AssetDeletionTests(TestCase):
+    def test_bulk_delete_is_queued_and_drained_in_batches_of_100(self, destroy):
+        Movie.objects.bulk_create(
+            Movie(title=f"Movie {i}", description="", poster=f"posters/bulk-{i}", download_link="https://example.com/f")
+            for i in range(1000)
+        )
+        Playlist.objects.create(name="Saga", banner="banners/saga")
+        Movie.objects.all().delete()
+        Playlist.objects.all().delete()
+        self.assertEqual(PendingAssetDeletion.objects.count(), 1001)
+
+        api = FakeCloudinaryApi()
+        result = asset_deletions.drain(api=api)
+        self.assertEqual(len(api.calls), 11)
+        self.assertTrue(all(len(ids) <= 100 for ids, _, _ in api.calls))
+        self.assertEqual(result["deleted"], 1001)
+        self.assertFalse(PendingAssetDeletion.objects.exists())
+
+    def test_rolled_back_delete_keeps_the_image(self, destroy):
+        from django.db import transaction
+
+        movie = make_movie("Kept")
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            movie.delete()
+            raise RuntimeError
+        self.assertFalse(PendingAssetDeletion.objects.exists())
+
+    def test_failures_back_off_then_give_up(self, destroy):
+        make_movie("Flaky", poster="posters/flaky").delete()
+        make_movie("Ghost", poster="posters/ghost").delete()
+
+        api = FakeCloudinaryApi(failures=1, unanswered={"posters/ghost"})
+        result = asset_deletions.drain(api=api)
+        self.assertEqual((result["calls"], result["retrying"]), (1, 2))
+        row = PendingAssetDeletion.objects.get(public_id="posters/flaky")
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertIn("RateLimited", row.last_error)
+        self.assertEqual(asset_deletions.drain(api=api)["calls"], 0)  # backoff abhi khatam nahi hua
+
+        with override_settings(ASSET_DELETION={"MAX_ATTEMPTS": 3}):
+            for _ in range(2):
+                PendingAssetDeletion.objects.update(next_attempt_at=timezone.now())
+                result = asset_deletions.drain(api=api)
+            self.assertEqual(result["failed"], 1)
+            self.assertEqual(list(PendingAssetDeletion.objects.values_list("public_id", "attempts")), [("posters/ghost", 3)])
+            self.assertEqual(asset_deletions.retry_failed(), 1)
+        self.assertEqual(PendingAssetDeletion.objects.get().attempts, 0)
+
+
+class LinkHealthTests(TestCase):
+    """Probes a real HTTP server on 127.0.0.1."""
+
+    @classmethod
+    def setUpClass(cls):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        super().setUpClass()
+        cls.seen = []
+        cls.in_flight = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def respond(self):
+                with lock:
+                    cls.seen.append((self.command, self.path, self.headers.get("Range")))
+                    cls.in_flight["now"] += 1
+                    cls.in_flight["max"] = max(cls.in_flight["max"], cls.in_flight["now"])
+                try:
+                    if self.path.startswith("/slow"):
+                        time.sleep(0.05)
+                    if self.path.startswith("/hang"):
+                        time.sleep(1)
+                    if self.path.startswith("/missing"):
+                        status, body = 404, b"gone"
+                    elif self.path.startswith("/nohead") and self.command == "HEAD":
+                        status, body = 405, b""
+                    elif self.headers.get("Range") == "bytes=0-0":
+                        status, body = 206, b"x"
+                    else:
+                        status, body = 200, b"x" * 1_000_000  # poori file: probe ise kabhi na maange
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if self.command != "HEAD":
+                        self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with lock:
+                        cls.in_flight["now"] -= 1
+
+            do_GET = do_HEAD = respond
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.seen.clear()
+        self.in_flight.update(now=0, max=0)
+
+    def checker(self, **kwargs):
+        conf = {"concurrency": 8, "per_host": 8, "rate": 0, "burst": 1, "timeout": 5, "method": "range"}
+        return link_health.LinkChecker(**{**conf, **kwargs})
+
+    def test_results_are_stored_with_status_and_latency(self):
+        good = make_movie("Good", download_link=f"{self.base}/file/1", udrop_link=f"{self.base}/missing/1")
+        hung = make_movie("Hung", download_link=f"{self.base}/hang/1")
+
+        totals = link_health.check_links(checker=self.checker(timeout=0.3), batch_size=2)
+        self.assertEqual(totals, {"checked": 3, "ok": 1, "broken": 2})
+        self.assertTrue(all(method == "GET" and range_ == "bytes=0-0" for method, _, range_ in self.seen))
+
+        checks = {(c.movie_id, c.field): c for c in LinkCheck.objects.all()}
+        self.assertEqual(checks[good.pk, "download_link"].status_code, 206)
+        self.assertTrue(checks[good.pk, "download_link"].ok)
+        self.assertEqual(checks[good.pk, "udrop_link"].status_code, 404)
+        self.assertIn("Timeout", checks[hung.pk, "download_link"].error)
+        self.assertIsNotNone(checks[hung.pk, "download_link"].latency_ms)
+
+        # Dobara chalane par wahi rows update hoti hain
+        Movie.objects.filter(pk=good.pk).update(udrop_link=f"{self.base}/file/2")
+        link_health.check_links(Movie.objects.filter(pk=good.pk), checker=self.checker())
+        self.assertEqual(LinkCheck.objects.count(), 3)
+        self.assertTrue(LinkCheck.objects.get(movie=good, field="udrop_link").ok)
+
+    def test_head_probe_falls_back_to_range_get(self):
+        make_movie("Head", download_link=f"{self.base}/nohead/1")
+        link_health.check_links(checker=self.checker(method="head"), fields=["download_link"])
+        self.assertEqual([(m, r) for m, _, r in self.seen], [("HEAD", None), ("GET", "bytes=0-0")])
+        self.assertTrue(LinkCheck.objects.get().ok)
+
+    def test_per_host_concurrency_is_capped(self):
+        Movie.objects.bulk_create(
+            Movie(title=f"Slow {i}", description="", poster="posters/test", download_link=f"{self.base}/slow/{i}")
+            for i in range(12)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            totals = link_health.check_links(checker=self.checker(concurrency=8, per_host=2), batch_size=100)
+        self.assertEqual(totals["ok"], 12)
+        self.assertEqual(self.in_flight["max"], 2)
+        self.assertLessEqual(len(queries), 3)  # movies stream + ek bulk upsert
+
+    def test_unexpected_errors_and_deleted_movies_do_not_stop_the_run(self):
+        broken = make_movie("Broken", download_link="http://[::1/bad")
+        flaky = make_movie("Flaky", download_link=f"{self.base}/file/1")
+        gone = make_movie("Gone", download_link=f"{self.base}/file/2")
+        original = link_health.LinkChecker.request
+
+        def request(checker, method, url, headers):
+            if url.endswith("/file/1"):
+                raise RuntimeError("adapter bug")
+            return original(checker, method, url, headers)
+
+        def run(checker, targets, on_result):
+            targets = list(targets)
+            Movie.objects.filter(pk=gone.pk).delete()  # run ke beech admin ne delete kiya
+            return run.original(checker, targets, on_result)
+
+        run.original = link_health.LinkChecker.run
+        with mock.patch.object(link_health.LinkChecker, "request", request), \
+                mock.patch.object(link_health.LinkChecker, "run", run):
+            totals = link_health.check_links(checker=self.checker(), fields=["download_link"])
+        self.assertEqual(totals, {"checked": 3, "ok": 1, "broken": 2})
+        checks = {c.movie_id: c for c in LinkCheck.objects.all()}
+        self.assertEqual(set(checks), {broken.pk, flaky.pk})
+        self.assertIn("ValueError", checks[broken.pk].error)
+        self.assertIn("RuntimeError: adapter bug", checks[flaky.pk].error)
+
+    def test_token_bucket_spaces_out_requests(self):
+        clock = {"now": 0.0}
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock["now"] += seconds
+
+        bucket = link_health.TokenBucket(rate=4, burst=2, clock=lambda: clock["now"], sleep=sleep)
+        for _ in range(6):
+            bucket.acquire()
+        self.assertAlmostEqual(clock["now"], 1.0)  # 2 burst se, baaki 4 ko 0.25s har ek
+        self.assertEqual(len(sleeps), 4)
+
+
+class RecordingLinkProvider(link_rotation.DummyLinkProvider):
+    def __init__(self, generation=1):
+        super().__init__(generation)
+        self.seen = []
+
+    def links_for(self, rows):
+        self.seen.extend(pk for pk, _, _ in rows)
+        return super().links_for(rows)
+
+
+class LinkRotationTests(TestCase):
+    def setUp(self):
+        Movie.objects.bulk_create(
+            Movie(title=f"Movie {i}", description="", poster="posters/test", download_link="https://example.com/f")
+            for i in range(2500)
+        )
+        self.ids = list(Movie.objects.order_by("pk").values_list("pk", flat=True))
+
+    def test_chunks_cost_a_fixed_number_of_queries(self):
+        before = Movie.objects.order_by("pk").values_list("updated_at", flat=True).first()
+        with CaptureQueriesContext(connection) as queries:
+            # SQLite ek statement me 999 parameters (3 per row) leta hai: 250 rows ka chunk ek hi UPDATE rehta hai
+            result = link_rotation.rotate_links(link_rotation.DummyLinkProvider(), chunk_size=250)
+        self.assertEqual((result["scanned"], result["changed"], result["chunks"]), (2500, 2500, 10))
+        updates = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "movies_movie"')]
+        self.assertEqual(len(updates), 10)
+        self.assertTrue(all('"updated_at"' not in sql for sql in updates))
+        self.assertLessEqual(len(queries), 10 * 5 + 3)  # chunk: select, savepoint, update, checkpoint, release
+        self.assertEqual(Movie.objects.get(pk=self.ids[7]).udrop_link, f"https://udrop.link/{self.ids[7]}-1")
+        self.assertEqual(Movie.objects.order_by("pk").values_list("updated_at", flat=True).first(), before)
+        self.assertEqual(link_rotation.checkpoint(), 0)
+
+        # Same links dobara: kuch nahi badla to koi UPDATE nahi
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(link_rotation.rotate_links(link_rotation.DummyLinkProvider(), chunk_size=250)["changed"], 0)
+        self.assertFalse([q for q in queries if q["sql"].startswith('UPDATE "movies_movie"')])
+
+    def test_dry_run_writes_nothing(self):
+        result = link_rotation.rotate_links(link_rotation.DummyLinkProvider(), chunk_size=1000, dry_run=True)
+        self.assertEqual(result["changed"], 2500)
+        self.assertFalse(Movie.objects.exclude(udrop_link=None).exists())
+        self.assertFalse(RollupWatermark.objects.filter(name=link_rotation.CHECKPOINT).exists())
+
+    def test_resume_continues_after_the_checkpoint(self):
+        first = RecordingLinkProvider(generation=2)
+        link_rotation.rotate_links(first, chunk_size=400, limit=1000)
+        self.assertEqual(link_rotation.checkpoint(), self.ids[999])
+
+        second = RecordingLinkProvider(generation=2)
+        out = StringIO()
+        with override_settings(LINK_ROTATION={"PROVIDER": "movies.link_rotation.DummyLinkProvider", "CHUNK_SIZE": 700}):
+            call_command("rotate_udrop_links", "--resume", stdout=out)
+        self.assertIn("1500 movies scanned", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(first.seen, self.ids[:1000])
+        self.assertEqual(link_rotation.checkpoint(), 0)
+        self.assertFalse(Movie.objects.filter(udrop_link=None).exists())
+
+
+FLAKY_CALLS = []
+
+
+@jobs.task("test_flaky")
+def flaky_task(fail_times=0, key=""):
+    FLAKY_CALLS.append(key)
+    if FLAKY_CALLS.count(key) <= fail_times:
+        raise RuntimeError(f"boom {key}")
+
+
+@override_settings(JOBS={"SCHEDULE": {}, "BACKOFF_SECONDS": 10, "MAX_ATTEMPTS": 3})
+class JobQueueTests(TestCase):
+    def setUp(self):
+        FLAKY_CALLS.clear()
+
+    def run_worker(self, **kwargs):
+        kwargs.setdefault("schedule", False)
+        return jobs.Worker(burst=True, poll_interval=0, **kwargs).run()
+
+    def test_enqueue_and_run_in_a_burst_worker(self):
+        job = jobs.enqueue("send_mail", subject="Hi", message="Body", recipient_list=["a@b.c"])
+        later = jobs.enqueue("noop", delay=3600)
+        self.assertEqual(mail.outbox, [])  # enqueue kuch bhejta nahi
+
+        counts = self.run_worker()
+        self.assertEqual(counts[Job.DONE], 1)
+        self.assertEqual([m.subject for m in mail.outbox], ["Hi"])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(Job.objects.get(pk=later.pk).status, Job.QUEUED)  # scheduled: abhi due nahi
+
+        with self.assertRaises(ValueError):
+            jobs.enqueue("no_such_task")
+
+    def test_failures_back_off_then_fail(self):
+        retried = jobs.enqueue("test_flaky", fail_times=1, key="a")
+        doomed = jobs.enqueue("test_flaky", fail_times=99, key="b", max_attempts=2)
+        start = timezone.now()
+        counts = self.run_worker()
+        self.assertEqual(counts[Job.QUEUED], 2)
+        for job in (retried, doomed):
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertGreaterEqual(job.run_at, start + timedelta(seconds=5))
+            self.assertIn("RuntimeError: boom", job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        self.run_worker()
+        retried.refresh_from_db()
+        doomed.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts, retried.last_error), (Job.DONE, 2, ""))
+        self.assertEqual((doomed.status, doomed.attempts), (Job.FAILED, 2))
+        self.assertEqual(FLAKY_CALLS.count("b"), 2)
+
+    def test_claims_do_not_overlap_and_expired_leases_are_reclaimed(self):
+        for i in range(5):
+            jobs.enqueue("noop", n=i)
+        first = jobs.claim("a", 3, lease_seconds=60)
+        second = jobs.claim("b", 3, lease_seconds=60)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(jobs.claim("c", 3, lease_seconds=60), [])
+
+        # Worker "a" mar gaya: lease khatam hone par "c" le leta hai, "a" ka late finish kuch nahi badalta
+        Job.objects.filter(pk=first[0].pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        (taken,) = jobs.claim("c", 3, lease_seconds=60)
+        self.assertEqual((taken.pk, taken.attempts), (first[0].pk, 2))
+        jobs.finish(first[0], "late", jobs.job_settings())
+        self.assertEqual(Job.objects.get(pk=taken.pk).status, Job.RUNNING)
+        self.assertEqual(jobs.finish(taken, None, jobs.job_settings()), Job.DONE)
+        self.assertEqual(Job.objects.get(pk=taken.pk).status, Job.DONE)
+
+    def test_recurring_jobs_keep_one_pending_copy(self):
+        schedule = {"tick": {"task": "noop", "every": 60}}
+        with override_settings(JOBS={"SCHEDULE": schedule}):
+            self.assertEqual(jobs.ensure_schedule(), 1)
+            self.assertEqual(jobs.ensure_schedule(), 0)
+            start = timezone.now()
+            counts = self.run_worker(schedule=True)
+        self.assertEqual(counts[Job.DONE], 1)
+        done, pending = Job.objects.filter(schedule="tick").order_by("pk")
+        self.assertEqual((done.status, pending.status), (Job.DONE, Job.QUEUED))
+        self.assertGreaterEqual(pending.run_at, start + timedelta(seconds=60))
+
+    def test_run_workers_command_and_batching(self):
+        for i in range(25):
+            jobs.enqueue("noop", n=i)
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("run_workers", "--concurrency", "1", "--burst", "--no-schedule", "--batch-size", "10", stdout=out)
+        self.assertIn("25 jobs done, 0 to retry, 0 failed", out.getvalue())
+        claims = [q for q in queries if q["sql"].startswith('UPDATE "movies_job" SET "status" = \'running\'')]
+        self.assertEqual(len(claims), 3)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def test_purge_keeps_failed_jobs(self):
+        old = timezone.now() - timedelta(days=30)
+        kept = Job.objects.create(task="noop", status=Job.FAILED, finished_at=old)
+        Job.objects.create(task="noop", status=Job.DONE, finished_at=old)
+        recent = Job.objects.create(task="noop", status=Job.DONE, finished_at=timezone.now())
+        jobs.purge_jobs(days=7)
+        self.assertEqual(set(Job.objects.values_list("pk", flat=True)), {kept.pk, recent.pk})
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(SITEMAPS={"ROOT": self.root, "BASE_URL": "https://example.com/"})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.category = Category.objects.create(name="Action")
+        self.playlist = Playlist.objects.create(name="Show", category=self.category)
+        self.movies = [make_movie("One", category=self.category), make_movie("Two"),
+                       make_movie("Episode", playlist=self.playlist)]
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), encoding="utf-8") as f:
+            return f.read()
+
+    def test_sections_are_paginated_with_lastmod(self):
+        result = sitemaps.build_sitemaps(page_size=2)
+        self.assertEqual((result["urls"], result["files"]), (5, 4))
+
+        index = self.read("sitemap.xml")
+        for name in ("sitemap-movies-1.xml", "sitemap-movies-2.xml", "sitemap-playlists-1.xml", "sitemap-categories-1.xml"):
+            self.assertIn(f"<loc>https://example.com/{name}</loc>", index)
+        movies = self.read("sitemap-movies-1.xml")
+        first = self.movies[0]
+        self.assertIn(f"<url><loc>https://example.com/movie/{first.pk}/</loc>"
+                      f"<lastmod>{sitemaps.lastmod(first.updated_at)}</lastmod></url>", movies)
+        newest = max(self.movies[0].updated_at, self.playlist.updated_at)
+        self.assertIn(f"<lastmod>{sitemaps.lastmod(newest)}</lastmod>", self.read("sitemap-categories-1.xml"))
+        with gzip.open(os.path.join(self.root, "sitemap-movies-1.xml.gz"), "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), movies)
+
+        self.assertEqual(sitemaps.build_sitemaps(page_size=2)["written"], 0)  # kuch nahi badla
+        Movie.objects.filter(pk=self.movies[2].pk).delete()
+        result = sitemaps.build_sitemaps(page_size=2)
+        self.assertEqual((result["files"], result["removed"]), (3, 2))  # movies-2 ki .xml aur .gz
+        self.assertNotIn("sitemap-movies-2.xml", self.read("sitemap.xml"))
+
+    def test_files_are_served_without_queries(self):
+        sitemaps.build_sitemaps()
+        url = reverse("sitemap_section", args=["sitemap-movies-1.xml"])
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+            plain = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=plain["ETag"])
+            missing = self.client.get("/sitemap-movies-9.xml")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)).decode(), self.read("sitemap-movies-1.xml"))
+        self.assertEqual(b"".join(plain.streaming_content).decode(), self.read("sitemap-movies-1.xml"))
+        self.assertEqual(response["Content-Type"], "application/xml")
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_missing_index_is_built_in_the_background(self):
+        with mock.patch.object(sitemaps, "_rebuild") as rebuild, self.assertNumQueries(0):
+            response = self.client.get("/sitemap.xml")
+            sitemaps._rebuild_timer.join()
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "60"))
+        rebuild.assert_called_once()
+        sitemaps._rebuild_timer = None
+
+    def test_concurrent_writers_do_not_share_temp_files(self):
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def write(text):
+            barrier.wait()
+            try:
+                sitemaps.write_file(self.root, "sitemap-movies-1.xml", text)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=write, args=(f"<urlset>{n}</urlset>\n" * 5000,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(os.listdir(self.root)), ["sitemap-movies-1.xml", "sitemap-movies-1.xml.gz"])
+        with gzip.open(os.path.join(self.root, "sitemap-movies-1.xml.gz"), "rt", encoding="utf-8") as f:
+            self.assertIn(f.read(), [f"<urlset>{n}</urlset>\n" * 5000 for n in range(4)])
+
+    def test_changes_schedule_one_rebuild_after_commit(self):
+        with mock.patch.object(sitemaps, "schedule_rebuild") as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                make_movie("Three")
+                self.assertFalse(schedule.called)
+            self.assertTrue(schedule.called)
+
+        with override_settings(SITEMAPS={"ROOT": self.root, "REBUILD_DELAY": 3600}):
+            sitemaps.schedule_rebuild()
+            timer = sitemaps._rebuild_timer
+            self.addCleanup(setattr, sitemaps, "_rebuild_timer", None)
+            self.addCleanup(timer.cancel)
+            sitemaps.schedule_rebuild()
+            self.assertIs(sitemaps._rebuild_timer, timer)
+
+
+class AdminMetricsTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        metrics.metrics_cache().delete(metrics.CACHE_KEY)
+        self.addCleanup(metrics.metrics_cache().delete, metrics.CACHE_KEY)
+        self.admin = User.objects.create_superuser("admin", "a@b.c", "pw")
+        playlist = Playlist.objects.create(name="Show")
+        movie = make_movie("Popular", download_count=7)
+        make_movie("Episode", playlist=playlist)
+        now = timezone.now()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        DownloadRollupHourly.objects.create(movie=movie, movie_title="Popular", bucket=hour, downloads=3)
+        DownloadRollupHourly.objects.create(movie=movie, movie_title="Popular", bucket=hour - timedelta(days=3), downloads=4)
+        DownloadLog.objects.create(movie=movie, movie_title="Popular", ip_address="1.2.3.4")
+        installs.record_install("device-1", "Android")
+
+    def test_snapshot_numbers_in_one_query_plus_lists(self):
+        # headline numbers (CROSS JOIN) + top movies + recent downloads + recent installs;
+        # PostgreSQL par chhoti table ka estimate EXACT_BELOW se kam hai, to exact COUNT(*) bhi
+        with self.assertNumQueries(5 if connection.vendor == "postgresql" else 4):
+            snapshot = metrics.compute_snapshot()
+        self.assertEqual(snapshot["totals"], {"users": 1, "movies": 2, "downloads": 1, "installs": 1})
+        self.assertEqual(snapshot["recent"], {
+            "users_7d": 1, "movies_7d": 2, "movies_in_playlists": 1, "downloads_24h": 3, "downloads_7d": 7,
+        })
+        self.assertEqual(snapshot["approximate"], {"downloads": False})
+        self.assertEqual(snapshot["top_movies"], [{"movie_title": "Popular", "download_count": 7}])
+        self.assertEqual(snapshot["recent_downloads"][0]["movie_title"], "Popular")
+        self.assertEqual(snapshot["recent_installs"][0]["device_id"], "device-1")
+
+    @skipUnless(connection.vendor == "postgresql", "row estimate sirf PostgreSQL par")
+    @override_settings(METRICS={"EXACT_BELOW": 0})
+    def test_large_download_table_uses_the_estimate(self):
+        with self.assertNumQueries(4):
+            snapshot = metrics.compute_snapshot()
+        self.assertEqual(snapshot["approximate"], {"downloads": True})
+
+    def test_cached_snapshot_is_shared_and_refreshed_in_background(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse("myadmin:index"))
+        make_movie("New")
+        with CaptureQueriesContext(connection) as ctx:
+            index = self.client.get(reverse("myadmin:index"))
+            dashboard = self.client.get(reverse("admin_dashboard"))
+            live = self.client.get(reverse("admin_metrics")).json()
+        self.assertFalse([q for q in ctx.captured_queries if "movies_movie" in q["sql"]])  # cache se
+        self.assertContains(index, "Popular")
+        self.assertContains(dashboard, "Popular")
+        self.assertEqual(live["totals"]["movies"], 2)
+        self.assertEqual(live["recent"]["downloads_7d"], 7)
+
+        # TTL ke baad purana snapshot turant milta hai, naya ek background thread banata hai
+        later = time.time() + metrics.metrics_settings()["TTL"] + 1
+        with mock.patch.object(metrics.time, "time", return_value=later), \
+                mock.patch.object(metrics.threading, "Thread") as thread:
+            self.assertEqual(metrics.get_snapshot()["totals"]["movies"], 2)
+            self.assertEqual(metrics.get_snapshot()["totals"]["movies"], 2)
+        self.assertEqual(thread.call_count, 1)  # cache.add lock: sirf ek refresh
+        metrics.refresh()
+        self.assertEqual(metrics.get_snapshot()["totals"]["movies"], 3)
+
+    def test_endpoint_is_staff_only(self):
+        response = self.client.get(reverse("admin_metrics"))
+        self.assertEqual(response.status_code, 302)
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        from .admin import DownloadLogAdmin
+
+        patcher = mock.patch.object(DownloadLogAdmin, "list_per_page", 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(User.objects.create_superuser("admin", "a@b.c", "pw"))
+        self.movie = make_movie("Needle")
+        now = timezone.now()
+        DownloadLog.objects.bulk_create(
+            # Do-do rows ka same download_time: keyset ko id se tie todna hai
+            DownloadLog(movie=self.movie if i % 5 == 0 else None, movie_title="Needle" if i % 5 == 0 else "Other",
+                        download_time=now - timedelta(minutes=i // 2), ip_address=f"10.{i % 3}.0.{i}",
+                        username=f"user{i}")
+            for i in range(25)
+        )
+        self.url = reverse("myadmin:movies_downloadlog_changelist")
+
+    def page(self, query=None):
+        response = self.client.get(self.url + (query or ""))
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    def test_older_and_newer_pages_by_cursor(self):
+        expected = list(DownloadLog.objects.order_by("-download_time", "-pk").values_list("pk", flat=True))
+        pages, cl = [], self.page()
+        self.assertIsNone(cl.keyset["newer"])
+        while True:
+            pages.append([row.pk for row in cl.result_list])
+            if not cl.keyset["older"]:
+                break
+            cl = self.page(cl.keyset["older"])
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+
+        newer = self.page(cl.keyset["newer"])
+        self.assertEqual([row.pk for row in newer.result_list], pages[1])
+        newest = self.page(newer.keyset["newer"])  # pehle page tak: poora page, Newer link nahi
+        self.assertEqual([row.pk for row in newest.result_list], pages[0])
+        self.assertIsNone(newest.keyset["newer"])
+
+    def test_pages_cost_the_same_and_never_count_the_whole_table(self):
+        self.page()  # session/content types warm
+        with CaptureQueriesContext(connection) as first:
+            cl = self.page()
+        with CaptureQueriesContext(connection) as last:
+            self.page(self.page(cl.keyset["older"]).keyset["older"])
+        counts = [q["sql"] for q in first.captured_queries if "COUNT(" in q["sql"]]
+        self.assertEqual(len(counts), 1)
+        self.assertIn("LIMIT", counts[0])  # capped count, full COUNT(*) nahi
+        self.assertFalse([q for q in first.captured_queries if "DISTINCT" in q["sql"]])
+        self.assertEqual(cl.result_count, 25)
+        self.assertLessEqual(len(last.captured_queries), 2 * len(first.captured_queries))
+
+    def test_count_is_capped(self):
+        with mock.patch.object(large_tables, "COUNT_LIMIT", 20):
+            cl = self.page()
+        self.assertEqual(cl.result_count, 20)
+        self.assertTrue(cl.paginator.capped)
+
+    def test_ip_username_and_title_search(self):
+        def found(term):
+            return {row.ip_address for row in self.page("?q=" + term).result_list}
+
+        self.assertEqual(found("10.1.0.4"), {"10.1.0.4"})
+        self.assertEqual(len(found("10.1.")), 8)
+        self.assertEqual(found("10.2.0.0/16"), {f"10.2.0.{i}" for i in range(25) if i % 3 == 2})
+        self.assertEqual({row.username for row in self.page("?q=user7").result_list}, {"user7"})
+        self.assertEqual({row.movie_title for row in self.page("?q=needl").result_list}, {"Needle"})
+        self.assertEqual(list(self.page("?q=user").result_list), [])  # username sirf exact
+
+    def test_sorting_by_column_falls_back_to_offset_pages(self):
+        cl = self.page("?o=2")
+        self.assertIsNone(cl.keyset)
+        self.assertEqual(cl.result_count, 25)
+        self.assertTrue(cl.multi_page)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + "?before=yesterday")
+        self.assertRedirects(response, self.url + "?e=1", fetch_redirect_response=False)
+
+    def test_date_hierarchy_from_first_and_last_row(self):
+        old = timezone.now() - timedelta(days=800)
+        DownloadLog.objects.create(movie_title="Old", download_time=old, ip_address="10.9.9.9")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertFalse([q for q in ctx.captured_queries if "DISTINCT" in q["sql"]])
+        years = [choice["title"] for choice in response.context["choices"]]
+        self.assertEqual(years, [str(year) for year in range(timezone.localtime(old).year, timezone.localtime().year + 1)])
+
+        cl = self.page(f"?download_time__year={timezone.localtime(old).year}")
+        self.assertEqual([row.movie_title for row in cl.result_list], ["Old"])
+
+    def test_install_tracker_changelist(self):
+        installs.record_install("device-1", "Android")
+        installs.record_install("device-2", "iOS")
+        installs.record_uninstall("device-2")
+        url = reverse("myadmin:movies_installtracker_changelist")
+        response = self.client.get(url, {"last_action": "uninstall"})
+        self.assertEqual([row.device_id for row in response.context["cl"].result_list], ["device-2"])
+        response = self.client.get(url, {"q": "device-1"})
+        self.assertEqual([row.device_id for row in response.context["cl"].result_list], ["device-1"])
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        os.makedirs(os.path.join(self.dir, "art"))
+        for name in ("a.jpg", "b.jpg"):
+            with open(os.path.join(self.dir, "art", name), "wb") as f:
+                f.write(b"\xff\xd8" + name.encode())
+        self.uploader = catalog_import.LocalPosterUploader(root=os.path.join(self.dir, "uploaded"))
+        self.rows = [
+            {"title": f"Show S01E{i:02d}", "description": f"Episode {i}", "download_link": f"https://example.com/{i}",
+             "category": "Drama", "playlist": "Show", "poster": "art/a.jpg" if i == 1 else ""}
+            for i in range(1, 13)
+        ] + [
+            {"title": "Needle Movie", "description": "A film", "download_link": "https://example.com/needle",
+             "category": "Action", "playlist": "", "poster": "art/b.jpg"},
+            {"title": "Broken", "description": "", "download_link": "not a url", "category": "", "playlist": "", "poster": ""},
+        ]
+
+    def write_csv(self, rows, name="catalog.csv"):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def run_import(self, path, **kwargs):
+        kwargs.setdefault("batch_size", 5)
+        return catalog_import.import_catalog(path, uploader=self.uploader, workers=4, **kwargs)
+
+    def test_import_then_rerun_changes_nothing(self):
+        Category.objects.create(name="Drama")
+        path = self.write_csv(self.rows)
+        result = self.run_import(path)
+        self.assertEqual((result["rows"], result["created"], result["skipped"]), (14, 13, 1))
+        self.assertEqual((result["categories_created"], result["playlists_created"], result["uploaded"]), (1, 1, 2))
+        self.assertEqual(result["batches"], 3)
+
+        show = Playlist.objects.get(name="Show")
+        self.assertEqual(show.category.name, "Drama")
+        episode = Movie.objects.get(title="Show S01E12")
+        self.assertEqual((episode.playlist, episode.season_num, episode.episode_num), (show, 1, 12))
+        needle = Movie.objects.get(title="Needle Movie")
+        self.assertTrue(needle.poster_variants["source"].endswith(catalog_import.public_id_of(needle.poster)))
+        self.assertTrue(os.path.exists(os.path.join(self.uploader.root, catalog_import.public_id_of(needle.poster))))
+        self.assertEqual(list(get_search_backend().search(Movie.objects.all(), "needle").values_list("title", flat=True)),
+                         ["Needle Movie"])
+
+        with CaptureQueriesContext(connection) as queries:
+            again = self.run_import(path)
+        self.assertEqual((again["created"], again["updated"], again["unchanged"], again["uploaded"]), (0, 0, 13, 0))
+        self.assertFalse([q for q in queries if q["sql"].startswith(('INSERT INTO "movies_movie"', 'UPDATE "movies_movie"'))])
+        self.assertEqual(Movie.objects.count(), 13)
+
+        self.rows[12]["description"] = "Now with more needles"
+        self.rows[12]["poster"] = "art/a.jpg"
+        changed = self.run_import(self.write_csv(self.rows))
+        self.assertEqual((changed["created"], changed["updated"], changed["uploaded"]), (0, 1, 1))
+        needle.refresh_from_db()
+        self.assertEqual((needle.description, needle.created_at is not None), ("Now with more needles", True))
+        self.assertEqual(Movie.objects.count(), 13)
+
+    def test_resume_after_a_failed_batch(self):
+        path = self.write_csv(self.rows)
+        original = catalog_import.CatalogImporter.import_batch
+        calls = []
+
+        def fail_second(importer, rows, posters):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return original(importer, rows, posters)
+
+        with mock.patch.object(catalog_import.CatalogImporter, "import_batch", fail_second), \
+                self.assertRaises(RuntimeError):
+            self.run_import(path)
+        self.assertEqual(catalog_import.checkpoint(catalog_import.checkpoint_name(path)), 5)
+        self.assertEqual(Movie.objects.count(), 5)
+
+        result = self.run_import(path, resume=True)
+        self.assertEqual((result["rows"], result["created"]), (9, 8))
+        self.assertEqual(Movie.objects.count(), 13)
+        self.assertEqual(catalog_import.checkpoint(catalog_import.checkpoint_name(path)), 0)
+
+    def test_posters_upload_outside_the_batch_transaction(self):
+        depths = {}
+        for method in ("upload_batch", "import_batch"):
+            original = getattr(catalog_import.CatalogImporter, method)
+
+            def record(importer, *args, method=method, original=original):
+                depths.setdefault(method, len(connection.atomic_blocks))
+                return original(importer, *args)
+
+            patcher = mock.patch.object(catalog_import.CatalogImporter, method, record)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        result = self.run_import(self.write_csv(self.rows))
+        self.assertEqual(result["uploaded"], 2)
+        self.assertEqual(depths["import_batch"], depths["upload_batch"] + 1)
+
+    def test_poster_failure_keeps_the_row(self):
+        self.rows[12]["poster"] = "art/missing.jpg"
+        result = self.run_import(self.write_csv(self.rows))
+        self.assertEqual((result["created"], result["poster_errors"]), (13, 1))
+        self.assertFalse(Movie.objects.get(title="Needle Movie").poster)
+
+    def test_command_reads_jsonl(self):
+        path = os.path.join(self.dir, "catalog.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for row in self.rows[:3]:
+                f.write(json.dumps({**row, "poster": None, "key": row["title"].lower()}) + "\n")
+            f.write("not json\n")
+        out = StringIO()
+        call_command("import_catalog", path, "--no-sitemaps", "--batch-size", "2", stdout=out)
+        self.assertIn("4 rows", out.getvalue())
+        self.assertIn("3 created", out.getvalue())
+        self.assertIn("line 4: not a JSON object", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(Movie.objects.get(title="Show S01E02").import_key, "show s01e02")
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from django.contrib.auth import views as auth_views
@@ -14,11 +15,25 @@ urlpatterns = [
     path("movie/<int:movie_id>/", views.movie_detail, name="movie_detail"),
     path("download/<int:movie_id>/", views.download_movie, name="download_movie"),
 
+    # -------------------------
+    # JSON Feed API (infinite scroll)
+    # -------------------------
+    path("api/feed/", views.api_feed, name="api_feed"),
+    path("api/category/<int:category_id>/feed/", views.api_category_feed, name="api_category_feed"),
+    path("api/suggest/", views.api_suggest, name="api_suggest"),
+
+    # -------------------------
+    # Offline Catalog Snapshot (manage.py build_catalog_snapshot)
+    # -------------------------
+    path("api/catalog/", views.api_catalog, name="api_catalog"),
+    path(f"{settings.STATIC_URL.lstrip('/')}catalog/<str:name>", views.catalog_shard, name="catalog_shard"),
+
     # -------------------------
     # PWA Install & Uninstall Tracking
     # -------------------------
     path("track-install/", views.track_install, name="track_install"),
     path("track-uninstall/", views.track_uninstall, name="track_uninstall"),
+    path("api/installs/batch/", views.api_install_events, name="api_install_events"),
 
     # -------------------------
     # Authentication Views
@@ -30,6 +45,7 @@ urlpatterns = [
     # Admin Dashboard URLs
     # -------------------------
     path("admin/dashboard/", views.custom_admin_dashboard, name="admin_dashboard"),
+    path("admin/metrics/", views.admin_metrics, name="admin_metrics"),
     path("admin/reset-install-data/", views.reset_install_data, name="reset_install_data"),
 
     # -------------------------
@@ -0,0 +1,97 @@
+"""
+Interning of download user agents into the ``UserAgent`` lookup table.
+
+Each distinct user-agent string is stored once, keyed by its sha1
+``digest``. ``DownloadLog`` rows only keep the ``agent`` id. The process
+keeps a small LRU of digest -> id so that, on a hit, ``download_movie``
+runs no lookup query. A user agent that has never been seen costs one
+``get_or_create``.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.db import IntegrityError
+
+from .models import UserAgent
+
+CACHE_SIZE = 2048
+
+
+def agent_digest(value):
+    return hashlib.sha1(value.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class UserAgentCache:
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # digest -> UserAgent id
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_id(self, value):
+        """Id of the ``UserAgent`` row for ``value`` (created if needed). Empty strings give None."""
+        if not value:
+            return None
+        digest = agent_digest(value)
+        with self.lock:
+            pk = self.entries.get(digest)
+            if pk is not None:
+                self.entries.move_to_end(digest)
+                self.hits += 1
+                return pk
+            self.misses += 1
+
+        try:
+            pk = UserAgent.objects.get_or_create(digest=digest, defaults={"value": value})[0].pk
+        except IntegrityError:  # doosre worker ne isi beech bana diya
+            pk = UserAgent.objects.get(digest=digest).pk
+        self.remember(digest, pk)
+        return pk
+
+    def remember(self, digest, pk):
+        with self.lock:
+            self.entries[digest] = pk
+            self.entries.move_to_end(digest)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+def intern_many(values):
+    """Bulk version for backfills: ``{value: UserAgent id}`` for every non-empty string."""
+    digests = {agent_digest(value): value for value in set(values) if value}
+    if not digests:
+        return {}
+    UserAgent.objects.bulk_create(
+        [UserAgent(digest=digest, value=value) for digest, value in digests.items()],
+        ignore_conflicts=True,
+    )
+    ids = dict(UserAgent.objects.filter(digest__in=digests).values_list("digest", "id"))
+    return {value: ids[digest] for digest, value in digests.items()}
+
+
+# ----------------------------------------------------------------------
+# Process-wide cache
+# ----------------------------------------------------------------------
+_cache = UserAgentCache()
+
+
+def user_agent_id(value):
+    return _cache.get_id(value)
+
+
+def get_agent_cache():
+    return _cache
+
+
+def reset_agent_cache():
+    _cache.clear()
@@ -1,95 +1,43 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Playlist, Movie, DownloadLog, InstallTracker, Category
-from django.http import JsonResponse
+from django.urls import reverse
+from .models import Playlist, Movie, InstallTracker, Category
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.db.models import Count, Q
-from itertools import chain
+from django.db import transaction
 import json
-import re
+import os
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth.models import User
-from django.core.paginator import Paginator, EmptyPage # EmptyPage को भी इम्पोर्ट किया
-
-
-# -------------------------------
-# Helper function: Robust Season and Episode number extraction
-# -------------------------------
-def extract_episode_number(title):
-    """
-    Extracts the Season and Episode numbers from a movie/series title for correct sorting.
-    Returns (season_num, episode_num). This version is highly robust against bad titles.
-    """
-    title = title or ""
-    title = title.lower()
-
-    # Default values: Season 1, and a very high episode number (for movies or unsorted items)
-    season_num = 1
-    episode_num = 9999
-
-    # 1. Season extraction (e.g., season 1, s01, s 1)
-    # Searches for 's' or 'season' followed by digits
-    season_match = re.search(r"s(?:eason)?\s*(\d+)", title)
-    if season_match:
-        try:
-            # Safely convert to integer
-            season_num = int(season_match.group(1))
-        except ValueError:
-            pass
-
-    # 2. Episode extraction (e.g., episode 10, e10, e 10)
-    # Searches for 'e' or 'episode' followed by digits
-    episode_match = re.search(r"e(?:pisode)?\s*(\d+)", title)
-    if episode_match:
-        try:
-            # Safely convert to integer
-            episode_num = int(episode_match.group(1))
-        except ValueError:
-            pass
-
-    # If no explicit episode found, check for a standalone number (which might be the episode number)
-    # Only assign this if a season number was also found (to avoid treating movie years as episode numbers)
-    if episode_num == 9999 and season_match:
-        # Look for a standalone number that might represent the episode (e.g., "Series Title 12")
-        # This part handles simple titles like "Show Name 1", "Show Name 2" within a season.
-        cleaned_title = title.replace(season_match.group(0), '')
-        simple_number_match = re.search(r"\b(\d+)\b", cleaned_title)
-        if simple_number_match:
-            try:
-                # Safely convert to integer
-                episode_num = int(simple_number_match.group(1))
-            except ValueError:
-                pass
-
-    # Returns (1, 10) for S1 E10, (2, 1) for S2 E1, etc.
-    return (season_num, episode_num)
-
-
-# -------------------------------
-# Helper function: Extracting order number (e.g., 1., 2., 10.)
-# -------------------------------
-def extract_movie_order_number(title):
-    """
-    Extracts the numeric order number (e.g., 1, 2, 10) from the start of a title.
-    Returns 9999 if no number is found, ensuring it sorts last.
-    """
-    title = title or ""
-    # RegEx searches for one or more digits at the start of the string, followed by a dot.
-    match = re.match(r'^(\d+)\.', title.strip())
-    if match:
-        try:
-            # Safely convert the captured number (group 1) to an integer
-            return int(match.group(1))
-        except ValueError:
-            pass
-    # Default to a high number if no sequence number is found
-    return 9999
+from django.core.paginator import Paginator
+from .download_buffer import record_download
+from .feed import InvalidCursor, build_feed, decode_cursor, parse_limit
+from .search import get_search_backend
+from .suggest import get_suggest_index
+from .ordering import NO_NUMBER
+from .pagination import CatalogPaginator, CatalogQuery
+from .resolver import resolve_download
+from .user_agents import user_agent_id
+from .page_cache import cached_page, conditional_page
+from .snapshots import read_index, shard_file
+from .metrics import get_snapshot as get_metrics_snapshot
+from .sitemaps import INDEX_NAME as SITEMAP_INDEX, schedule_rebuild as schedule_sitemap_rebuild, sitemap_path
+from .cards import EPISODE_CARD, MOVIE_CARD, PLAYLIST_CARD, render_cards
+from .installs import (
+    InvalidEvents, active_installs, apply_events, parse_events, record_install, record_uninstall,
+    reset_counter as reset_install_counter,
+)
+
+
+PLAYLIST_PAGE_SIZE = 48  # 6 cards per row on desktop
 
 
 # ----------------------------------------------------------------------
-# HOME VIEW (FIXED for 24/20 Pagination Overlap)
+# HOME VIEW (24/20 pagination, database-side)
 # ----------------------------------------------------------------------
+@cached_page("home")
 def home(request):
     """Renders the homepage, including search functionality for movies and playlists."""
     query = request.GET.get("q")
@@ -97,177 +45,213 @@ def home(request):
     all_movies = Movie.objects.filter(playlist__isnull=True)
 
     if query:
-        playlists_q = Q(name__icontains=query)
-        movies_q = Q(title__icontains=query)
-        all_playlists = all_playlists.filter(playlists_q)
-        all_movies = all_movies.filter(movies_q)
-
-    combined_list = list(chain(all_playlists, all_movies))
-    combined_list.sort(
-        key=lambda x: x.created_at or timezone.datetime.min.replace(tzinfo=timezone.utc),
-        reverse=True
-    )
-
-    # --- 👇 FIXED Pagination Logic Yahan se Shuru Hota Hai! 👇 ---
-    
-    page_number = request.GET.get('page')
-    
-    # 1. Base Paginator Hamesha Page 1 ke Size (24) par set karo
-    # Taki total pages ki calculation sahi ho.
-    paginator = Paginator(combined_list, 24) 
-
-    # 2. Requested page ka data fetch karo
-    try:
-        page_obj = paginator.get_page(page_number)
-    except EmptyPage:
-        page_obj = paginator.get_page(paginator.num_pages)
-    except:
-        page_obj = paginator.get_page(1) # Default to page 1 in case of any error
-
-
-    # 3. Agar page 2 ya usse aage hain, toh Page 1 ke 'extra' 4 items ko hata do.
-    # Page 1 = 24 items. Page 2, 3... = 20 items.
-    
-    # Check if we are not on the first page and there are enough items for slicing
-    if page_obj.number > 1 and len(page_obj) > 4:
-        # Paginator ne 24 items diye, hamein pehle ke 4 items hataane hain
-        # Taki sirf 20 items bachein (24 - 4 = 20)
-        # Slicing: [4:] ka matlab hai ki index 4 se aage ke saare items lo.
-        media_items_sliced = page_obj.object_list[4:]
-    elif page_obj.number == 1 or page_obj.number == paginator.num_pages:
-        # First page ya last page par poore items dikhao (24 ya bache hue)
-        media_items_sliced = page_obj.object_list
+        # Full-text search: sabse relevant result pehle
+        search = get_search_backend()
+        catalog = CatalogQuery.ranked(search.search(all_playlists, query), search.search(all_movies, query))
     else:
-        # Default fallback
-        media_items_sliced = page_obj.object_list
+        catalog = CatalogQuery(all_playlists, all_movies)
 
-    # --- 👆 FIXED Pagination Logic Yahan Khatam Hota Hai! 👆 ---
+    # Page 1 = 24 items, Page 2, 3... = 20 items. Sirf requested page ki rows DB se aati hain.
+    paginator = CatalogPaginator(catalog)
+    page_obj = paginator.get_page(request.GET.get("page"))
 
-    not_found = query and not combined_list
+    not_found = query and paginator.count == 0
     return render(
         request,
         "home.html",
         {
-            # Updated: media_items ko sliced list se set kar rahe hain, lekin page_obj original rahega
-            "media_items": media_items_sliced, 
+            "media_items": page_obj.object_list,
+            "cards": render_cards([
+                (PLAYLIST_CARD if isinstance(item, Playlist) else MOVIE_CARD, item) for item in page_obj.object_list
+            ]),
             "categories": Category.objects.all(),
             "query": query,
             "not_found": not_found,
-            "page_obj": page_obj, # Pagination buttons is original page_obj ka use karenge
+            "page_obj": page_obj,
         },
     )
 
 
+@cached_page("playlist:{playlist_id}")
 def playlist_detail(request, playlist_id):
     """
-    Displays all movies belonging to a specific playlist.
+    Displays the movies belonging to a specific playlist, paginated.
+    Ordering comes from the stored sort keys (see movies/ordering.py), so it happens in SQL.
     """
     playlist = get_object_or_404(Playlist, id=playlist_id)
+    movies = Movie.objects.filter(playlist=playlist).order_by(*playlist.movie_ordering())
 
-    # 1. Fetch all movies in the playlist
-    movies = list(Movie.objects.filter(playlist=playlist))
-
-    # Check if this is a 'Movie Order' type playlist (like Marvel Universe)
-    has_numeric_order = False
+    paginator = Paginator(movies, PLAYLIST_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get("page"))
 
-    # Check the first 5 movies (or fewer if the list is smaller)
-    for movie in movies[:5]:
-        if extract_movie_order_number(movie.title) != 9999:
-            has_numeric_order = True
-            break
+    return render(request, "playlist_detail.html", {
+        "playlist": playlist,
+        "movies": page_obj.object_list,
+        "cards": render_cards([(EPISODE_CARD, movie) for movie in page_obj.object_list]),
+        "page_obj": page_obj,
+    })
 
-    if has_numeric_order:
-        # Sort using the numeric order from the title (1, 2, 3...)
-        movies.sort(key=lambda movie: extract_movie_order_number(movie.title))
 
-    else:
-        # Default to Season/Episode sorting (S01E01, S01E02)
-        movies.sort(key=lambda movie: extract_episode_number(movie.title))
-
-    return render(request, "playlist_detail.html", {"playlist": playlist, "movies": movies})
+def has_numeric_order(movies):
+    """'Movie Order' mode (1., 2., 3. ...): pehle 5 movies me se kisi ka order number ho."""
+    first = movies.order_by("pk").values_list("order_num", flat=True)[:5]
+    return any(num != NO_NUMBER for num in first)
 
 
+@cached_page("category:{category_id}")
 def category_detail(request, category_id):
     """
     Displays all playlists and movies belonging to a specific category, with search functionality.
-    Includes FIX for 24/20 Pagination Overlap.
+    Uses the same 24/20 database-side pagination as the homepage.
     """
     category = get_object_or_404(Category, id=category_id)
     query = request.GET.get("q")
 
-    # Category ke saare movies fetch kiye
-    movies = list(Movie.objects.filter(category=category))
+    movies = Movie.objects.filter(category=category)
     playlists = Playlist.objects.filter(category=category)
 
-    if query:
-        movies = [m for m in movies if query.lower() in m.title.lower()] # Filtering movies in memory
-        playlists = playlists.filter(name__icontains=query)
-
     # ------------------ SORTING LOGIC ------------------
 
-    has_numeric_order = False
-    for movie in movies[:5]:
-        if extract_movie_order_number(movie.title) != 9999:
-            has_numeric_order = True
-            break
-
-    if has_numeric_order:
-        movies.sort(key=lambda movie: extract_movie_order_number(movie.title))
-
-    items = [{"type": "movie", "obj": m} for m in movies] + [{"type": "playlist", "obj": p} for p in playlists]
-
-    if not has_numeric_order:
-        items.sort(
-            key=lambda x: x["obj"].created_at or timezone.datetime.min.replace(tzinfo=timezone.utc),
-            reverse=True
-        )
-
-    # --- 👇 FIXED Pagination Logic Yahan se Shuru Hota Hai! 👇 ---
-    
-    page_number = request.GET.get('page')
-
-    # 1. Base Paginator Hamesha Page 1 ke Size (24) par set karo
-    paginator = Paginator(items, 24) 
-    
-    # 2. Requested page ka data fetch karo
-    try:
-        page_obj = paginator.get_page(page_number)
-    except EmptyPage:
-        page_obj = paginator.get_page(paginator.num_pages)
-    except:
-        page_obj = paginator.get_page(1)
-        
-
-    # 3. Agar page 2 ya usse aage hain, toh Page 1 ke 'extra' 4 items ko hata do.
-    # Logic: Page 1 = 24 items. Page 2, 3... = 20 items.
-    
-    if page_obj.number > 1 and len(page_obj.object_list) > 4:
-        # Paginator ne 24 items diye, hamein pehle ke 4 items hataane hain
-        media_items_sliced = page_obj.object_list[4:]
-    elif page_obj.number == 1 or page_obj.number == paginator.num_pages:
-        # First page ya last page par poore items dikhao (24 ya bache hue)
-        media_items_sliced = page_obj.object_list
+    if query:
+        # Search results relevance ke hisaab se, numeric order mode yahan apply nahi hota
+        search = get_search_backend()
+        catalog = CatalogQuery.ranked(search.search(playlists, query), search.search(movies, query), as_items=True)
+    elif has_numeric_order(movies):
+        # Numbered movies pehle (1, 2, 3...), phir playlists
+        catalog = CatalogQuery.numbered(playlists, movies, as_items=True)
     else:
-        # Default fallback
-        media_items_sliced = page_obj.object_list
-        
-    # --- 👆 FIXED Pagination Logic Yahan Khatam Hota Hai! 👆 ---
+        catalog = CatalogQuery(playlists, movies, as_items=True)
+
+    paginator = CatalogPaginator(catalog)
+    page_obj = paginator.get_page(request.GET.get("page"))
 
     return render(request, "category_detail.html", {
         "category": category,
-        # Updated: 'items' ab sliced list hai
-        "items": media_items_sliced, 
+        "items": page_obj.object_list,
+        "cards": render_cards([
+            (PLAYLIST_CARD if item["type"] == "playlist" else MOVIE_CARD, item["obj"]) for item in page_obj.object_list
+        ]),
         "query": query,
-        "page_obj": page_obj, # Pagination buttons is original page_obj ka use karenge
+        "page_obj": page_obj,
     })
 
 
+@cached_page("movie:{movie_id}")
 def movie_detail(request, movie_id):
     """Displays the detail page for a specific movie."""
     movie = get_object_or_404(Movie, id=movie_id)
     return render(request, "movie_detail.html", {"movie": movie})
 
 
+# -------------------------------
+# JSON Feed API (infinite scroll)
+# -------------------------------
+def _feed_response(request, playlists, movies):
+    """Shared body of the feed endpoints: search filter, cursor and limit handling."""
+    query = request.GET.get("q")
+    if query:
+        search = get_search_backend()
+        playlists = search.search(playlists, query, ranked=False)
+        movies = search.search(movies, query, ranked=False)
+
+    limit = parse_limit(request.GET.get("limit"))
+    cursor = request.GET.get("cursor")
+    try:
+        cursor = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        return JsonResponse({"status": "error", "message": "Invalid cursor"}, status=400)
+
+    cards, next_cursor = build_feed(playlists, movies, cursor=cursor, limit=limit)
+    return JsonResponse({"results": cards, "next": next_cursor})
+
+
+@conditional_page("home")
+def api_feed(request):
+    """Homepage feed: all playlists plus movies that are not part of a playlist."""
+    return _feed_response(request, Playlist.objects.all(), Movie.objects.filter(playlist__isnull=True))
+
+
+@conditional_page("category:{category_id}")
+def api_category_feed(request, category_id):
+    """Category feed: playlists and movies of one category."""
+    category = get_object_or_404(Category, id=category_id)
+    return _feed_response(request, Playlist.objects.filter(category=category), Movie.objects.filter(category=category))
+
+
+# -------------------------------
+# Offline catalog snapshot (movies/snapshots.py)
+# -------------------------------
+def api_catalog(request):
+    """Current snapshot index; the shards it lists are immutable static files."""
+    index = read_index()
+    if index is None:
+        raise Http404("Catalog snapshot has not been built")
+    etag = '"%s"' % index["version"]
+    response = get_conditional_response(request, etag=etag) or JsonResponse(index)
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def catalog_shard(request, name):
+    """Serves a shard written after this worker started (WhiteNoise serves the rest)."""
+    found = shard_file(name, request.headers.get("Accept-Encoding", ""))
+    if found is None:
+        raise Http404("Unknown catalog shard")
+    path, encoding = found
+    response = FileResponse(open(path, "rb"), content_type="application/json")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+# -------------------------------
+# Sitemaps (movies/sitemaps.py)
+# -------------------------------
+def sitemap_file(request, name):
+    """Serves a pre-built sitemap file from disk; never queries the ORM."""
+    found = sitemap_path(name, request.headers.get("Accept-Encoding", ""))
+    if found is None and name == SITEMAP_INDEX:
+        # Deploy par build_sitemaps nahi chala: background me build, crawler thodi der baad aaye
+        schedule_sitemap_rebuild(delay=0)
+        response = HttpResponse("Sitemap is being built", status=503, content_type="text/plain")
+        response["Retry-After"] = "60"
+        return response
+    if found is None:
+        raise Http404("Unknown sitemap")
+    path, encoding = found
+    stat = os.stat(path)
+    etag = 'W/"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = FileResponse(open(path, "rb"), content_type="application/xml")
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "public, max-age=3600"
+    return response
+
+
+def api_suggest(request):
+    """Typeahead suggestions (top 10) from the in-memory index, typo tolerant."""
+    query = request.GET.get("q", "")
+    url_names = {"movie": "movie_detail", "playlist": "playlist_detail", "category": "category_detail"}
+    results = [
+        {
+            "id": entry.id,
+            "type": entry.kind,
+            "title": entry.title,
+            "url": reverse(url_names[entry.kind], args=[entry.id]),
+        }
+        for entry in get_suggest_index().suggest(query)
+    ]
+    return JsonResponse({"results": results})
+
+
 def get_client_ip(request):
     """Helper function to get the client's IP address."""
     x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
@@ -279,22 +263,29 @@ def get_client_ip(request):
 def download_movie(request, movie_id):
     """
     Logs the download event and redirects the user to the actual download link.
+    With DOWNLOAD_LOG_BUFFER enabled the log row is written in the background (write-behind).
     """
-    movie = get_object_or_404(Movie, id=movie_id)
+    # Warm cache par koi catalog query nahi (movies/resolver.py)
+    resolved = resolve_download(movie_id)
+    if resolved is None:
+        raise Http404("Movie not found")
+    download_link, title = resolved
+
     ip = get_client_ip(request)
     agent = request.META.get("HTTP_USER_AGENT", "")
     user_email = request.user.email if request.user.is_authenticated else None
     username = request.user.username if request.user.is_authenticated else None
 
-    DownloadLog.objects.create(
-        movie_title=movie.title,
+    record_download(
+        movie_id=movie_id,
+        movie_title=title,
         ip_address=ip,
-        user_agent=agent,
+        agent_id=user_agent_id(agent),
         user_email=user_email,
         username=username,
         download_time=timezone.now(),
     )
-    return redirect(movie.download_link)
+    return redirect(download_link)
 
 
 def detect_device_name(user_agent: str) -> str:
@@ -312,6 +303,13 @@ def detect_device_name(user_agent: str) -> str:
         return "Unknown"
 
 
+INSTALL_MESSAGES = {
+    "install": "New install tracked",
+    "reinstall": "Re-install tracked (count restored)",
+    "install (re-open)": "Already tracked (count maintained)",
+}
+
+
 @csrf_exempt
 @require_POST
 def track_install(request):
@@ -324,28 +322,10 @@ def track_install(request):
         if not device_id_str:
             return JsonResponse({"status": "error", "message": "Device ID missing"}, status=400)
 
-        tracker, created = InstallTracker.objects.get_or_create(device_id=device_id_str)
-        action_message = "Already tracked (count maintained)"
-
-        if created:
-            tracker.install_count = 1
-            tracker.deleted_count = 0
-            tracker.device_info = request.META.get("HTTP_USER_AGENT", "")
-            tracker.device_name = device_name
-            tracker.last_action = "install"
-            action_message = "New install tracked"
-        elif tracker.install_count == 0:
-            tracker.install_count = 1
-            tracker.device_name = device_name
-            tracker.last_action = "reinstall"
-            action_message = "Re-install tracked (count restored)"
-        else:
-            tracker.last_action = "install (re-open)"
-            tracker.device_name = device_name
-
-        tracker.updated_at = timezone.now()
-        tracker.save()
-        total_active_installs = InstallTracker.objects.filter(install_count=1).count()
+        # Active installs ka counter sirf asli 0->1 transition par badhta hai (movies/installs.py)
+        action = record_install(device_id_str, device_name)
+        action_message = INSTALL_MESSAGES[action]
+        total_active_installs = active_installs()
 
         return JsonResponse({
             "status": "success",
@@ -371,53 +351,64 @@ def track_uninstall(request):
         if not device_id_str:
             return JsonResponse({'success': False, 'message': 'Device ID is required'}, status=400)
 
-        try:
-            tracker = InstallTracker.objects.get(device_id=device_id_str)
-            if tracker.install_count == 1:
-                tracker.install_count = 0
-                tracker.deleted_count += 1
-                tracker.last_action = 'uninstall'
-                tracker.updated_at = timezone.now()
-                tracker.save()
-
-            total_active_installs = InstallTracker.objects.filter(install_count=1).count()
-
-            return JsonResponse({'success': True, 'message': 'Uninstall tracked', 'total_active_installs': total_active_installs})
-        except InstallTracker.DoesNotExist:
+        if not record_uninstall(device_id_str):
             return JsonResponse({'success': True, 'message': 'Tracker not found, but uninstall acknowledged'})
 
+        total_active_installs = active_installs()
+        return JsonResponse({'success': True, 'message': 'Uninstall tracked', 'total_active_installs': total_active_installs})
+
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'message': 'Invalid JSON'}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'message': 'Server error'}, status=500)
 
 
+@csrf_exempt
+@require_POST
+def api_install_events(request):
+    """
+    Batched install telemetry from install_tracker.js (sent with sendBeacon).
+    Body: {"events": [{"id", "device_id", "type": install/uninstall/open, "ts", "device_name"}]}.
+    Retried batches are safe: already applied events are counted as duplicates.
+    """
+    try:
+        payload = json.loads(request.body)
+        events, rejected = parse_events(payload, detect_device_name(request.META.get("HTTP_USER_AGENT", "")))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"status": "error", "message": "Invalid JSON"}, status=400)
+    except InvalidEvents as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    applied, duplicates = apply_events(events)
+    return JsonResponse({
+        "status": "success",
+        "applied": applied,
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "total_active_installs": active_installs(),
+    })
+
+
 @staff_member_required
 def custom_admin_dashboard(request):
-    """Custom admin dashboard view showing key metrics."""
-    total_users = User.objects.count()
-    total_movies = Movie.objects.count()
-    total_downloads = DownloadLog.objects.count()
-    total_installs = InstallTracker.objects.filter(install_count=1).count()
-
-    recent_installs = InstallTracker.objects.order_by('-updated_at')[:5]
-    top_movies = DownloadLog.objects.values('movie_title').annotate(download_count=Count('movie_title')).order_by('-download_count')[:5]
-    recent_downloads = DownloadLog.objects.order_by('-download_time')[:5]
-
-    context = {
-        'total_users': total_users,
-        'total_movies': total_movies,
-        'total_downloads': total_downloads,
-        'total_installs': total_installs,
-        'recent_installs': recent_installs,
-        'top_movies': top_movies,
-        'recent_downloads': recent_downloads,
-    }
-    return render(request, 'admin/index.html', context)
+    """Custom admin dashboard view showing key metrics (cached snapshot, movies/metrics.py)."""
+    from .admin import admin_site  # admin/index.html ko admin ka poora context chahiye (log_entries, app_list)
+
+    return admin_site.index(request)
+
+
+@staff_member_required
+def admin_metrics(request):
+    """Metrics snapshot as JSON for the dashboard's live tiles."""
+    response = JsonResponse(get_metrics_snapshot())
+    response["Cache-Control"] = "private, no-store"
+    return response
 
 
 @staff_member_required
 def reset_install_data(request):
     """Admin endpoint to clear all install tracking data."""
-    InstallTracker.objects.all().delete()
+    with transaction.atomic():
+        InstallTracker.objects.all().delete()
+        reset_install_counter()
     return JsonResponse({"status": "success", "message": "All install data has been reset."})
\ No newline at end of file
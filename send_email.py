@@ -1,4 +1,5 @@
 import os
+import sys
 import django
 from django.core.mail import send_mail
 from dotenv import load_dotenv
@@ -14,6 +15,13 @@ message = "✅ This is a test email. If you received this, SMTP is working!"
 from_email = os.getenv('EMAIL_HOST_USER')
 to_email = [os.getenv('EMAIL_HOST_USER')]
 
+if "--queue" in sys.argv:
+    # Background worker (`manage.py run_workers`) bhejega: SMTP + job queue dono test ho jaate hain
+    from movies.jobs import enqueue
+    job = enqueue("send_mail", subject=subject, message=message, from_email=from_email, recipient_list=to_email)
+    print(f"✅ Test email queued as job #{job.pk}. Run `python manage.py run_workers --burst` to send it.")
+    sys.exit(0)
+
 try:
     send_mail(subject, message, from_email, to_email, fail_silently=False)
     print("✅ Test email sent successfully! Check your inbox/spam folder.")
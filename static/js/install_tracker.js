@@ -44,37 +44,90 @@ document.addEventListener("DOMContentLoaded", function () {
         return cookieValue;
     }
 
-    async function trackInstall() {
-        const deviceId = getDeviceId();
-        const deviceName = getDeviceName();
-        const url = "/track-install/";
+    // Events localStorage queue me jaate hain aur ek batch me sendBeacon se bheje jaate hain.
+    // Server event id se dedupe karta hai, isliye dobara bhejna safe hai.
+    const QUEUE_KEY = "install_event_queue";
+    const BATCH_URL = "/api/installs/batch/";
+    const MAX_BATCH = 200;
+    let flushTimer = null;
 
+    function readQueue() {
+        try {
+            return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+        } catch (error) {
+            return [];
+        }
+    }
+
+    function writeQueue(queue) {
+        localStorage.setItem(QUEUE_KEY, JSON.stringify(queue.slice(-MAX_BATCH)));
+    }
+
+    function queueEvent(type) {
+        const queue = readQueue();
+        queue.push({
+            id: crypto.randomUUID(),
+            device_id: getDeviceId(),
+            device_name: getDeviceName(),
+            type: type,
+            ts: Date.now(),
+        });
+        writeQueue(queue);
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(flushEvents, 2000);
+    }
+
+    function flushEvents() {
+        const queue = readQueue();
+        if (!queue.length) return;
+        const batch = queue.slice(0, MAX_BATCH);
+        const body = JSON.stringify({ events: batch });
+
+        // Queue se sirf tab hatao jab batch pahunch gaya: beacon browser ne le liya ya fetch ko 2xx mila
+        if (navigator.sendBeacon && navigator.sendBeacon(BATCH_URL, new Blob([body], { type: "application/json" }))) {
+            dequeue(batch);
+            return;
+        }
+        fetch(BATCH_URL, {
+            method: "POST",
+            headers: { "Content-Type": "application/json", "X-CSRFToken": getCookie("csrftoken") },
+            body: body,
+            keepalive: true,
+        })
+            .then((response) => {
+                if (response.ok) dequeue(batch);
+                else console.error("Install events rejected:", response.status);
+            })
+            .catch((error) => console.error("Error sending install events:", error));
+    }
+
+    function dequeue(batch) {
+        const sentIds = new Set(batch.map((event) => event.id));
+        writeQueue(readQueue().filter((event) => !sentIds.has(event.id)));
+    }
+
+    function trackInstall() {
+        const deviceId = getDeviceId();
         if (localStorage.getItem(`installed_${deviceId}`) === "true") {
             console.log("Install already tracked for this device.");
             return;
         }
+        queueEvent("install");
+        localStorage.setItem(`installed_${deviceId}`, "true");
+    }
 
-        try {
-            const response = await fetch(url, {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRFToken": getCookie("csrftoken"),
-                },
-                body: JSON.stringify({
-                    device_id: deviceId,
-                    device_name: deviceName,
-                }),
-            });
-
-            const data = await response.json();
-            console.log("Install tracked:", data);
-
-            localStorage.setItem(`installed_${deviceId}`, "true");
-        } catch (error) {
-            console.error("Error tracking install:", error);
-        }
+    // Page band/background hote hi bache hue events bhej do
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden") flushEvents();
+    });
+    window.addEventListener("pagehide", flushEvents);
+
+    // Installed PWA ka launch: har session me ek "open" event
+    if (window.matchMedia("(display-mode: standalone)").matches && !sessionStorage.getItem("pwa_open_sent")) {
+        sessionStorage.setItem("pwa_open_sent", "true");
+        queueEvent("open");
     }
+    flushEvents(); // pichle page ke bache events
 
     if (installBtn) {
         let deferredPrompt;